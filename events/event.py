@@ -4,22 +4,113 @@
         Module containing the base class for all events.
 """
 
+from __future__ import annotations
+
+import itertools
 import logging
 import sys
+import time
+
+from typing import Any, Hashable, Optional
 
 from events.signals import Signal
 
+# Generator of trace IDs
+_TRACE_IDS = itertools.count(1)
+
+# Flag indicating whether new events shall be traced
+_TRACING = True
+
+
+def set_tracing(enabled: bool) -> None:
+    """
+    Enable or disable the tracing of new events. If tracing is disabled the create() functions of the events return
+    preallocated untraced events where possible.
+    :param enabled: True to enable tracing, False to disable it.
+    :return: None
+    """
+    global _TRACING     # pylint: disable=global-statement
+    _TRACING = enabled
+
+
+def is_tracing() -> bool:
+    """
+    Check if new events are traced.
+    :return: True if new events are traced, False otherwise.
+    """
+    return _TRACING
+
 
 class Event:
     """
-    Base class for all events.
+    Base class for all events. Events are immutable and compare equal if their signal and payload are equal. Each event
+    carries a trace ID and the monotonic creation time of the first event of its trace, i.e. of the event which
+    (indirectly) caused it. Untraced events have the trace ID 0.
     """
-    def __init__(self, signal: Signal):
+    __slots__ = ("__signal", "__created", "__trace_id", "__origin")
+
+    def __init__(self, signal: Signal, cause: Optional[Event] = None, traced: bool = True):
         """
         Class constructor.
         :param signal: Signal used by this event.
+        :param cause: Event which caused this event or None if this event starts a new trace.
+        :param traced: False to create an untraced event, e.g. for preallocated events.
+        """
+        created = time.monotonic() if traced else 0.0
+        if not traced:
+            trace_id, origin = 0, 0.0
+        elif cause is None:
+            trace_id, origin = next(_TRACE_IDS), created
+        else:
+            trace_id, origin = cause.trace_id(), cause.origin()
+
+        object.__setattr__(self, "_Event__signal", signal)
+        object.__setattr__(self, "_Event__created", created)
+        object.__setattr__(self, "_Event__trace_id", trace_id)
+        object.__setattr__(self, "_Event__origin", origin)
+
+    @classmethod
+    def create(cls, signal: Signal, *, cause: Optional[Event] = None) -> Event:
+        """
+        Get an event without payload, preallocated if tracing is disabled or the signal is TERMINATE.
+        :param signal: Signal used by the event.
+        :param cause: Event which caused the event or None if the event starts a new trace.
+        :return: Event.
+        """
+        if signal is Signal.TERMINATE or not _TRACING:
+            return _EVENTS[signal]
+        return cls(signal, cause)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Prevent modifications of the immutable event.
+        :raise: AttributeError
+        """
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        """
+        Prevent modifications of the immutable event.
+        :raise: AttributeError
         """
-        self.__signal = signal
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Compare signal and payload with another event.
+        :param other: Object to compare with.
+        :return: True if the events are equal, False otherwise.
+        """
+        if type(other) is not type(self):     # pylint: disable=unidiomatic-typecheck
+            return NotImplemented
+        return self.__signal is other.signal() and self.payload() == other.payload()
+
+    def __hash__(self) -> int:
+        """
+        Get the hash of signal and payload.
+        :return: Hash value.
+        """
+        return hash((self.__signal, self.payload()))
 
     def __str__(self) -> str:
         """
@@ -35,6 +126,47 @@ class Event:
         """
         return self.__signal
 
+    # pylint: disable=no-self-use
+    def payload(self) -> Any:
+        """
+        Get the payload of the event.
+        :return: Payload or None for events without payload.
+        """
+        return None
+
+    def coalescing_key(self) -> Hashable:
+        """
+        Get the key of the event used for coalescing, i.e. a queued event is superseded by a newer event with the same
+        key.
+        :return: Signal of the event.
+        """
+        return self.__signal
+
+    def created(self) -> float:
+        """
+        Get the creation time of the event.
+        :return: Monotonic creation time in seconds or 0 for untraced events.
+        """
+        return self.__created
+
+    def trace_id(self) -> int:
+        """
+        Get the trace ID of the event.
+        :return: Trace ID shared by all events caused by the same initial event or 0 for untraced events.
+        """
+        return self.__trace_id
+
+    def origin(self) -> float:
+        """
+        Get the creation time of the initial event of the trace.
+        :return: Monotonic creation time of the initial event in seconds or 0 for untraced events.
+        """
+        return self.__origin
+
+
+# Preallocated untraced events without payload
+_EVENTS = {signal: Event(signal, traced=False) for signal in Signal}
+
 
 if __name__ == "__main__":
     logging.basicConfig(format="%(levelname)s: %(message)s")
@@ -4,10 +4,12 @@
         Module containing the ButtonPressed event.
 """
 
+from __future__ import annotations
+
 import logging
 import sys
 
-from events.event import Event
+from events.event import Event, is_tracing
 from events.signals import Signal
 
 
@@ -15,13 +17,36 @@ class EventButtonPressed(Event):
     """
     Event to indicate changed button states.
     """
-    def __init__(self, press_type: int):
+    __slots__ = ("__press_type",)
+
+    # Press types
+    SHORT_PRESS = 1
+    LONG_PRESS = 2
+
+    def __init__(self, press_type: int, traced: bool = True):
         """
         Class constructor.
         :param press_type: Button press type.
+        :param traced: False to create an untraced event, e.g. for preallocated events.
+        """
+        object.__setattr__(self, "_EventButtonPressed__press_type", press_type)
+        super().__init__(Signal.BUTTON_PRESSED, traced=traced)
+
+    # The signal of button events is fixed, so the press type takes its place
+    # pylint: disable=arguments-differ,arguments-renamed
+    @classmethod
+    def create(cls, press_type: int) -> EventButtonPressed:
+        """
+        Get a button event, preallocated if tracing is disabled.
+        :param press_type: Button press type.
+        :return: Button event.
         """
-        self.__press_type = press_type
-        super().__init__(Signal.BUTTON_PRESSED)
+        if not is_tracing():
+            event = _EVENTS.get(press_type)
+            if event is None:
+                event = _EVENTS.setdefault(press_type, cls(press_type, traced=False))
+            return event
+        return cls(press_type)
 
     def press_type(self) -> int:
         """
@@ -30,6 +55,17 @@ class EventButtonPressed(Event):
         """
         return self.__press_type
 
+    def payload(self) -> int:
+        """
+        Get the payload of the event.
+        :return: Button press type.
+        """
+        return self.__press_type
+
+
+# Preallocated untraced events
+_EVENTS = {}
+
 
 if __name__ == "__main__":
     logging.basicConfig(format="%(levelname)s: %(message)s")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the ConfigChanged event.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+
+from typing import Optional, TYPE_CHECKING
+
+from events.event import Event
+from events.signals import Signal
+
+if TYPE_CHECKING:
+    from objects.config_watcher import Config
+
+
+class EventConfigChanged(Event):
+    """
+    Event to announce a new (validated) configuration. Receivers apply the settings they depend on.
+    """
+    __slots__ = ("__config",)
+
+    def __init__(self, config: Config, cause: Optional[Event] = None):
+        """
+        Class constructor.
+        :param config: New configuration.
+        :param cause: Event which caused this event or None if this event starts a new trace.
+        """
+        object.__setattr__(self, "_EventConfigChanged__config", config)
+        super().__init__(Signal.CONFIG_CHANGED, cause)
+
+    def config(self) -> Config:
+        """
+        Get the new configuration.
+        :return: Configuration.
+        """
+        return self.__config
+
+    def payload(self) -> Config:
+        """
+        Get the payload of the event.
+        :return: Configuration.
+        """
+        return self.__config
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
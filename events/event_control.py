@@ -4,10 +4,14 @@
         Module containing the Control event.
 """
 
+from __future__ import annotations
+
 import logging
 import sys
 
-from events.event import Event
+from typing import Optional
+
+from events.event import Event, is_tracing
 from events.signals import Signal
 
 
@@ -15,14 +19,32 @@ class EventControl(Event):
     """
     Event to control a receiver.
     """
-    def __init__(self, signal: Signal, enable: bool):
+    __slots__ = ("__enable",)
+
+    def __init__(self, signal: Signal, enable: bool, cause: Optional[Event] = None, traced: bool = True):
         """
         Class constructor.
         :param signal: Signal of the event.
         :param enable: True if the receiver should be enabled, False if it should be disabled.
+        :param cause: Event which caused this event or None if this event starts a new trace.
+        :param traced: False to create an untraced event, e.g. for preallocated events.
+        """
+        object.__setattr__(self, "_EventControl__enable", enable)
+        super().__init__(signal, cause, traced)
+
+    # pylint: disable=arguments-differ
+    @classmethod
+    def create(cls, signal: Signal, enable: bool, *, cause: Optional[Event] = None) -> EventControl:
+        """
+        Get a control event, preallocated if tracing is disabled.
+        :param signal: Signal of the event.
+        :param enable: True if the receiver should be enabled, False if it should be disabled.
+        :param cause: Event which caused the event or None if the event starts a new trace.
+        :return: Control event.
         """
-        self.__enable = enable
-        super().__init__(signal)
+        if not is_tracing():
+            return _EVENTS[signal, enable]
+        return cls(signal, enable, cause)
 
     def enable(self) -> bool:
         """
@@ -31,6 +53,20 @@ class EventControl(Event):
         """
         return self.__enable
 
+    def payload(self) -> bool:
+        """
+        Get the payload of the event.
+        :return: Control state.
+        """
+        return self.__enable
+
+
+# Preallocated untraced events
+_EVENTS = {(signal, enable): EventControl(signal, enable, traced=False)
+           for signal in (Signal.CAMERA_STREAM_CONTROL, Signal.DISPLAY_POWER_CONTROL, Signal.SLIDESHOW_CONTROL,
+                          Signal.CAMERA_STREAM_PREWARM)
+           for enable in (False, True)}
+
 
 if __name__ == "__main__":
     logging.basicConfig(format="%(levelname)s: %(message)s")
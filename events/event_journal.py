@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the binary event journal used to record and replay events.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+
+from threading import Lock
+from typing import Iterator, Tuple
+
+from events.event import Event
+from events.event_button_pressed import EventButtonPressed
+from events.event_control import EventControl
+from events.event_motion_changed import EventMotionChanged
+from events.event_notify import EventNotify
+from events.event_process_restart import EventProcessRestart
+from events.signals import Signal
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+# Journal header: magic, version, record size
+_HEADER = struct.Struct("<8sHH4x")
+_MAGIC = b"SFEVJRNL"
+_VERSION = 2
+
+# Journal record (64 bytes): monotonic time, wall-clock time, trace ID, signal, integer payload, text payload (UTF-8,
+# truncated and zero padded, notification text, camera ID or process name)
+_TEXT_SIZE = 36
+_RECORD = struct.Struct(f"<ddQBxh{_TEXT_SIZE}s")
+_SIGNAL_OFFSET = 24
+
+# Signal of the record starting a run, the monotonic times of different runs are unrelated
+_RUN_START = 0
+
+# Signals with a boolean payload
+_BOOLEAN_SIGNALS = (Signal.CAMERA_MOTION_CHANGED, Signal.SENSOR_MOTION_CHANGED, Signal.CAMERA_STREAM_CONTROL,
+                    Signal.DISPLAY_POWER_CONTROL, Signal.SLIDESHOW_CONTROL, Signal.CAMERA_STREAM_PREWARM)
+
+
+class EventJournalWriter:
+    """
+    Class appending events to a journal file consisting of a header and fixed-size records. Every writer starts a new
+    run of the journal.
+    """
+    def __init__(self, path: str):
+        """
+        Class constructor.
+        :param path: Path to the journal file, created if it doesn't exist.
+        :raise: ValueError if the file is not a valid journal.
+        """
+        # Validate the header of an existing journal before appending to it
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            EventJournalReader(path).close()
+
+        self.__lock = Lock()
+        self.__file = open(path, "ab")     # pylint: disable=consider-using-with
+        size = self.__file.tell()
+        if size == 0:
+            self.__file.write(_HEADER.pack(_MAGIC, _VERSION, _RECORD.size))
+        else:
+            # Drop a record torn by a crash, so that the appended records stay aligned
+            self.__file.truncate(_HEADER.size + (size - _HEADER.size) // _RECORD.size * _RECORD.size)
+        self.__file.write(_RECORD.pack(time.monotonic(), time.time(), 0, _RUN_START, 0, b""))
+        self.__file.flush()
+        LOG.info("Recording events to journal %s.", path)
+
+    def record(self, event: Event) -> None:
+        """
+        Append an event to the journal.
+        :param event: Event to be recorded.
+        :return: None
+        """
+        signal = event.signal()
+        value = 0
+        text = b""
+        if signal in (Signal.CAMERA_MOTION_CHANGED, Signal.SENSOR_MOTION_CHANGED):
+            value = int(event.motion())
+            text = (event.camera() or "").encode()[:_TEXT_SIZE]
+        elif signal in _BOOLEAN_SIGNALS:
+            value = int(event.payload())
+        elif signal is Signal.BUTTON_PRESSED:
+            value = event.press_type()
+        elif signal is Signal.NOTIFY:
+            text = event.text().encode()[:_TEXT_SIZE]
+        elif signal is Signal.PROCESS_RESTART:
+            value = EventProcessRestart.REASONS.index(event.reason())
+            text = event.process().encode()[:_TEXT_SIZE]
+
+        record = _RECORD.pack(time.monotonic(), time.time(), event.trace_id(), signal, value, text)
+        with self.__lock:
+            self.__file.write(record)
+            self.__file.flush()
+
+    def close(self) -> None:
+        """
+        Close the journal file.
+        :return: None
+        """
+        with self.__lock:
+            self.__file.close()
+
+
+class EventJournalReader:
+    """
+    Class reading a run of a journal file through a read-only memory map.
+    """
+    def __init__(self, path: str, run: int = -1):
+        """
+        Class constructor.
+        :param path: Path to the journal file.
+        :param run: Index of the run to be read, negative indices count from the last run.
+        :raise: ValueError if the file is not a valid journal or doesn't contain the run.
+        """
+        with open(path, "rb") as journal_file:
+            size = os.fstat(journal_file.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"{path} is not an event journal.")
+            self.__map = mmap.mmap(journal_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, record_size = _HEADER.unpack_from(self.__map, 0)
+        if magic != _MAGIC or version != _VERSION or record_size != _RECORD.size:
+            self.__map.close()
+            raise ValueError(f"{path} is not a supported event journal.")
+
+        # Ignore a partially written last record
+        count = (size - _HEADER.size) // _RECORD.size
+        starts = [index for index in range(count)
+                  if self.__map[_HEADER.size + index * _RECORD.size + _SIGNAL_OFFSET] == _RUN_START]
+        self.__runs = len(starts)
+        if not -self.__runs <= run < self.__runs:
+            self.__map.close()
+            raise ValueError(f"{path} contains {self.__runs} runs, run {run} doesn't exist.")
+
+        # Records of the run without its start record
+        run %= self.__runs
+        self.__first = starts[run] + 1
+        self.__count = (starts[run + 1] if run + 1 < self.__runs else count) - self.__first
+
+    def runs(self) -> int:
+        """
+        Get the number of runs in the journal.
+        :return: Number of runs.
+        """
+        return self.__runs
+
+    def __len__(self) -> int:
+        """
+        Get the number of records.
+        :return: Number of records.
+        """
+        return self.__count
+
+    def __getitem__(self, index: int) -> Tuple[float, float, Event]:
+        """
+        Get a record.
+        :param index: Record index.
+        :return: Tuple consisting of monotonic time, wall-clock time and (newly created) event of the record.
+        """
+        if not 0 <= index < self.__count:
+            raise IndexError(index)
+
+        offset = _HEADER.size + (self.__first + index) * _RECORD.size
+        monotonic, wall_clock, _, signal, value, text = _RECORD.unpack_from(self.__map, offset)
+        signal = Signal(signal)
+        if signal in (Signal.CAMERA_MOTION_CHANGED, Signal.SENSOR_MOTION_CHANGED):
+            event = EventMotionChanged(signal, bool(value), camera=text.rstrip(b"\0").decode(errors="replace") or None)
+        elif signal in _BOOLEAN_SIGNALS:
+            event = EventControl(signal, bool(value))
+        elif signal is Signal.BUTTON_PRESSED:
+            event = EventButtonPressed(value)
+        elif signal is Signal.NOTIFY:
+            event = EventNotify(text.rstrip(b"\0").decode(errors="replace"))
+        elif signal is Signal.PROCESS_RESTART:
+            event = EventProcessRestart(text.rstrip(b"\0").decode(errors="replace"), EventProcessRestart.REASONS[value])
+        else:
+            event = Event(signal)
+
+        return monotonic, wall_clock, event
+
+    def __iter__(self) -> Iterator[Tuple[float, float, Event]]:
+        """
+        Iterate over all records.
+        :return: Iterator returning tuples consisting of monotonic time, wall-clock time and event.
+        """
+        for index in range(self.__count):
+            yield self[index]
+
+    def close(self) -> None:
+        """
+        Close the memory map.
+        :return: None
+        """
+        self.__map.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
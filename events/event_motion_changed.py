@@ -4,25 +4,61 @@
         Module containing the MotionChanged event.
 """
 
+from __future__ import annotations
+
 import logging
 import sys
 
-from events.event import Event
+from typing import Hashable, Optional, Tuple, Union
+
+from events.event import Event, is_tracing
 from events.signals import Signal
 
 
 class EventMotionChanged(Event):
     """
-    Event to indicate motion.
+    Event to indicate motion, optionally detected by a specific camera.
     """
-    def __init__(self, signal: Signal, motion: bool):
+    __slots__ = ("__motion", "__camera")
+
+    def __init__(self, signal: Signal, motion: bool, cause: Optional[Event] = None, traced: bool = True,
+                 camera: Optional[str] = None):
         """
         Class constructor.
         :param signal: Signal of the event.
         :param motion: True if motion is active, False otherwise.
+        :param cause: Event which caused this event or None if this event starts a new trace.
+        :param traced: False to create an untraced event, e.g. for preallocated events.
+        :param camera: ID of the camera which detected the motion or None for the default camera (or motion sensor).
+        """
+        object.__setattr__(self, "_EventMotionChanged__motion", motion)
+        object.__setattr__(self, "_EventMotionChanged__camera", camera)
+        super().__init__(signal, cause, traced)
+
+    # pylint: disable=arguments-differ
+    @classmethod
+    def create(cls, signal: Signal, motion: bool, *, cause: Optional[Event] = None,
+               camera: Optional[str] = None) -> EventMotionChanged:
+        """
+        Get a motion event, preallocated if tracing is disabled and no camera is given.
+        :param signal: Signal of the event.
+        :param motion: True if motion is active, False otherwise.
+        :param cause: Event which caused the event or None if the event starts a new trace.
+        :param camera: ID of the camera which detected the motion or None for the default camera (or motion sensor).
+        :return: Motion event.
+        """
+        if not is_tracing() and camera is None:
+            return _EVENTS[signal, motion]
+        return cls(signal, motion, cause, is_tracing(), camera)
+
+    def __str__(self) -> str:
+        """
+        String representation of this object.
+        :return: String representation.
         """
-        self.__motion = motion
-        super().__init__(signal)
+        if self.__camera is None:
+            return super().__str__()
+        return f"Event({self.signal()}, camera={self.__camera})"
 
     def motion(self) -> bool:
         """
@@ -31,6 +67,37 @@ class EventMotionChanged(Event):
         """
         return self.__motion
 
+    def camera(self) -> Optional[str]:
+        """
+        Get the camera which detected the motion.
+        :return: Camera ID or None for the default camera (or motion sensor).
+        """
+        return self.__camera
+
+    def payload(self) -> Union[bool, Tuple[bool, str]]:
+        """
+        Get the payload of the event.
+        :return: Motion state or tuple of motion state and camera ID if a camera has been given.
+        """
+        if self.__camera is None:
+            return self.__motion
+        return self.__motion, self.__camera
+
+    def coalescing_key(self) -> Hashable:
+        """
+        Get the key of the event used for coalescing, motion events of different cameras don't supersede each other.
+        :return: Signal or tuple of signal and camera ID if a camera has been given.
+        """
+        if self.__camera is None:
+            return self.signal()
+        return self.signal(), self.__camera
+
+
+# Preallocated untraced events of the default camera (or motion sensor)
+_EVENTS = {(signal, motion): EventMotionChanged(signal, motion, traced=False)
+           for signal in (Signal.CAMERA_MOTION_CHANGED, Signal.SENSOR_MOTION_CHANGED)
+           for motion in (False, True)}
+
 
 if __name__ == "__main__":
     logging.basicConfig(format="%(levelname)s: %(message)s")
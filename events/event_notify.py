@@ -7,6 +7,8 @@
 import logging
 import sys
 
+from typing import Optional
+
 from events.event import Event
 from events.signals import Signal
 
@@ -15,13 +17,16 @@ class EventNotify(Event):
     """
     Event to trigger a notification.
     """
-    def __init__(self, text: str):
+    __slots__ = ("__text",)
+
+    def __init__(self, text: str, cause: Optional[Event] = None):
         """
         Class constructor.
         :param text: Notification text.
+        :param cause: Event which caused this event or None if this event starts a new trace.
         """
-        self.__text = text
-        super().__init__(Signal.NOTIFY)
+        object.__setattr__(self, "_EventNotify__text", text)
+        super().__init__(Signal.NOTIFY, cause)
 
     def text(self) -> str:
         """
@@ -30,6 +35,13 @@ class EventNotify(Event):
         """
         return self.__text
 
+    def payload(self) -> str:
+        """
+        Get the payload of the event.
+        :return: Notification text.
+        """
+        return self.__text
+
 
 if __name__ == "__main__":
     logging.basicConfig(format="%(levelname)s: %(message)s")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the ProcessRestart event.
+"""
+
+import logging
+import sys
+
+from typing import Hashable, Optional
+
+from events.event import Event
+from events.signals import Signal
+
+
+class EventProcessRestart(Event):
+    """
+    Event to request the restart of a supervised process which has exited, stalled or didn't respond to a command. The
+    owner of the process restarts it from its dispatch() function.
+    """
+    __slots__ = ("__process", "__reason")
+
+    # Reasons of a restart
+    EXITED = "exited"
+    STALLED = "stalled"
+    UNRESPONSIVE = "unresponsive"
+    REASONS = (EXITED, STALLED, UNRESPONSIVE)
+
+    def __init__(self, process: str, reason: str, cause: Optional[Event] = None):
+        """
+        Class constructor.
+        :param process: Name of the supervised process.
+        :param reason: Reason of the restart (EXITED, STALLED or UNRESPONSIVE).
+        :param cause: Event which caused this event or None if this event starts a new trace.
+        """
+        object.__setattr__(self, "_EventProcessRestart__process", process)
+        object.__setattr__(self, "_EventProcessRestart__reason", reason)
+        super().__init__(Signal.PROCESS_RESTART, cause)
+
+    def __str__(self) -> str:
+        """
+        String representation of this object.
+        :return: String representation.
+        """
+        return f"Event({self.signal()}, process={self.__process}, reason={self.__reason})"
+
+    def process(self) -> str:
+        """
+        Get the name of the supervised process.
+        :return: Process name.
+        """
+        return self.__process
+
+    def reason(self) -> str:
+        """
+        Get the reason of the restart.
+        :return: EXITED, STALLED or UNRESPONSIVE.
+        """
+        return self.__reason
+
+    def payload(self) -> str:
+        """
+        Get the payload of the event.
+        :return: Process name.
+        """
+        return self.__process
+
+    def coalescing_key(self) -> Hashable:
+        """
+        Get the key of the event used for coalescing, restarts of different processes don't supersede each other.
+        :return: Tuple of signal and process name.
+        """
+        return self.signal(), self.__process
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the bounded event queue used for event communication.
+"""
+
+import logging
+import sys
+import time
+
+from collections import deque
+from queue import Empty
+from threading import Condition
+from typing import Callable, Dict, Optional
+
+from events.event import Event
+from events.signals import SIGNAL_TABLE_SIZE, Signal
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.tracing import Stage, record_latency
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class EventQueue:
+    """
+    Bounded priority queue for events with per-signal policies. Events are queued in priority lanes which are served
+    in order of their priority, events of the same lane are served in FIFO order. A lane which has been bypassed by
+    higher priority lanes too often is served next to prevent its starvation. The queue provides the subset of the
+    queue.Queue interface used by the application, so it can be used as a drop-in replacement.
+    """
+    class Policy:
+        """
+        Class defining the queueing policies of a signal.
+        """
+        # Event is always queued, even if the queue is full.
+        KEEP = "KEEP"
+        # A pending event with the same coalescing key (the signal unless the event distinguishes its sources) is
+        # replaced by the new event which takes over its place in the queue.
+        COALESCE = "COALESCE"
+        # Event is dropped if the queue is full.
+        DROP = "DROP"
+
+    class Priority:
+        """
+        Class defining the priority lanes (lower values are served first).
+        """
+        SHUTDOWN = 0
+        USER_INPUT = 1
+        MOTION = 2
+        CONTROL = 3
+        NOTIFICATION = 4
+
+    # Names of the priority lanes
+    PRIORITY_NAMES = ("SHUTDOWN", "USER_INPUT", "MOTION", "CONTROL", "NOTIFICATION")
+
+    # Default policies of all signals
+    DEFAULT_POLICIES = {
+        Signal.TERMINATE: Policy.KEEP,
+        Signal.BUTTON_PRESSED: Policy.KEEP,
+        Signal.CAMERA_MOTION_CHANGED: Policy.COALESCE,
+        Signal.SENSOR_MOTION_CHANGED: Policy.COALESCE,
+        Signal.CAMERA_STREAM_CONTROL: Policy.COALESCE,
+        Signal.DISPLAY_POWER_CONTROL: Policy.COALESCE,
+        Signal.SLIDESHOW_CONTROL: Policy.COALESCE,
+        Signal.NOTIFY: Policy.DROP,
+        Signal.CONFIG_CHANGED: Policy.COALESCE,
+        Signal.CAMERA_STREAM_PREWARM: Policy.COALESCE,
+        Signal.PROCESS_RESTART: Policy.COALESCE,
+        Signal.PICTURE_LIST_READY: Policy.COALESCE,
+    }
+
+    # Default priorities of all signals
+    DEFAULT_PRIORITIES = {
+        Signal.TERMINATE: Priority.SHUTDOWN,
+        Signal.BUTTON_PRESSED: Priority.USER_INPUT,
+        Signal.CAMERA_MOTION_CHANGED: Priority.MOTION,
+        Signal.SENSOR_MOTION_CHANGED: Priority.MOTION,
+        Signal.CAMERA_STREAM_CONTROL: Priority.CONTROL,
+        Signal.DISPLAY_POWER_CONTROL: Priority.CONTROL,
+        Signal.SLIDESHOW_CONTROL: Priority.CONTROL,
+        Signal.NOTIFY: Priority.NOTIFICATION,
+        Signal.CONFIG_CHANGED: Priority.CONTROL,
+        Signal.CAMERA_STREAM_PREWARM: Priority.CONTROL,
+        Signal.PROCESS_RESTART: Priority.CONTROL,
+        Signal.PICTURE_LIST_READY: Priority.CONTROL,
+    }
+
+    def __init__(self, maxsize: int = 64, policies: Optional[Dict[Signal, str]] = None,
+                 priorities: Optional[Dict[Signal, int]] = None, starvation_limit: int = 16):
+        """
+        Class constructor.
+        :param maxsize: Maximum number of queued events. Events with the KEEP policy and the latest event of signals
+                        with the COALESCE policy are accepted beyond this limit.
+        :param policies: Policies overriding the default policies or None.
+        :param priorities: Priorities overriding the default priorities or None.
+        :param starvation_limit: Number of times a non-empty lane may be bypassed by higher priority lanes before it is
+                                 served next.
+        """
+        self.__maxsize = maxsize
+        self.__starvation_limit = starvation_limit
+
+        # Per-signal tables indexed by the signal value
+        self.__policies = [None] * SIGNAL_TABLE_SIZE
+        self.__priorities = [None] * SIGNAL_TABLE_SIZE
+        self.__coalesced = [None] * SIGNAL_TABLE_SIZE
+        self.__dropped = [None] * SIGNAL_TABLE_SIZE
+        for signal in Signal:
+            self.__policies[signal] = (policies or {}).get(signal, self.DEFAULT_POLICIES[signal])
+            self.__priorities[signal] = (priorities or {}).get(signal, self.DEFAULT_PRIORITIES[signal])
+            self.__coalesced[signal] = REGISTRY.counter("event_queue_coalesced_total", {"signal": signal.name})
+            self.__dropped[signal] = REGISTRY.counter("event_queue_dropped_total", {"signal": signal.name})
+
+        # Queued slots per lane, a slot is a list holding the event and the monotonic time it has been queued
+        self.__lanes = [deque() for _ in self.PRIORITY_NAMES]
+        self.__lane_sizes = [0] * len(self.PRIORITY_NAMES)
+        self.__bypassed = [0] * len(self.PRIORITY_NAMES)
+        self.__size = 0
+
+        # Slots of the pending coalescable events by coalescing key and number of coalesced events
+        self.__pending = {}
+        self.__coalesced_total = 0
+        self.__condition = Condition()
+
+        self.__depth = REGISTRY.gauge("event_queue_depth")
+        self.__waits = [REGISTRY.histogram("event_queue_wait_seconds", {"lane": name}) for name in self.PRIORITY_NAMES]
+        self.__promotions = [REGISTRY.counter("event_queue_starvation_promotions_total", {"lane": name})
+                             for name in self.PRIORITY_NAMES]
+
+        # Function called after an event has been queued
+        self.__put_callback = None
+
+    def put(self, event: Event) -> None:
+        """
+        Put an event into the queue according to the policy of its signal. This function never blocks.
+        :param event: Event to be queued.
+        :return: None
+        """
+        signal = event.signal()
+        policy = self.__policies[signal]
+        lane = self.__priorities[signal]
+
+        with self.__condition:
+            key = event.coalescing_key() if policy == self.Policy.COALESCE else None
+            slot = self.__pending.get(key) if key is not None else None
+            if slot is not None:
+                # Replace the event in its slot, so the lane doesn't grow while the consumer is stalled
+                slot[0] = event
+                self.__coalesced[signal].increment()
+                self.__coalesced_total += 1
+            elif policy == self.Policy.DROP and self.__size >= self.__maxsize:
+                self.__dropped[signal].increment()
+                LOG.warning("Event queue is full, dropped %s.", event)
+                return
+            else:
+                slot = [event, time.monotonic()]
+                self.__lanes[lane].append(slot)
+                self.__lane_sizes[lane] += 1
+                self.__size += 1
+                if key is not None:
+                    self.__pending[key] = slot
+                self.__depth.set(self.__size)
+                self.__condition.notify()
+
+        record_latency(Stage.ENQUEUE, event)
+        if self.__put_callback:
+            self.__put_callback()
+
+    def set_put_callback(self, callback: Optional[Callable[[], None]]) -> None:
+        """
+        Set a function called from the producing thread after an event has been queued, e.g. to wake up a consumer
+        which doesn't block on the queue.
+        :param callback: Function to be called or None.
+        :return: None
+        """
+        self.__put_callback = callback
+
+    def __select_lane(self) -> int:
+        """
+        Select the lane to be served next. The queue must not be empty.
+        :return: Lane index.
+        """
+        selected = None
+        for lane, lane_size in enumerate(self.__lane_sizes):
+            if not lane_size:
+                continue
+            if selected is None:
+                selected = lane
+            elif self.__bypassed[lane] >= self.__starvation_limit:
+                # Serve the starving lane first
+                self.__promotions[lane].increment()
+                selected = lane
+                break
+
+        for lane in range(selected + 1, len(self.__lanes)):
+            if self.__lane_sizes[lane]:
+                self.__bypassed[lane] += 1
+        self.__bypassed[selected] = 0
+        return selected
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Event:
+        """
+        Remove and return the next event from the queue.
+        :param block: True to wait for an event if the queue is empty, False to return immediately.
+        :param timeout: Maximum number of seconds to wait or None to wait forever.
+        :return: Next event.
+        :raise: queue.Empty if no event is available.
+        """
+        with self.__condition:
+            if block:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while self.__size == 0:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise Empty
+                    self.__condition.wait(remaining)
+            elif self.__size == 0:
+                raise Empty
+
+            lane = self.__select_lane()
+            slot = self.__lanes[lane].popleft()
+
+            event, queued = slot
+            key = event.coalescing_key()
+            if self.__pending.get(key) is slot:
+                del self.__pending[key]
+            self.__lane_sizes[lane] -= 1
+            self.__size -= 1
+            self.__depth.set(self.__size)
+
+        self.__waits[lane].observe(time.monotonic() - queued)
+        return event
+
+    def get_nowait(self) -> Event:
+        """
+        Remove and return the next event from the queue without blocking.
+        :return: Next event.
+        :raise: queue.Empty if no event is available.
+        """
+        return self.get(False)
+
+    def qsize(self) -> int:
+        """
+        Get the number of queued events.
+        :return: Number of queued events.
+        """
+        return self.__size
+
+    def coalesced(self) -> int:
+        """
+        Get the number of events superseded by newer events with the same coalescing key.
+        :return: Number of coalesced events.
+        """
+        return self.__coalesced_total
+
+    def empty(self) -> bool:
+        """
+        Check if the queue is empty.
+        :return: True if the queue is empty, False otherwise.
+        """
+        return self.__size == 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
@@ -7,12 +7,13 @@
 import logging
 import sys
 
-from enum import Enum
+from enum import IntEnum
 
 
-class Signal(Enum):
+class Signal(IntEnum):
     """
-    Class encapsulating all signals used in the application.
+    Class encapsulating all signals used in the application. Signals are integers so they can directly index
+    per-signal lookup tables.
     """
     TERMINATE = 1
     BUTTON_PRESSED = 2
@@ -22,6 +23,21 @@ class Signal(Enum):
     DISPLAY_POWER_CONTROL = 6
     SLIDESHOW_CONTROL = 7
     NOTIFY = 8
+    CONFIG_CHANGED = 9
+    CAMERA_STREAM_PREWARM = 10
+    PROCESS_RESTART = 11
+    PICTURE_LIST_READY = 12
+
+    def __str__(self) -> str:
+        """
+        String representation of this object.
+        :return: String representation.
+        """
+        return f"Signal.{self.name}"
+
+
+# Size of lookup tables indexed by signals
+SIGNAL_TABLE_SIZE = max(Signal) + 1
 
 
 if __name__ == "__main__":
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+"""
+        Fake player speaking the subset of the mpv JSON IPC protocol used by the mpv player backend, e.g. to test the
+        backend without a display. Streams are not opened, loading a stream only produces the events of the player.
+"""
+
+import argparse
+import json
+import logging
+import os
+import select
+import socket
+import time
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# Define the logger
+LOG = logging.getLogger(os.path.basename(__file__).split('.')[0])
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse the command line arguments, options of mpv which are not listed are ignored.
+    :return: Parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Fake player speaking the subset of the mpv JSON IPC protocol used by the mpv player backend.\n"
+                    "Other mpv options are accepted and ignored.",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--input-ipc-server", metavar="PATH", action="store", required=True,
+                        help="path of the IPC socket")
+    parser.add_argument("--fake-open-delay", metavar="SECONDS", action="store", type=float, default=0.2,
+                        help="time until a loaded stream shows its first frame (default: %(default)s)")
+    arguments, _ = parser.parse_known_args()
+    return arguments
+
+
+class FakePlayer:
+    """
+    Class emulating an idle mpv instance controlled via its IPC socket.
+    """
+    def __init__(self, socket_path: str, open_delay: float):
+        """
+        Class constructor.
+        :param socket_path: Path of the IPC socket.
+        :param open_delay: Time in seconds until a loaded stream shows its first frame.
+        """
+        self.__socket_path = socket_path
+        self.__open_delay = open_delay
+        self.__properties: Dict[str, Any] = {"vid": "auto", "geometry": "", "path": None, "idle-active": True}
+        self.__clients: List[socket.socket] = []
+        self.__buffers: Dict[socket.socket, bytes] = {}
+        # Scheduled events (monotonic time, event message) and sequence number of the loaded stream
+        self.__scheduled: List[Tuple[float, int, Dict[str, Any]]] = []
+        self.__load_sequence = 0
+        self.__running = True
+
+    def __send(self, message: Dict[str, Any], client: Optional[socket.socket] = None) -> None:
+        """
+        Send a message to a client or to all clients.
+        :param message: Message.
+        :param client: Client or None to send the message to all clients.
+        :return: None
+        """
+        data = (json.dumps(message) + "\n").encode()
+        for receiver in [client] if client else list(self.__clients):
+            try:
+                receiver.sendall(data)
+            except OSError:
+                self.__disconnect(receiver)
+
+    def __schedule(self, delay: float, message: Dict[str, Any]) -> None:
+        """
+        Schedule an event of the loaded stream, it is dropped if another stream is loaded meanwhile.
+        :param delay: Delay in seconds.
+        :param message: Event message.
+        :return: None
+        """
+        self.__scheduled.append((time.monotonic() + delay, self.__load_sequence, message))
+        self.__scheduled.sort(key=lambda entry: entry[0])
+
+    # pylint: disable=too-many-return-statements
+    def __execute(self, command: List[Any]) -> Tuple[str, Any]:
+        """
+        Execute a command.
+        :param command: Command name and arguments.
+        :return: Tuple consisting of the error string ("success" if the command succeeded) and the reply data.
+        """
+        name, args = command[0], command[1:]
+        loaded = self.__properties["path"] is not None
+        if name == "get_property" and len(args) == 1:
+            if args[0] not in self.__properties:
+                return "property unavailable", None
+            return "success", self.__properties[args[0]]
+        if name == "set_property" and len(args) == 2:
+            if args[0] == "vid" and loaded and args[1] != self.__properties["vid"]:
+                self.__schedule(0 if args[1] == "no" else self.__open_delay / 2, {"event": "video-reconfig"})
+            self.__properties[args[0]] = args[1]
+            return "success", None
+        if name == "loadfile" and args:
+            self.__load_sequence += 1
+            self.__properties.update({"path": args[0], "idle-active": False})
+            self.__send({"event": "start-file"})
+            self.__schedule(self.__open_delay / 2, {"event": "file-loaded"})
+            if self.__properties["vid"] != "no":
+                self.__schedule(self.__open_delay, {"event": "video-reconfig"})
+            self.__schedule(self.__open_delay, {"event": "playback-restart"})
+            return "success", None
+        if name == "stop":
+            if loaded:
+                self.__load_sequence += 1
+                self.__properties.update({"path": None, "idle-active": True})
+                self.__send({"event": "end-file", "reason": "stop"})
+                self.__send({"event": "idle"})
+            return "success", None
+        if name == "quit":
+            self.__running = False
+            return "success", None
+        if name in ("observe_property", "client_name"):
+            return "success", None
+        return "invalid parameter", None
+
+    def __handle_line(self, client: socket.socket, line: bytes) -> None:
+        """
+        Handle a line received from a client.
+        :param client: Client.
+        :param line: JSON encoded command.
+        :return: None
+        """
+        try:
+            message = json.loads(line)
+            command = message["command"]
+        except (ValueError, KeyError, TypeError):
+            self.__send({"error": "invalid parameter"}, client)
+            return
+
+        LOG.debug("Received command %s.", json.dumps(command))
+        error, data = self.__execute(command)
+        reply = {"error": error, "data": data}
+        if "request_id" in message:
+            reply["request_id"] = message["request_id"]
+        self.__send(reply, client)
+
+    def __disconnect(self, client: socket.socket) -> None:
+        """
+        Disconnect a client.
+        :param client: Client.
+        :return: None
+        """
+        if client in self.__clients:
+            self.__clients.remove(client)
+            del self.__buffers[client]
+            client.close()
+
+    def run(self) -> None:
+        """
+        Serve the IPC socket until the player quits or its parent process has exited.
+        :return: None
+        """
+        parent = os.getppid()
+        if os.path.exists(self.__socket_path):
+            os.unlink(self.__socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.__socket_path)
+        server.listen()
+        LOG.info("Fake player listening on %s.", self.__socket_path)
+
+        try:
+            while self.__running and os.getppid() == parent:
+                timeout = 1.0
+                if self.__scheduled:
+                    timeout = max(0.0, min(timeout, self.__scheduled[0][0] - time.monotonic()))
+                readable, _, _ = select.select([server] + self.__clients, [], [], timeout)
+                for connection in readable:
+                    if connection is server:
+                        client, _ = server.accept()
+                        self.__clients.append(client)
+                        self.__buffers[client] = b""
+                        continue
+                    data = connection.recv(4096)
+                    if not data:
+                        self.__disconnect(connection)
+                        continue
+                    self.__buffers[connection] += data
+                    while connection in self.__buffers and b"\n" in self.__buffers[connection]:
+                        line, self.__buffers[connection] = self.__buffers[connection].split(b"\n", 1)
+                        self.__handle_line(connection, line)
+
+                while self.__scheduled and self.__scheduled[0][0] <= time.monotonic():
+                    _, sequence, message = self.__scheduled.pop(0)
+                    if sequence == self.__load_sequence:
+                        self.__send(message)
+        finally:
+            for client in list(self.__clients):
+                self.__disconnect(client)
+            server.close()
+            os.unlink(self.__socket_path)
+
+
+def main() -> None:
+    """
+    Main entry point.
+    :return: None
+    """
+    arguments = parse_arguments()
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=logging.INFO)
+    FakePlayer(arguments.input_ipc_server, arguments.fake_open_delay).run()
+
+
+if __name__ == "__main__":
+    main()
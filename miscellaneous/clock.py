@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the clocks used to read the time and to sleep.
+"""
+
+import datetime
+import logging
+import sys
+import time
+
+from threading import Lock
+
+
+class Clock:
+    """
+    Class defining the real clock.
+    """
+    # pylint: disable=no-self-use
+    def time(self) -> float:
+        """
+        Get the wall clock time.
+        :return: Seconds since the epoch.
+        """
+        return time.time()
+
+    # pylint: disable=no-self-use
+    def monotonic(self) -> float:
+        """
+        Get the monotonic time, used to measure durations.
+        :return: Seconds since an arbitrary reference point.
+        """
+        return time.monotonic()
+
+    # pylint: disable=no-self-use
+    def now(self) -> datetime.datetime:
+        """
+        Get the local date and time.
+        :return: Local date and time.
+        """
+        return datetime.datetime.now()
+
+    # pylint: disable=no-self-use
+    def sleep(self, seconds: float) -> None:
+        """
+        Block the calling thread.
+        :param seconds: Number of seconds to sleep.
+        :return: None
+        """
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    Class defining a virtual clock which only advances when told to, e.g. to simulate days within seconds. Sleeping
+    advances the clock immediately instead of blocking.
+    """
+    def __init__(self, start: datetime.datetime):
+        """
+        Class constructor.
+        :param start: Local date and time the clock starts at.
+        """
+        self.__lock = Lock()
+        self.__start = start.timestamp()
+        self.__elapsed = 0.0
+        super().__init__()
+
+    def time(self) -> float:
+        """
+        Get the wall clock time.
+        :return: Seconds since the epoch.
+        """
+        return self.__start + self.__elapsed
+
+    def monotonic(self) -> float:
+        """
+        Get the monotonic time, used to measure durations.
+        :return: Seconds since the start of the clock.
+        """
+        return self.__elapsed
+
+    def now(self) -> datetime.datetime:
+        """
+        Get the local date and time.
+        :return: Local date and time.
+        """
+        return datetime.datetime.fromtimestamp(self.__start + self.__elapsed)
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Advance the clock instead of blocking.
+        :param seconds: Number of seconds to sleep.
+        :return: None
+        """
+        self.advance(seconds)
+
+    def advance(self, seconds: float) -> None:
+        """
+        Advance the clock.
+        :param seconds: Number of seconds to advance the clock by.
+        :return: None
+        """
+        assert seconds >= 0
+        with self.__lock:
+            self.__elapsed += seconds
+
+    def advance_to(self, monotonic: float) -> None:
+        """
+        Advance the clock to the given monotonic time (if it is in the future).
+        :param monotonic: Monotonic time to advance the clock to.
+        :return: None
+        """
+        with self.__lock:
+            self.__elapsed = max(self.__elapsed, monotonic)
+
+
+# Clock used if none is given explicitly
+REAL_CLOCK = Clock()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing a minimal Linux framebuffer wrapper used to draw directly to the screen.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import mmap
+import os
+import re
+import stat
+import struct
+import sys
+
+from typing import Optional, Tuple
+
+# ioctl requests of the framebuffer device, see linux/fb.h
+_FBIOGET_VSCREENINFO = 0x4600
+_FBIOGET_FSCREENINFO = 0x4602
+
+# Start of struct fb_var_screeninfo: resolution, virtual resolution, offset, bits per pixel, grayscale and the bit
+# fields (offset, length, msb_right) of red, green, blue and transparency
+_VAR_SCREENINFO = struct.Struct("=8I12I")
+_VAR_SCREENINFO_SIZE = 160
+
+# Start of struct fb_fix_screeninfo up to the line length (native alignment of unsigned long)
+_FIX_SCREENINFO = struct.Struct("@16sLIIIIHHHI")
+_FIX_SCREENINFO_SIZE = 128
+
+# Bit fields (offset, length) of red, green, blue and transparency of the default pixel formats by bits per pixel
+_DEFAULT_FORMATS = {
+    16: ((11, 5), (5, 6), (0, 5), (0, 0)),
+    24: ((16, 8), (8, 8), (0, 8), (0, 0)),
+    32: ((16, 8), (8, 8), (0, 8), (24, 8)),
+}
+
+
+class FramebufferGeometry:
+    """
+    Class describing the visible area and the pixel format of a framebuffer.
+    """
+    __slots__ = ("width", "height", "bits_per_pixel", "line_length", "red", "green", "blue", "transparency")
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, width: int, height: int, bits_per_pixel: int, line_length: Optional[int] = None,
+                 bit_fields: Optional[Tuple[Tuple[int, int], ...]] = None):
+        """
+        Class constructor.
+        :param width: Width in pixels.
+        :param height: Height in pixels.
+        :param bits_per_pixel: Bits per pixel (16, 24 or 32).
+        :param line_length: Number of bytes per line or None for lines without padding.
+        :param bit_fields: Bit fields (offset, length) of red, green, blue and transparency or None for the default
+                           format of the bits per pixel (RGB565, BGR888 or BGRA8888 in memory).
+        :raise: ValueError if the pixel format is unsupported.
+        """
+        if bits_per_pixel not in _DEFAULT_FORMATS:
+            raise ValueError(f"Unsupported framebuffer format with {bits_per_pixel} bits per pixel")
+        self.width = width
+        self.height = height
+        self.bits_per_pixel = bits_per_pixel
+        self.line_length = line_length or width * bits_per_pixel // 8
+        self.red, self.green, self.blue, self.transparency = bit_fields or _DEFAULT_FORMATS[bits_per_pixel]
+        if bits_per_pixel != 16 and any(offset % 8 or length not in (0, 8) for offset, length in
+                                        (self.red, self.green, self.blue, self.transparency)):
+            raise ValueError(f"Unsupported framebuffer format with {bits_per_pixel} bits per pixel")
+
+    @classmethod
+    def parse(cls, geometry: str) -> FramebufferGeometry:
+        """
+        Parse a geometry in the default pixel format.
+        :param geometry: Geometry in the format <width>x<height>x<bits per pixel>, e.g. "1920x1080x32".
+        :return: Framebuffer geometry.
+        :raise: ValueError if the geometry is invalid.
+        """
+        match = re.fullmatch(r"(\d+)x(\d+)x(\d+)", geometry)
+        if not match:
+            raise ValueError(f"Invalid framebuffer geometry {geometry}")
+        return cls(*(int(value) for value in match.groups()))
+
+    def size(self) -> int:
+        """
+        Get the size of the visible area.
+        :return: Size in bytes.
+        """
+        return self.line_length * self.height
+
+    def __str__(self) -> str:
+        """
+        Get a readable description of the geometry.
+        :return: Description.
+        """
+        return f"{self.width}x{self.height}x{self.bits_per_pixel}"
+
+
+class Framebuffer:
+    """
+    Class mapping the visible area of a framebuffer device into memory. A regular file can stand in for the device,
+    e.g. for tests, it is extended to the size of the visible area.
+    """
+    def __init__(self, path: str, geometry: Optional[FramebufferGeometry] = None):
+        """
+        Class constructor.
+        :param path: Path to the framebuffer device (e.g. /dev/fb0) or to a regular file, created if it doesn't exist.
+        :param geometry: Geometry of a regular file or None to read the geometry of the device.
+        :raise: OSError if the framebuffer cannot be opened or mapped, ValueError if its format is unsupported.
+        """
+        self.__path = path
+        self.__fd = os.open(path, os.O_RDWR | os.O_CLOEXEC | (os.O_CREAT if geometry else 0), 0o644)
+        try:
+            offset = 0
+            if stat.S_ISREG(os.fstat(self.__fd).st_mode):
+                if geometry is None:
+                    raise OSError(f"{path} is no framebuffer device, its geometry must be given")
+                if os.fstat(self.__fd).st_size < geometry.size():
+                    os.ftruncate(self.__fd, geometry.size())
+            else:
+                geometry, offset = self.__read_geometry()
+            self.__geometry = geometry
+            self.__offset = offset
+            self.__map = mmap.mmap(self.__fd, offset + geometry.size(), mmap.MAP_SHARED,
+                                   mmap.PROT_READ | mmap.PROT_WRITE)
+        except (OSError, ValueError):
+            os.close(self.__fd)
+            raise
+
+    def __read_geometry(self) -> Tuple[FramebufferGeometry, int]:
+        """
+        Read the geometry of the framebuffer device.
+        :return: Tuple consisting of the geometry and the offset of the visible area in bytes.
+        :raise: OSError if the device is no framebuffer, ValueError if its format is unsupported.
+        """
+        variable = bytearray(_VAR_SCREENINFO_SIZE)
+        fixed = bytearray(_FIX_SCREENINFO_SIZE)
+        fcntl.ioctl(self.__fd, _FBIOGET_VSCREENINFO, variable)
+        fcntl.ioctl(self.__fd, _FBIOGET_FSCREENINFO, fixed)
+        width, height, _, _, x_offset, y_offset, bits_per_pixel, _, *fields = _VAR_SCREENINFO.unpack_from(variable)
+        line_length = _FIX_SCREENINFO.unpack_from(fixed)[-1]
+        bit_fields = tuple((fields[index], fields[index + 1]) for index in range(0, 12, 3))
+        geometry = FramebufferGeometry(width, height, bits_per_pixel, line_length, bit_fields)
+        return geometry, y_offset * line_length + x_offset * bits_per_pixel // 8
+
+    def geometry(self) -> FramebufferGeometry:
+        """
+        Get the geometry of the framebuffer.
+        :return: Framebuffer geometry.
+        """
+        return self.__geometry
+
+    def path(self) -> str:
+        """
+        Get the path of the framebuffer.
+        :return: Path to the framebuffer device or file.
+        """
+        return self.__path
+
+    def blit(self, frame: memoryview, first_line: int = 0, last_line: Optional[int] = None) -> None:
+        """
+        Copy lines of a frame in the pixel format of the framebuffer to the same lines of the visible area, no further
+        copy of the frame is made.
+        :param frame: Frame covering the visible area.
+        :param first_line: First copied line.
+        :param last_line: Line after the last copied line or None for the last line of the visible area.
+        :return: None
+        """
+        start = first_line * self.__geometry.line_length
+        end = (self.__geometry.height if last_line is None else last_line) * self.__geometry.line_length
+        self.__map[self.__offset + start:self.__offset + end] = frame[start:end]
+
+    def clear(self) -> None:
+        """
+        Fill the visible area with black.
+        :return: None
+        """
+        self.blit(memoryview(bytes(self.__geometry.size())))
+
+    def close(self) -> None:
+        """
+        Unmap and close the framebuffer.
+        :return: None
+        """
+        self.__map.close()
+        os.close(self.__fd)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
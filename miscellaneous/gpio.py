@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+"""
+        Module providing access to the GPIOs, either through RPi.GPIO or through a fake GPIO implementation.
+"""
+
+import logging
+import sys
+
+from typing import Callable, Dict
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+def load_gpio():
+    """
+    Load the RPi.GPIO module. It is only imported when needed so that the application can be used without GPIOs (e.g.
+    in simulations) on machines that lack the module.
+    :return: RPi.GPIO module.
+    :raise: ImportError if the module is unavailable.
+    """
+    from RPi import GPIO    # pylint: disable=import-error,import-outside-toplevel
+    return GPIO
+
+
+class FakeGPIO:
+    """
+    Class implementing the subset of the RPi.GPIO interface used by the application. Input levels are set with
+    set_input() which calls the registered edge detection callbacks like the real module does.
+    """
+    # Constants
+    BOARD = 10
+    IN = 1
+    PUD_OFF = 20
+    BOTH = 33
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__levels: Dict[int, int] = {}
+        self.__callbacks: Dict[int, Callable[[int], None]] = {}
+
+    # pylint: disable=no-self-use
+    def setmode(self, mode: int) -> None:
+        """
+        Set the channel numbering mode.
+        :param mode: Numbering mode.
+        :return: None
+        """
+        LOG.debug("Fake GPIO mode set to %d.", mode)
+
+    def setup(self, channel: int, direction: int, pull_up_down: int = PUD_OFF) -> None:
+        """
+        Configure a channel.
+        :param channel: Channel number.
+        :param direction: Channel direction.
+        :param pull_up_down: Pull up/down resistor configuration.
+        :return: None
+        """
+        assert direction == self.IN
+        assert pull_up_down == self.PUD_OFF
+        self.__levels[channel] = self.LOW
+
+    def add_event_detect(self, channel: int, edge: int, callback: Callable[[int], None]) -> None:
+        """
+        Register a callback called upon edges of an input channel.
+        :param channel: Channel number.
+        :param edge: Edges to be detected.
+        :param callback: Function called with the channel number.
+        :return: None
+        """
+        assert edge == self.BOTH
+        self.__callbacks[channel] = callback
+
+    def input(self, channel: int) -> int:
+        """
+        Read the level of an input channel.
+        :param channel: Channel number.
+        :return: Channel level.
+        """
+        return self.__levels[channel]
+
+    def cleanup(self) -> None:
+        """
+        Reset all channels.
+        :return: None
+        """
+        self.__levels.clear()
+        self.__callbacks.clear()
+
+    def set_input(self, channel: int, level: int) -> None:
+        """
+        Set the level of an input channel and call the edge detection callback if the level has changed.
+        :param channel: Channel number.
+        :param level: New channel level.
+        :return: None
+        """
+        if self.__levels[channel] != level:
+            self.__levels[channel] = level
+            callback = self.__callbacks.get(channel)
+            if callback:
+                callback(channel)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
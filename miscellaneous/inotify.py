@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing a minimal inotify wrapper used to watch files and directories for changes.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+
+from typing import List, Tuple
+
+# inotify flags, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# inotify_init1() flags
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+# Event header (watch descriptor, mask, cookie and length of the name)
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Class wrapping a non-blocking inotify file descriptor, which can be waited for with select().
+    """
+    def __init__(self):
+        """
+        Class constructor.
+        :raise: OSError if inotify is unavailable.
+        """
+        try:
+            self.__libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            self.__fd = self.__libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except AttributeError as exception:
+            raise OSError(f"inotify is unavailable ({exception})") from exception
+        if self.__fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+
+    def fileno(self) -> int:
+        """
+        Get the inotify file descriptor.
+        :return: File descriptor.
+        """
+        return self.__fd
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """
+        Start watching a file or directory, watching it again returns the same watch descriptor.
+        :param path: Path to the file or directory.
+        :param mask: inotify flags of the events to be reported.
+        :return: Watch descriptor.
+        :raise: OSError if the path cannot be watched, e.g. because it doesn't exist or the watch limit is reached.
+        """
+        watch_descriptor = self.__libc.inotify_add_watch(self.__fd, os.fsencode(path), mask)
+        if watch_descriptor < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()), path)
+        return watch_descriptor
+
+    def remove_watch(self, watch_descriptor: int) -> None:
+        """
+        Stop watching a file or directory, errors (e.g. of a watch already removed by the kernel) are ignored.
+        :param watch_descriptor: Watch descriptor.
+        :return: None
+        """
+        self.__libc.inotify_rm_watch(self.__fd, watch_descriptor)
+
+    def read(self) -> List[Tuple[int, int, str]]:
+        """
+        Read all pending events without blocking.
+        :return: List of events consisting of watch descriptor, mask and name (empty for the watched path itself).
+        """
+        events = []
+        while True:
+            try:
+                buffer = os.read(self.__fd, 65536)
+            except BlockingIOError:
+                return events
+
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(buffer):
+                watch_descriptor, mask, _, name_length = _INOTIFY_EVENT.unpack_from(buffer, offset)
+                offset += _INOTIFY_EVENT.size
+                name = os.fsdecode(buffer[offset:offset + name_length].rstrip(b"\0"))
+                offset += name_length
+                events.append((watch_descriptor, mask, name))
+
+    def close(self) -> None:
+        """
+        Close the inotify file descriptor, removing all watches.
+        :return: None
+        """
+        os.close(self.__fd)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
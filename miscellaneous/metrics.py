@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing runtime metrics (counters, gauges and histograms) and their registry.
+"""
+
+import logging
+import sys
+
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+# Default histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """
+    Class defining a monotonically increasing counter.
+    """
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__value = 0
+        self.__lock = Lock()
+
+    def increment(self, amount: int = 1) -> None:
+        """
+        Increment the counter.
+        :param amount: Amount to increment the counter by.
+        :return: None
+        """
+        with self.__lock:
+            self.__value += amount
+
+    def value(self) -> int:
+        """
+        Get the counter value.
+        :return: Counter value.
+        """
+        return self.__value
+
+
+class Gauge:
+    """
+    Class defining a gauge, i.e. a value which can go up and down.
+    """
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__value = 0
+
+    def set(self, value: float) -> None:
+        """
+        Set the gauge value.
+        :param value: New value.
+        :return: None
+        """
+        self.__value = value
+
+    def value(self) -> float:
+        """
+        Get the gauge value.
+        :return: Gauge value.
+        """
+        return self.__value
+
+
+class Histogram:
+    """
+    Class defining a histogram with fixed bucket upper bounds.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Class constructor.
+        :param buckets: Sorted bucket upper bounds (included).
+        """
+        self.__bounds = buckets
+        self.__counts = [0] * (len(buckets) + 1)
+        self.__count = 0
+        self.__sum = 0.0
+        self.__maximum = 0.0
+        self.__lock = Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Record a value.
+        :param value: Value to be recorded.
+        :return: None
+        """
+        index = 0
+        while index < len(self.__bounds) and value > self.__bounds[index]:
+            index += 1
+
+        with self.__lock:
+            self.__counts[index] += 1
+            self.__count += 1
+            self.__sum += value
+            self.__maximum = max(self.__maximum, value)
+
+    def count(self) -> int:
+        """
+        Get the number of recorded values.
+        :return: Number of recorded values.
+        """
+        return self.__count
+
+    def sum(self) -> float:
+        """
+        Get the sum of all recorded values.
+        :return: Sum of all recorded values.
+        """
+        return self.__sum
+
+    def maximum(self) -> float:
+        """
+        Get the largest recorded value.
+        :return: Largest recorded value or 0 if no value has been recorded.
+        """
+        return self.__maximum
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """
+        Get the cumulative bucket counts.
+        :return: List of tuples consisting of bucket upper bound and number of values less or equal than the bound.
+        """
+        buckets = []
+        cumulative = 0
+        with self.__lock:
+            for bound, count in zip(self.__bounds + (float("inf"),), self.__counts):
+                cumulative += count
+                buckets.append((bound, cumulative))
+        return buckets
+
+
+class MetricsRegistry:
+    """
+    Class holding all metrics of the application.
+    """
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__metrics = {}
+        self.__lock = Lock()
+
+    @staticmethod
+    def __key(name: str, labels: Optional[Dict[str, str]]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+        """
+        Get the registry key of a metric.
+        :param name: Metric name.
+        :param labels: Metric labels or None.
+        :return: Registry key.
+        """
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def __get(self, metric_type: type, name: str, labels: Optional[Dict[str, str]], *args):
+        """
+        Get a metric, creating it if it doesn't exist yet.
+        :param metric_type: Metric class.
+        :param name: Metric name.
+        :param labels: Metric labels or None.
+        :param args: Arguments passed to the metric constructor.
+        :return: Metric instance.
+        """
+        key = self.__key(name, labels)
+        with self.__lock:
+            metric = self.__metrics.get(key)
+            if metric is None:
+                metric = metric_type(*args)
+                self.__metrics[key] = metric
+        assert isinstance(metric, metric_type)
+        return metric
+
+    def counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> Counter:
+        """
+        Get a counter.
+        :param name: Metric name.
+        :param labels: Metric labels or None.
+        :return: Counter instance.
+        """
+        return self.__get(Counter, name, labels)
+
+    def gauge(self, name: str, labels: Optional[Dict[str, str]] = None) -> Gauge:
+        """
+        Get a gauge.
+        :param name: Metric name.
+        :param labels: Metric labels or None.
+        :return: Gauge instance.
+        """
+        return self.__get(Gauge, name, labels)
+
+    def histogram(self, name: str, labels: Optional[Dict[str, str]] = None,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """
+        Get a histogram.
+        :param name: Metric name.
+        :param labels: Metric labels or None.
+        :param buckets: Sorted bucket upper bounds, only used if the histogram doesn't exist yet.
+        :return: Histogram instance.
+        """
+        return self.__get(Histogram, name, labels, buckets)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+        :return: Rendered metrics.
+        """
+        def format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+            return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}" if labels else ""
+
+        with self.__lock:
+            metrics = sorted(self.__metrics.items(), key=lambda item: item[0])
+
+        lines = []
+        for (name, labels), metric in metrics:
+            if isinstance(metric, Histogram):
+                for bound, count in metric.buckets():
+                    bucket_labels = labels + (("le", "+Inf" if bound == float("inf") else f"{bound:g}"),)
+                    lines.append(f"{name}_bucket{format_labels(bucket_labels)} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {metric.sum():.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {metric.count()}")
+                lines.append(f"{name}_max{format_labels(labels)} {metric.maximum():.6f}")
+            else:
+                lines.append(f"{name}{format_labels(labels)} {metric.value()}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Registry used by the application
+REGISTRY = MetricsRegistry()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
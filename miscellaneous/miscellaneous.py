@@ -5,13 +5,24 @@
 """
 
 import logging
+import os
 import sys
 
+from typing import Tuple
+
 import psutil
 
 # Define the logger
 LOG = logging.getLogger(__name__)
 
+# File containing the screen size and size used if it cannot be read
+_SCREEN_SIZE_FILE = "/sys/class/graphics/fb0/virtual_size"
+_DEFAULT_SCREEN_SIZE = (1920, 1080)
+
+# Mount table and types of network file systems
+_MOUNTS_FILE = "/proc/mounts"
+_NETWORK_FILESYSTEMS = ("9p", "afs", "ceph", "cifs", "fuse.sshfs", "glusterfs", "nfs", "nfs4", "smb3", "smbfs")
+
 
 def terminate_process(pid: int) -> None:
     """
@@ -39,6 +50,45 @@ def terminate_process(pid: int) -> None:
         parent.kill()
 
 
+def read_screen_size() -> Tuple[int, int]:
+    """
+    Read the size of the screen from the framebuffer.
+    :return: Tuple consisting of width and height in pixels, 1920x1080 if the size cannot be read.
+    """
+    try:
+        with open(_SCREEN_SIZE_FILE, "r", encoding="utf-8") as size_file:
+            width, height = (int(value) for value in size_file.read().strip().split(","))
+            return width, height
+    except (OSError, ValueError):
+        return _DEFAULT_SCREEN_SIZE
+
+
+
+def is_network_filesystem(path: str) -> bool:
+    """
+    Check if a path is on a network file system (e.g. an NFS or SMB share), whose remote changes are not reported by
+    inotify. Resolving the path may block while the share is unreachable.
+    :param path: Path to be checked.
+    :return: True if the path is on a network file system, False otherwise or if the mount table cannot be read.
+    """
+    path = os.path.realpath(path)
+    mount_point, filesystem = "", None
+    try:
+        with open(_MOUNTS_FILE, "r", encoding="utf-8", errors="replace") as mounts_file:
+            for line in mounts_file:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces in mount points are escaped
+                candidate = fields[1].replace("\\040", " ")
+                if (path == candidate or path.startswith(candidate.rstrip("/") + "/")) and \
+                        len(candidate) >= len(mount_point):
+                    mount_point, filesystem = candidate, fields[2]
+    except OSError:
+        return False
+    return filesystem in _NETWORK_FILESYSTEMS
+
+
 if __name__ == "__main__":
     logging.basicConfig(format="%(levelname)s: %(message)s")
     logging.critical("This module cannot be executed.")
@@ -0,0 +1,738 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the process launchers used to spawn, run and terminate external processes.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import sys
+
+from asyncio.subprocess import Process as AsyncProcess
+from collections import deque
+from threading import Thread
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+from miscellaneous.miscellaneous import terminate_process
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class ProcessHandle:
+    """
+    Class defining the handle of a spawned process. The latest lines of the process output are kept for diagnostics.
+    """
+    # Number of kept output lines
+    OUTPUT_LINES = 50
+
+    # Flag indicating whether the process has been suspended
+    __suspended = False
+
+    def __init__(self, process: subprocess.Popen):
+        """
+        Class constructor.
+        :param process: Spawned process.
+        """
+        self.__process = process
+        self.__output = deque(maxlen=self.OUTPUT_LINES)
+
+    def append_output(self, line: str) -> None:
+        """
+        Keep a line of the process output, the oldest line is discarded once OUTPUT_LINES lines are kept.
+        :param line: Output line.
+        :return: None
+        """
+        self.__output.append(line)
+
+    def output(self) -> List[str]:
+        """
+        Get the latest lines of the process output.
+        :return: List of output lines, oldest first.
+        """
+        return list(self.__output)
+
+    def pid(self) -> Optional[int]:
+        """
+        Get the PID of the process.
+        :return: PID or None if the process hasn't been spawned yet.
+        """
+        return self.__process.pid
+
+    def is_running(self) -> bool:
+        """
+        Check if the process is running (or about to be spawned).
+        :return: True if the process is running, False otherwise.
+        """
+        return self.__process.poll() is None
+
+    def set_suspended(self, suspended: bool) -> None:
+        """
+        Mark the process as suspended or resumed.
+        :param suspended: True if the process has been suspended, False if it has been resumed.
+        :return: None
+        """
+        self.__suspended = suspended
+
+    def is_suspended(self) -> bool:
+        """
+        Check if the process has been suspended.
+        :return: True if the process is suspended, False otherwise.
+        """
+        return self.__suspended
+
+
+class ProcessLauncher:
+    """
+    Class spawning, running and terminating processes from the calling thread. Spawning doesn't block, the output and
+    exit of a spawned process are reported by its reader thread. Running a process to completion and terminating a
+    process block the calling thread until the operation has finished.
+    """
+    def spawn(self, args: List[str], on_spawned: Optional[Callable[[], None]] = None,
+              on_output: Optional[Callable[[str], None]] = None,
+              on_exited: Optional[Callable[[int], None]] = None) -> ProcessHandle:
+        """
+        Spawn a process running in the background. Its standard and error output are drained by a reader thread, so
+        the process never blocks on a full pipe.
+        :param args: Command line of the process.
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_output: Function called with each output line of the process (from the reader thread) or None.
+        :param on_exited: Function called with the return code after the process has exited (from the reader thread)
+                          or None.
+        :return: Process handle.
+        """
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True,
+                                   errors="replace")
+        handle = ProcessHandle(process)
+        if on_spawned:
+            on_spawned()
+        Thread(target=self.__drain_output, args=(process, handle, on_output, on_exited), daemon=True).start()
+        return handle
+
+    @staticmethod
+    def __drain_output(process: subprocess.Popen, handle: ProcessHandle, on_output: Optional[Callable[[str], None]],
+                       on_exited: Optional[Callable[[int], None]]) -> None:
+        """
+        Read the output of a process until it has exited.
+        :param process: Spawned process.
+        :param handle: Process handle keeping the output.
+        :param on_output: Function called with each output line or None.
+        :param on_exited: Function called with the return code after the process has exited or None.
+        :return: None
+        """
+        with process.stdout:
+            for line in process.stdout:
+                line = line.rstrip("\n")
+                handle.append_output(line)
+                if on_output:
+                    on_output(line)
+        return_code = process.wait()
+        if on_exited:
+            on_exited(return_code)
+
+    # pylint: disable=no-self-use
+    def run(self, args: List[str], input_text: Optional[str] = None, on_spawned: Optional[Callable[[], None]] = None,
+            on_completed: Optional[Callable[[int], None]] = None) -> None:
+        """
+        Run a process until it has completed. Its error output is logged.
+        :param args: Command line of the process.
+        :param input_text: Text passed to the standard input of the process or None.
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_completed: Function called with the return code after the process has completed or None.
+        :return: None
+        """
+        process = subprocess.Popen(args, stdin=subprocess.PIPE if input_text is not None else subprocess.DEVNULL,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        if on_spawned:
+            on_spawned()
+        _, stderr = process.communicate(input_text)
+        if stderr:
+            LOG.error(stderr)
+        if on_completed:
+            on_completed(process.returncode)
+
+    # pylint: disable=no-self-use
+    def terminate(self, handle: ProcessHandle, on_terminated: Optional[Callable[[], None]] = None) -> None:
+        """
+        Terminate the process tree of a spawned process.
+        :param handle: Process handle.
+        :param on_terminated: Function called after the process tree has been terminated or None.
+        :return: None
+        """
+        # A stopped process doesn't handle SIGTERM until it continues
+        self.resume(handle)
+        terminate_process(handle.pid())
+        if on_terminated:
+            on_terminated()
+
+    def suspend(self, handle: ProcessHandle) -> None:
+        """
+        Suspend the process tree of a spawned process (SIGSTOP), it keeps its state but doesn't use any CPU time until
+        it is resumed. The function doesn't block.
+        :param handle: Process handle.
+        :return: None
+        """
+        if not handle.is_suspended() and self.__signal_tree(handle, signal.SIGSTOP):
+            handle.set_suspended(True)
+
+    def resume(self, handle: ProcessHandle) -> None:
+        """
+        Resume the process tree of a suspended process (SIGCONT). The function doesn't block.
+        :param handle: Process handle.
+        :return: None
+        """
+        if handle.is_suspended():
+            self.__signal_tree(handle, signal.SIGCONT)
+            handle.set_suspended(False)
+
+    @staticmethod
+    def __signal_tree(handle: ProcessHandle, signal_number: int) -> bool:
+        """
+        Send a signal to a spawned process and its child processes.
+        :param handle: Process handle.
+        :param signal_number: Signal number.
+        :return: True if the signal has been sent to the process, False if it hasn't been spawned or has exited.
+        """
+        if handle.pid() is None or not handle.is_running():
+            return False
+        try:
+            children = psutil.Process(handle.pid()).children(recursive=True)
+            os.kill(handle.pid(), signal_number)
+        except (psutil.NoSuchProcess, ProcessLookupError):
+            return False
+        for child in children:
+            try:
+                child.send_signal(signal_number)
+            except psutil.NoSuchProcess:
+                pass
+        return True
+
+    # pylint: disable=no-self-use
+    def cpu_time(self, handle: ProcessHandle) -> Optional[float]:
+        """
+        Get the CPU time used by a spawned process and its terminated child processes so far.
+        :param handle: Process handle.
+        :return: User and system CPU time in seconds or None if it is unknown.
+        """
+        if handle.pid() is None:
+            return None
+        try:
+            times = psutil.Process(handle.pid()).cpu_times()
+        except psutil.Error:
+            return None
+        return times.user + times.system + times.children_user + times.children_system
+
+
+class AsyncProcessHandle(ProcessHandle):
+    """
+    Class defining the handle of a process spawned by the AsyncProcessLauncher.
+    """
+    # Flag indicating whether the process shall be terminated as soon as it has been spawned
+    __terminate_requested = False
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__process = None
+        self.__exited = False
+        self.__on_terminated: List[Callable[[], None]] = []
+        super().__init__(None)
+
+    def attach(self, process: AsyncProcess) -> None:
+        """
+        Attach the spawned process to the handle.
+        :param process: Spawned process.
+        :return: None
+        """
+        self.__process = process
+
+    def process(self) -> Optional[AsyncProcess]:
+        """
+        Get the spawned process.
+        :return: Spawned process or None if the process hasn't been spawned yet.
+        """
+        return self.__process
+
+    def set_exited(self) -> None:
+        """
+        Mark the process as exited.
+        :return: None
+        """
+        self.__exited = True
+
+    def request_termination(self, on_terminated: Optional[Callable[[], None]] = None) -> None:
+        """
+        Request the termination of the process as soon as it has been spawned.
+        :param on_terminated: Function called after the process tree has been terminated (or couldn't be spawned) or
+                              None.
+        :return: None
+        """
+        self.__terminate_requested = True
+        if on_terminated:
+            self.__on_terminated.append(on_terminated)
+
+    def pop_on_terminated(self) -> List[Callable[[], None]]:
+        """
+        Get and forget the functions passed along with the termination requests.
+        :return: List of functions.
+        """
+        callbacks, self.__on_terminated = self.__on_terminated, []
+        return callbacks
+
+    def is_termination_requested(self) -> bool:
+        """
+        Check if the termination of the process has been requested.
+        :return: True if the termination has been requested, False otherwise.
+        """
+        return self.__terminate_requested
+
+    def pid(self) -> Optional[int]:
+        """
+        Get the PID of the process.
+        :return: PID or None if the process hasn't been spawned yet.
+        """
+        return self.__process.pid if self.__process else None
+
+    def is_running(self) -> bool:
+        """
+        Check if the process is running (or about to be spawned).
+        :return: True if the process is running, False otherwise.
+        """
+        return not self.__exited
+
+
+class AsyncProcessLauncher(ProcessLauncher):
+    """
+    Class spawning, running and terminating processes as tasks of the running asyncio event loop. None of the functions
+    blocks, they must be called from the event loop thread.
+    """
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        # References to the running tasks, the event loop only keeps weak references
+        self.__tasks = set()
+        super().__init__()
+
+    def __create_task(self, coroutine) -> None:
+        """
+        Create a task in the running event loop.
+        :param coroutine: Coroutine to be run.
+        :return: None
+        """
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.__tasks.add(task)
+        task.add_done_callback(self.__tasks.discard)
+
+    def spawn(self, args: List[str], on_spawned: Optional[Callable[[], None]] = None,
+              on_output: Optional[Callable[[str], None]] = None,
+              on_exited: Optional[Callable[[int], None]] = None) -> ProcessHandle:
+        """
+        Spawn a process running in the background. Its standard and error output are drained by the spawning task.
+        :param args: Command line of the process.
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_output: Function called with each output line of the process or None.
+        :param on_exited: Function called with the return code after the process has exited (-1 if it couldn't be
+                          spawned) or None.
+        :return: Process handle.
+        """
+        handle = AsyncProcessHandle()
+        self.__create_task(self.__spawn(handle, args, on_spawned, on_output, on_exited))
+        return handle
+
+    async def __spawn(self, handle: AsyncProcessHandle, args: List[str], on_spawned: Optional[Callable[[], None]],
+                      on_output: Optional[Callable[[str], None]], on_exited: Optional[Callable[[int], None]]) -> None:
+        """
+        Spawn a process and wait until it has exited.
+        :param handle: Process handle.
+        :param args: Command line of the process.
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_output: Function called with each output line of the process or None.
+        :param on_exited: Function called with the return code after the process has exited or None.
+        :return: None
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.PIPE,
+                                                           stderr=asyncio.subprocess.STDOUT)
+        except OSError as exception:
+            LOG.error("Cannot spawn %s: %s", args[0], exception)
+            handle.set_exited()
+            if on_exited:
+                on_exited(-1)
+            for on_terminated in handle.pop_on_terminated():
+                on_terminated()
+            return
+        except asyncio.CancelledError:
+            # Event loop is shutting down before the process has been spawned
+            handle.set_exited()
+            for on_terminated in handle.pop_on_terminated():
+                on_terminated()
+            raise
+
+        handle.attach(process)
+        if on_spawned:
+            on_spawned()
+        if handle.is_termination_requested():
+            self.__create_task(self.__terminate(handle, None))
+
+        async for line in process.stdout:
+            line = line.decode(errors="replace").rstrip("\n")
+            handle.append_output(line)
+            if on_output:
+                on_output(line)
+        await process.wait()
+        handle.set_exited()
+        if on_exited:
+            on_exited(process.returncode)
+
+    def run(self, args: List[str], input_text: Optional[str] = None, on_spawned: Optional[Callable[[], None]] = None,
+            on_completed: Optional[Callable[[int], None]] = None) -> None:
+        """
+        Run a process until it has completed. Its error output is logged.
+        :param args: Command line of the process.
+        :param input_text: Text passed to the standard input of the process or None.
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_completed: Function called with the return code after the process has completed or None.
+        :return: None
+        """
+        self.__create_task(self.__run(args, input_text, on_spawned, on_completed))
+
+    @staticmethod
+    async def __run(args: List[str], input_text: Optional[str], on_spawned: Optional[Callable[[], None]],
+                    on_completed: Optional[Callable[[int], None]]) -> None:
+        """
+        Run a process until it has completed.
+        :param args: Command line of the process.
+        :param input_text: Text passed to the standard input of the process or None.
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_completed: Function called with the return code after the process has completed or None.
+        :return: None
+        """
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args, stdin=asyncio.subprocess.PIPE if input_text is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+        except OSError as exception:
+            LOG.error("Cannot run %s: %s", args[0], exception)
+            return
+
+        if on_spawned:
+            on_spawned()
+        _, stderr = await process.communicate(input_text.encode() if input_text is not None else None)
+        if stderr:
+            LOG.error(stderr.decode(errors="replace"))
+        if on_completed:
+            on_completed(process.returncode)
+
+    def terminate(self, handle: ProcessHandle, on_terminated: Optional[Callable[[], None]] = None) -> None:
+        """
+        Terminate the process tree of a spawned process.
+        :param handle: Process handle.
+        :param on_terminated: Function called after the process tree has been terminated or None.
+        :return: None
+        """
+        assert isinstance(handle, AsyncProcessHandle)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # The event loop has already been closed (e.g. during the shutdown), terminate synchronously
+            self.__terminate_closed(handle, on_terminated)
+            return
+
+        if handle.process() is None:
+            # Not spawned yet, terminate right after spawning
+            handle.request_termination(on_terminated)
+            return
+
+        self.__create_task(self.__terminate(handle, on_terminated))
+
+    def __terminate_closed(self, handle: AsyncProcessHandle, on_terminated: Optional[Callable[[], None]]) -> None:
+        """
+        Terminate the process tree of a spawned process after the event loop has been closed. The function blocks until
+        the process tree has been terminated.
+        :param handle: Process handle.
+        :param on_terminated: Function called after the process tree has been terminated or None.
+        :return: None
+        """
+        if handle.process() is not None and handle.process().returncode is None:
+            try:
+                super().terminate(handle)
+            except psutil.NoSuchProcess:
+                pass
+        handle.set_exited()
+        for pending_on_terminated in handle.pop_on_terminated():
+            pending_on_terminated()
+        if on_terminated:
+            on_terminated()
+
+    async def __terminate(self, handle: AsyncProcessHandle, on_terminated: Optional[Callable[[], None]]) -> None:
+        """
+        Terminate the process tree of a spawned process without blocking the event loop.
+        :param handle: Process handle.
+        :param on_terminated: Function called after the process tree has been terminated or None.
+        :return: None
+        """
+        process = handle.process()
+
+        # A stopped process doesn't handle SIGTERM until it continues
+        self.resume(handle)
+
+        # Terminate child processes
+        try:
+            children = psutil.Process(process.pid).children(recursive=True)
+        except psutil.NoSuchProcess:
+            children = []
+        for child in children:
+            try:
+                child.terminate()
+            except psutil.NoSuchProcess:
+                pass
+        for _ in range(30):
+            if not any(child.is_running() for child in children):
+                break
+            await asyncio.sleep(0.1)
+        for child in children:
+            if child.is_running():
+                LOG.warning("Child process of PID %d was stopped forcefully.", process.pid)
+                child.kill()
+
+        # Terminate parent process
+        if process.returncode is None:
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), 3)
+            except asyncio.TimeoutError:
+                LOG.warning("Parent process with PID %d was stopped forcefully.", process.pid)
+                process.kill()
+
+        # Functions passed before the process had been spawned
+        for pending_on_terminated in handle.pop_on_terminated():
+            pending_on_terminated()
+        if on_terminated:
+            on_terminated()
+
+
+class FakeProcessHandle(ProcessHandle):
+    """
+    Class defining the handle of a process "spawned" by the FakeProcessLauncher.
+    """
+    def __init__(self, pid: int, on_exited: Optional[Callable[[int], None]] = None):
+        """
+        Class constructor.
+        :param pid: Fake PID of the process.
+        :param on_exited: Function called with the return code after the process has exited or None.
+        """
+        self.__pid = pid
+        self.__running = True
+        self.__on_exited = on_exited
+        super().__init__(None)
+
+    def on_exited(self) -> Optional[Callable[[int], None]]:
+        """
+        Get the function called after the process has exited.
+        :return: Function or None.
+        """
+        return self.__on_exited
+
+    def set_exited(self) -> None:
+        """
+        Mark the process as exited.
+        :return: None
+        """
+        self.__running = False
+
+    def pid(self) -> Optional[int]:
+        """
+        Get the PID of the process.
+        :return: PID.
+        """
+        return self.__pid
+
+    def is_running(self) -> bool:
+        """
+        Check if the process is running.
+        :return: True if the process is running, False otherwise.
+        """
+        return self.__running
+
+
+class FakeProcessLauncher(ProcessLauncher):
+    """
+    Class pretending to spawn, run and terminate processes, e.g. for simulations on machines lacking the players. It
+    counts the operations per program to reveal runaway process spawning.
+    """
+    def __init__(self):
+        """
+        Class constructor.
+        """
+        self.__next_pid = 1000
+        self.__running: Dict[int, FakeProcessHandle] = {}
+        self.__spawned: Dict[str, int] = {}
+        self.__runs: Dict[str, int] = {}
+        self.__terminated: Dict[str, int] = {}
+        self.__suspended: Dict[str, int] = {}
+        self.__programs: Dict[int, str] = {}
+        self.__outputs: Dict[str, Callable[[List[str]], List[str]]] = {}
+        self.__max_running = 0
+        super().__init__()
+
+    def set_output(self, program: str, output: Callable[[List[str]], List[str]]) -> None:
+        """
+        Let the spawned processes of a program behave like short-lived commands, which produce output and exit with
+        return code 0 right away.
+        :param program: Program name.
+        :param output: Function returning the output lines for the command line of a process.
+        :return: None
+        """
+        self.__outputs[program] = output
+
+    def spawn(self, args: List[str], on_spawned: Optional[Callable[[], None]] = None,
+              on_output: Optional[Callable[[str], None]] = None,
+              on_exited: Optional[Callable[[int], None]] = None) -> ProcessHandle:
+        """
+        Spawn a process running in the background, fake processes don't produce any output and only exit when they
+        are terminated unless their program has been given an output (see set_output()).
+        :param args: Command line of the process.
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_output: Function called with each output line of the process or None.
+        :param on_exited: Function called with the return code after the process has exited or None.
+        :return: Process handle.
+        """
+        handle = FakeProcessHandle(self.__next_pid, on_exited)
+        self.__next_pid += 1
+        if args[0] in self.__outputs:
+            self.__spawned[args[0]] = self.__spawned.get(args[0], 0) + 1
+            if on_spawned:
+                on_spawned()
+            for line in self.__outputs[args[0]](args):
+                handle.append_output(line)
+                if on_output:
+                    on_output(line)
+            handle.set_exited()
+            if on_exited:
+                on_exited(0)
+            return handle
+        self.__running[handle.pid()] = handle
+        self.__programs[handle.pid()] = args[0]
+        self.__spawned[args[0]] = self.__spawned.get(args[0], 0) + 1
+        self.__max_running = max(self.__max_running, len(self.__running))
+        if on_spawned:
+            on_spawned()
+        return handle
+
+    def run(self, args: List[str], input_text: Optional[str] = None, on_spawned: Optional[Callable[[], None]] = None,
+            on_completed: Optional[Callable[[int], None]] = None) -> None:
+        """
+        Run a process until it has completed, the process completes immediately with return code 0.
+        :param args: Command line of the process.
+        :param input_text: Text passed to the standard input of the process or None.
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_completed: Function called with the return code after the process has completed or None.
+        :return: None
+        """
+        self.__runs[args[0]] = self.__runs.get(args[0], 0) + 1
+        if on_spawned:
+            on_spawned()
+        if on_completed:
+            on_completed(0)
+
+    def terminate(self, handle: ProcessHandle, on_terminated: Optional[Callable[[], None]] = None) -> None:
+        """
+        Terminate a spawned process.
+        :param handle: Process handle.
+        :param on_terminated: Function called after the process has been terminated or None.
+        :return: None
+        """
+        assert isinstance(handle, FakeProcessHandle)
+        if self.__running.pop(handle.pid(), None) is not None:
+            program = self.__programs.pop(handle.pid())
+            self.__terminated[program] = self.__terminated.get(program, 0) + 1
+            handle.set_exited()
+            if handle.on_exited():
+                handle.on_exited()(-signal.SIGTERM)
+        if on_terminated:
+            on_terminated()
+
+    def suspend(self, handle: ProcessHandle) -> None:
+        """
+        Suspend a spawned process.
+        :param handle: Process handle.
+        :return: None
+        """
+        if not handle.is_suspended() and handle.pid() in self.__running:
+            program = self.__programs[handle.pid()]
+            self.__suspended[program] = self.__suspended.get(program, 0) + 1
+            handle.set_suspended(True)
+
+    def resume(self, handle: ProcessHandle) -> None:
+        """
+        Resume a suspended process.
+        :param handle: Process handle.
+        :return: None
+        """
+        handle.set_suspended(False)
+
+    def cpu_time(self, handle: ProcessHandle) -> Optional[float]:
+        """
+        Get the CPU time used by a spawned process so far, fake processes don't use any.
+        :param handle: Process handle.
+        :return: None as the CPU time is unknown.
+        """
+        return None
+
+    def running(self) -> Dict[str, int]:
+        """
+        Get the number of running processes per program.
+        :return: Dictionary mapping program names to the number of running processes.
+        """
+        running = {}
+        for pid in self.__running:
+            running[self.__programs[pid]] = running.get(self.__programs[pid], 0) + 1
+        return running
+
+    def max_running(self) -> int:
+        """
+        Get the maximum number of processes which have been running at the same time.
+        :return: Maximum number of running processes.
+        """
+        return self.__max_running
+
+    def spawned(self) -> Dict[str, int]:
+        """
+        Get the number of spawned processes per program.
+        :return: Dictionary mapping program names to the number of spawned processes.
+        """
+        return dict(self.__spawned)
+
+    def runs(self) -> Dict[str, int]:
+        """
+        Get the number of run processes per program.
+        :return: Dictionary mapping program names to the number of runs.
+        """
+        return dict(self.__runs)
+
+    def terminated(self) -> Dict[str, int]:
+        """
+        Get the number of terminated processes per program.
+        :return: Dictionary mapping program names to the number of terminated processes.
+        """
+        return dict(self.__terminated)
+
+    def suspended(self) -> Dict[str, int]:
+        """
+        Get the number of suspensions per program.
+        :return: Dictionary mapping program names to the number of suspensions.
+        """
+        return dict(self.__suspended)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the table-driven state machine used for the power modes.
+"""
+
+import itertools
+import logging
+import sys
+
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from miscellaneous.metrics import REGISTRY, Counter
+
+
+class Rule:
+    """
+    Class defining a row of a transition table: if the state and the inputs match, the actions are executed and the
+    state machine changes to the target state.
+    """
+    def __init__(self, name: str, state: Hashable, conditions: Dict[str, Any], actions: Sequence[str],
+                 target: Optional[Hashable] = None):
+        """
+        Class constructor.
+        :param name: Name of the rule, used for the transition counters and the state graph.
+        :param state: State the rule applies to.
+        :param conditions: Dictionary mapping input names to the required value or a tuple of allowed values, inputs
+                           which aren't listed match any value.
+        :param actions: Names of the actions to be executed in the given order.
+        :param target: Target state or None to stay in the state.
+        """
+        self.__name = name
+        self.__state = state
+        self.__conditions = {name: value if isinstance(value, tuple) else (value,)
+                             for name, value in conditions.items()}
+        self.__actions = tuple(actions)
+        self.__target = state if target is None else target
+
+    def name(self) -> str:
+        """
+        Get the name of the rule.
+        :return: Name.
+        """
+        return self.__name
+
+    def actions(self) -> Tuple[str, ...]:
+        """
+        Get the actions of the rule.
+        :return: Action names.
+        """
+        return self.__actions
+
+    def target(self) -> Hashable:
+        """
+        Get the target state of the rule.
+        :return: Target state.
+        """
+        return self.__target
+
+    def matches(self, state: Hashable, inputs: Dict[str, Any]) -> bool:
+        """
+        Check if the rule matches the given state and inputs.
+        :param state: Current state.
+        :param inputs: Dictionary mapping input names to values.
+        :return: True if the rule matches, False otherwise.
+        """
+        return state == self.__state and all(inputs[name] in values for name, values in self.__conditions.items())
+
+
+class Transition:
+    """
+    Class defining a compiled transition, i.e. the matching rule of a state and input combination.
+    """
+    __slots__ = ("__rule", "__counter")
+
+    def __init__(self, rule: Rule, counter: Counter):
+        """
+        Class constructor.
+        :param rule: Matching rule.
+        :param counter: Counter of the taken transitions.
+        """
+        self.__rule = rule
+        self.__counter = counter
+
+    def name(self) -> str:
+        """
+        Get the name of the matching rule.
+        :return: Name.
+        """
+        return self.__rule.name()
+
+    def actions(self) -> Tuple[str, ...]:
+        """
+        Get the actions to be executed.
+        :return: Action names.
+        """
+        return self.__rule.actions()
+
+    def target(self) -> Hashable:
+        """
+        Get the target state.
+        :return: Target state.
+        """
+        return self.__rule.target()
+
+    def take(self) -> Tuple[str, ...]:
+        """
+        Count the transition as taken.
+        :return: Action names to be executed.
+        """
+        self.__counter.increment()
+        return self.__rule.actions()
+
+
+class TransitionTable:
+    """
+    Class compiling transition rules (state x inputs -> actions + target state) into a table with one entry per state
+    and input combination, looked up by index instead of checking the rules. The first matching rule wins, no entry
+    means that nothing happens. Taken transitions are counted in state_machine_transitions_total.
+    """
+    def __init__(self, name: str, states: Dict[Hashable, str], inputs: Dict[str, Sequence[Hashable]],
+                 rules: List[Rule], entry: Optional[Rule] = None):
+        """
+        Class constructor.
+        :param name: Name of the table.
+        :param states: Dictionary mapping the states to their names.
+        :param inputs: Dictionary mapping the input names to their possible values, lookup() takes the values in this
+                       order.
+        :param rules: Rules, the first matching one wins.
+        :param entry: Rule taken when the state machine is (re)initialized in any state (its state and conditions are
+                      ignored, without target the state is kept) or None.
+        """
+        self.__name = name
+        self.__states = dict(states)
+        self.__input_names = tuple(inputs)
+        self.__positions = tuple({value: index for index, value in enumerate(values)} for values in inputs.values())
+        self.__state_positions = {state: index for index, state in enumerate(states)}
+
+        # Compile one entry per state and input combination
+        self.__table: List[Optional[Transition]] = []
+        transitions = {}
+        for state in states:
+            for values in itertools.product(*inputs.values()):
+                named_values = dict(zip(self.__input_names, values))
+                rule = next((rule for rule in rules if rule.matches(state, named_values)), None)
+                if rule is not None and rule.name() not in transitions:
+                    transitions[rule.name()] = self.__transition(rule)
+                self.__table.append(transitions[rule.name()] if rule is not None else None)
+        self.__entry = self.__transition(entry) if entry is not None else None
+
+        # Number of entries per state
+        self.__stride = len(self.__table) // len(states)
+
+    def __transition(self, rule: Rule) -> Transition:
+        """
+        Create the compiled transition of a rule.
+        :param rule: Rule.
+        :return: Transition.
+        """
+        return Transition(rule, REGISTRY.counter("state_machine_transitions_total",
+                                                 {"table": self.__name, "rule": rule.name()}))
+
+    def name(self) -> str:
+        """
+        Get the name of the table.
+        :return: Name.
+        """
+        return self.__name
+
+    def entry(self) -> Optional[Transition]:
+        """
+        Get the transition taken when the state machine is (re)initialized.
+        :return: Entry transition or None.
+        """
+        return self.__entry
+
+    def lookup(self, state: Hashable, *values: Hashable) -> Optional[Transition]:
+        """
+        Look up the transition of the given state and inputs.
+        :param state: Current state.
+        :param values: Input values in the order given to the constructor.
+        :return: Transition or None if nothing happens.
+        """
+        index = 0
+        for position, value in zip(self.__positions, values):
+            index = index * len(position) + position[value]
+        return self.__table[self.__state_positions[state] * self.__stride + index]
+
+    def reachable_edges(self) -> Set[Tuple[Hashable, Hashable, str]]:
+        """
+        Get the edges of the state graph reachable from the entry target (or from all states if the entry rule doesn't
+        change the state).
+        :return: Set of tuples consisting of the source state, the target state and the rule name.
+        """
+        entry_target = self.__entry.target() if self.__entry is not None else None
+        if entry_target is not None:
+            pending = [entry_target]
+            edges = {(state, entry_target, self.__entry.name()) for state in self.__states}
+        else:
+            pending = list(self.__states)
+            edges = {(state, state, self.__entry.name()) for state in self.__states} if self.__entry else set()
+
+        visited = set(pending)
+        while pending:
+            state = pending.pop()
+            start = self.__state_positions[state] * self.__stride
+            for transition in self.__table[start:start + self.__stride]:
+                if transition is None:
+                    continue
+                edges.add((state, transition.target(), transition.name()))
+                if transition.target() not in visited:
+                    visited.add(transition.target())
+                    pending.append(transition.target())
+        return edges
+
+    def to_dot(self) -> str:
+        """
+        Export the reachable state graph in the Graphviz DOT format.
+        :return: DOT graph.
+        """
+        lines = [f'digraph "{self.__name}" {{']
+        names = self.__states
+        for source, target, rule in sorted(self.reachable_edges(),
+                                           key=lambda edge: (names[edge[0]], names[edge[1]], edge[2])):
+            lines.append(f'    "{self.__states[source]}" -> "{self.__states[target]}" [label="{rule}"];')
+        lines.append("}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
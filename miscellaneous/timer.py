@@ -1,58 +1,253 @@
 #!/usr/bin/env python3
 
 """
-        Module containing the Timer class.
+        Module containing the timer service and its timers.
 """
 
+from __future__ import annotations
+
+import heapq
 import logging
 import sys
-import time
+
+from threading import Lock
+from typing import Callable, Optional
+
+from miscellaneous.clock import Clock, REAL_CLOCK
+
+
+class TimerHandle:
+    """
+    Class defining the handle of a callback scheduled by the TimerService.
+    """
+    __slots__ = ("__service", "__deadline", "__callback", "__cancelled")
+
+    def __init__(self, service: TimerService, deadline: float, callback: Callable[[], None]):
+        """
+        Class constructor.
+        :param service: Timer service the callback is scheduled with.
+        :param deadline: Monotonic time the callback is due at.
+        :param callback: Function called when the deadline is due.
+        """
+        self.__service = service
+        self.__deadline = deadline
+        self.__callback = callback
+        self.__cancelled = False
+
+    def deadline(self) -> float:
+        """
+        Get the monotonic time the callback is due at.
+        :return: Monotonic deadline.
+        """
+        return self.__deadline
+
+    def callback(self) -> Callable[[], None]:
+        """
+        Get the scheduled callback.
+        :return: Callback.
+        """
+        return self.__callback
+
+    def cancel(self) -> None:
+        """
+        Cancel the callback (has no effect if it has already been called).
+        :return: None
+        """
+        if not self.__cancelled:
+            self.__cancelled = True
+            if self.__service is not None:
+                self.__service.cancelled()
+
+    def detach(self) -> None:
+        """
+        Detach the handle from the timer service once the callback is due, cancelling it has no effect afterwards.
+        :return: None
+        """
+        self.__service = None
+
+    def is_cancelled(self) -> bool:
+        """
+        Check if the callback has been cancelled.
+        :return: True if the callback has been cancelled, False otherwise.
+        """
+        return self.__cancelled
+
+
+class TimerService:
+    """
+    Class keeping the deadlines of any number of callbacks on a monotonic clock in a heap. The owner of the service
+    blocks until next_deadline() (or an unrelated wake-up) and calls run_expired() to call the due callbacks, timers
+    are never polled. Scheduling and cancelling take O(log n), cancelled entries are removed lazily.
+    """
+    # Minimum number of cancelled entries before the heap is compacted
+    __COMPACTION_THRESHOLD = 64
+
+    def __init__(self, clock: Optional[Clock] = None):
+        """
+        Class constructor.
+        :param clock: Clock the deadlines refer to or None for the real clock.
+        """
+        self.__clock = clock or REAL_CLOCK
+        self.__lock = Lock()
+        self.__heap = []
+        self.__sequence = 0
+        self.__cancelled = 0
+
+    def clock(self) -> Clock:
+        """
+        Get the clock the deadlines refer to.
+        :return: Clock.
+        """
+        return self.__clock
+
+    def call_at(self, deadline: float, callback: Callable[[], None]) -> TimerHandle:
+        """
+        Schedule a callback at the given monotonic time.
+        :param deadline: Monotonic time the callback is due at.
+        :param callback: Function to be called.
+        :return: Handle of the scheduled callback.
+        """
+        handle = TimerHandle(self, deadline, callback)
+        with self.__lock:
+            # The sequence number keeps callbacks with the same deadline in scheduling order
+            heapq.heappush(self.__heap, (deadline, self.__sequence, handle))
+            self.__sequence += 1
+        return handle
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> TimerHandle:
+        """
+        Schedule a callback after the given number of seconds.
+        :param delay: Number of seconds until the callback is due.
+        :param callback: Function to be called.
+        :return: Handle of the scheduled callback.
+        """
+        return self.call_at(self.__clock.monotonic() + delay, callback)
+
+    def cancelled(self) -> None:
+        """
+        Account for a cancelled callback, called by TimerHandle.cancel().
+        :return: None
+        """
+        with self.__lock:
+            self.__cancelled += 1
+            if self.__cancelled >= self.__COMPACTION_THRESHOLD and self.__cancelled * 2 >= len(self.__heap):
+                self.__heap = [entry for entry in self.__heap if not entry[2].is_cancelled()]
+                heapq.heapify(self.__heap)
+                self.__cancelled = 0
+
+    def __discard_cancelled(self) -> None:
+        """
+        Remove cancelled entries from the top of the heap. The lock must be held.
+        :return: None
+        """
+        while self.__heap and self.__heap[0][2].is_cancelled():
+            heapq.heappop(self.__heap)
+            self.__cancelled = max(0, self.__cancelled - 1)
+
+    def next_deadline(self) -> Optional[float]:
+        """
+        Get the earliest pending deadline.
+        :return: Monotonic deadline or None if no callback is pending.
+        """
+        with self.__lock:
+            self.__discard_cancelled()
+            return self.__heap[0][0] if self.__heap else None
+
+    def time_to_next_deadline(self) -> Optional[float]:
+        """
+        Get the number of seconds until the earliest pending deadline.
+        :return: Number of seconds (0 if already due) or None if no callback is pending.
+        """
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+
+        return max(0.0, deadline - self.__clock.monotonic())
+
+    def run_expired(self) -> int:
+        """
+        Call the callbacks whose deadlines are due, in deadline order.
+        :return: Number of called callbacks.
+        """
+        count = 0
+        now = self.__clock.monotonic()
+        while True:
+            with self.__lock:
+                self.__discard_cancelled()
+                if not self.__heap or self.__heap[0][0] > now:
+                    break
+                _, _, handle = heapq.heappop(self.__heap)
+                handle.detach()
+
+            # Called without holding the lock, the callback may schedule further callbacks
+            handle.callback()()
+            count += 1
+        return count
+
+    def pending(self) -> int:
+        """
+        Get the number of pending callbacks.
+        :return: Number of pending callbacks.
+        """
+        with self.__lock:
+            return len(self.__heap) - self.__cancelled
 
 
 class Timer:
     """
-    Class defining a timer.
+    Class defining a restartable timer of a TimerService. It is pending from start() until it expires (its callback is
+    called by TimerService.run_expired()) or is stopped.
     """
-    def __init__(self):
+    def __init__(self, service: TimerService, callback: Optional[Callable[[], None]] = None):
         """
         Class constructor.
+        :param service: Timer service the timer runs on.
+        :param callback: Function called when the timer expires or None.
         """
-        self.__seconds = 0
-        self.__start_time = 0
+        self.__service = service
+        self.__callback = callback
+        self.__handle = None
 
-    def start(self, seconds: int) -> None:
+    def start(self, seconds: float) -> None:
         """
-        Start the timer.
-        :param seconds: Number of seconds to arm the timer with.
+        Start the timer, restarting it if it is pending.
+        :param seconds: Number of seconds until the timer expires.
         :return: None
         """
-        self.__seconds = seconds
-        self.__start_time = time.time()
+        self.stop()
+        self.__handle = self.__service.call_later(seconds, self.__expire)
 
     def stop(self) -> None:
         """
         Stop the timer.
         :return: None
         """
-        self.__seconds = 0
-        self.__start_time = 0
+        if self.__handle is not None:
+            self.__handle.cancel()
+            self.__handle = None
 
-    def is_active(self) -> bool:
+    def __expire(self) -> None:
         """
-        Check if the timer is active (running or already expired).
-        :return: True if the timer is active, False otherwise.
+        Callback called by the timer service when the timer has expired.
+        :return: None
         """
-        return self.__seconds != 0 and self.__start_time != 0
+        self.__handle = None
+        if self.__callback:
+            self.__callback()
 
-    def is_expired(self) -> bool:
+    def is_pending(self) -> bool:
         """
-        Check if the timer hasn't started or is expired.
-        :return: True if the timer hasn't started or is expired, False otherwise.
+        Check if the timer has been started and hasn't expired or been stopped yet.
+        :return: True if the timer is pending, False otherwise.
         """
-        if not self.is_active():
-            return True
+        return self.__handle is not None
 
-        return time.time() > self.__start_time + self.__seconds
+    def deadline(self) -> Optional[float]:
+        """
+        Get the monotonic time the timer expires at.
+        :return: Monotonic deadline or None if the timer is not pending.
+        """
+        return self.__handle.deadline() if self.__handle is not None else None
 
 
 if __name__ == "__main__":
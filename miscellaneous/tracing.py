@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the event latency tracing.
+"""
+
+import logging
+import sys
+import time
+
+from events.event import Event
+from miscellaneous.metrics import REGISTRY
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+
+class Stage:
+    """
+    Class defining the traced stages of an event on its way from the producer to the side effect.
+    """
+    # Event has been put into the communication queue.
+    ENQUEUE = "enqueue"
+    # Event has been taken from the communication queue by the dispatcher.
+    DISPATCH = "dispatch"
+    # Input event has been evaluated by the power manager.
+    POWER_MANAGER = "power_manager"
+    # Process triggered by the event has been spawned.
+    SPAWN = "spawn"
+    # Process triggered by the event has completed.
+    COMPLETION = "completion"
+
+
+def record_latency(stage: str, event: Event) -> float:
+    """
+    Record the latency from the creation of the initial event of the trace until the given stage has been reached.
+    :param stage: Reached stage.
+    :param event: Event which reached the stage.
+    :return: Latency in seconds or 0 for untraced events.
+    """
+    if event.trace_id() == 0:
+        # Untraced event
+        return 0.0
+
+    latency = time.monotonic() - event.origin()
+    REGISTRY.histogram("event_latency_seconds", {"stage": stage, "signal": event.signal().name},
+                       LATENCY_BUCKETS).observe(latency)
+    LOG.debug("Trace %d: %s reached stage %s after %.1f ms.", event.trace_id(), event, stage, latency * 1000)
+    return latency
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for running the application in a single asyncio event loop.
+"""
+
+import asyncio
+import logging
+import sys
+
+from http import HTTPStatus
+from typing import Callable, List, Optional
+
+from events.event_journal import EventJournalWriter
+from events.event_queue import EventQueue
+from events.signals import Signal
+from objects.camera_motion import CameraMotion
+from objects.event_dispatcher import EventDispatcher
+from objects.notifier import Notifier
+from objects.passive_object import PassiveObject
+from objects.power_manager import PowerManager
+from objects.process_supervisor import ProcessSupervisor
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class AsyncRuntime:
+    """
+    Class running the application in a single asyncio event loop instead of one thread per object. Events are dispatched
+    by a task woken up by the communication queue (also from GPIO callback threads), the HTTP motion trigger server is
+    an asyncio server and the power manager is evaluated upon input events and by loop callbacks at its deadlines.
+    Objects spawning processes must use an AsyncProcessLauncher, the supervised processes are terminated before the
+    event loop is closed.
+    """
+    # Timeout in seconds for reading an HTTP request
+    __REQUEST_TIMEOUT = 10
+
+    # Timeout in seconds for terminating the supervised processes
+    __TERMINATE_TIMEOUT = 10
+
+    # Event loop, wake-up flag of the dispatch task and handle of the next power manager evaluation
+    __loop = None
+    __wakeup = None
+    __evaluation = None
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, communication_queue: EventQueue, objects: List[PassiveObject], power_manager: PowerManager,
+                 notifier: Notifier, camera_motion: CameraMotion, recorder: Optional[EventJournalWriter] = None,
+                 process_supervisor: Optional[ProcessSupervisor] = None,
+                 on_started: Optional[Callable[[], None]] = None):
+        """
+        Class constructor.
+        :param communication_queue: Queue used for event communication.
+        :param objects: List of objects to dispatch received events to (including power manager, notifier and camera
+                        motion).
+        :param power_manager: Power manager, must not be started.
+        :param notifier: Notifier, must not be started.
+        :param camera_motion: Camera motion handling the requests of the HTTP server, must not be started.
+        :param recorder: Journal recording all dispatched events or None.
+        :param process_supervisor: Supervisor whose processes are terminated before the event loop is closed or None.
+        :param on_started: Function called once the event loop is running (e.g. to start objects spawning processes)
+                           or None.
+        """
+        self.__communication_queue = communication_queue
+        self.__dispatcher = EventDispatcher(communication_queue, objects, recorder=recorder)
+        self.__power_manager = power_manager
+        self.__power_manager_signals = power_manager.signals()
+        self.__notifier = notifier
+        self.__camera_motion = camera_motion
+        self.__process_supervisor = process_supervisor
+        self.__on_started = on_started
+
+    def run(self) -> None:
+        """
+        Run the event loop until a TERMINATE event has been queued.
+        :return: None
+        """
+        asyncio.run(self.__main())
+
+    async def __main(self) -> None:
+        """
+        Main coroutine of the event loop.
+        :return: None
+        """
+        self.__loop = asyncio.get_running_loop()
+        self.__wakeup = asyncio.Event()
+        self.__communication_queue.set_put_callback(self.__wake_up)
+        self.__wakeup.set()
+
+        bind_ip, bind_port = self.__camera_motion.bind_address()
+        server = await asyncio.start_server(self.__handle_client, bind_ip, bind_port, reuse_address=True)
+        LOG.info("Starting HTTP server on %s:%d.", bind_ip, bind_port)
+
+        if self.__on_started:
+            self.__on_started()
+
+        LOG.info("Power manager has started.")
+        self.__evaluate_power_manager()
+
+        try:
+            async with server:
+                await self.__dispatch_events()
+        finally:
+            self.__communication_queue.set_put_callback(None)
+            if self.__evaluation:
+                self.__evaluation.cancel()
+            LOG.info("Power manager has stopped.")
+            LOG.info("HTTP server has stopped.")
+            await self.__terminate_processes()
+
+    async def __terminate_processes(self) -> None:
+        """
+        Terminate the supervised processes, their termination tasks need the running event loop.
+        :return: None
+        """
+        if self.__process_supervisor is None:
+            return
+
+        terminated = asyncio.Event()
+        self.__process_supervisor.terminate_all(terminated.set)
+        try:
+            await asyncio.wait_for(terminated.wait(), self.__TERMINATE_TIMEOUT)
+        except asyncio.TimeoutError:
+            LOG.warning("Supervised processes haven't been terminated in time.")
+
+    def __wake_up(self) -> None:
+        """
+        Wake up the dispatch task. Can be called from any thread.
+        :return: None
+        """
+        try:
+            self.__loop.call_soon_threadsafe(self.__wakeup.set)
+        except RuntimeError:
+            # Event loop has already been closed
+            pass
+
+    async def __dispatch_events(self) -> None:
+        """
+        Dispatch queued events until a TERMINATE event has been received.
+        :return: None
+        """
+        while True:
+            await self.__wakeup.wait()
+            self.__wakeup.clear()
+
+            while not self.__communication_queue.empty():
+                event = self.__communication_queue.get_nowait()
+                if event.signal() is Signal.TERMINATE:
+                    return
+
+                self.__dispatcher.dispatch_event(event)
+                if event.signal() in self.__power_manager_signals:
+                    # React on input changes right away
+                    self.__evaluate_power_manager()
+                elif event.signal() is Signal.NOTIFY:
+                    self.__notifier.show_pending()
+
+    def __evaluate_power_manager(self) -> None:
+        """
+        Evaluate the power manager and schedule the next evaluation at its next deadline.
+        :return: None
+        """
+        if self.__evaluation:
+            self.__evaluation.cancel()
+        self.__power_manager.evaluate()
+        self.__evaluation = self.__loop.call_later(self.__power_manager.time_to_deadline(),
+                                                   self.__evaluate_power_manager)
+
+    async def __handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Handle a client connection of the HTTP motion trigger server.
+        :param reader: Stream reader of the connection.
+        :param writer: Stream writer of the connection.
+        :return: None
+        """
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), self.__REQUEST_TIMEOUT)
+            while await asyncio.wait_for(reader.readline(), self.__REQUEST_TIMEOUT) not in (b"\r\n", b"\n", b""):
+                # Skip the request headers
+                pass
+
+            request = request_line.decode(errors="replace").split()
+            if len(request) >= 2 and request[0] == "GET":
+                http_response, body = self.__camera_motion.handle_request(writer.get_extra_info("peername")[0],
+                                                                          request[1])
+            else:
+                http_response, body = HTTPStatus.NOT_IMPLEMENTED.value, None
+
+            response = f"HTTP/1.0 {http_response} {HTTPStatus(http_response).phrase}\r\n"
+            if body is not None:
+                response += f"Content-Type: text/plain; version=0.0.4\r\nContent-Length: {len(body)}\r\n"
+            writer.write(response.encode() + b"\r\n" + (body or b""))
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
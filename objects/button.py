@@ -7,12 +7,12 @@
 import logging
 import sys
 
-from datetime import datetime
-from queue import Queue
-
-import RPi.GPIO as GPIO     # pylint: disable=import-error
+from typing import Any, Optional
 
 from events.event_button_pressed import EventButtonPressed
+from events.event_queue import EventQueue
+from miscellaneous.clock import Clock, REAL_CLOCK
+from miscellaneous.gpio import load_gpio
 from objects.passive_object import PassiveObject
 
 # Define the logger
@@ -24,8 +24,8 @@ class Button(PassiveObject):
     Class handling a push button.
     """
     # Press types
-    SHORT_PRESS = 1
-    LONG_PRESS = 2
+    SHORT_PRESS = EventButtonPressed.SHORT_PRESS
+    LONG_PRESS = EventButtonPressed.LONG_PRESS
 
     # Minimum number of seconds the button has to be pressed for a long press.
     __LONG_PRESS_THRESHOLD = 1.5
@@ -33,17 +33,22 @@ class Button(PassiveObject):
     # Timestamp when the button has been pressed.
     __button_press_timestamp = None
 
-    def __init__(self, communication_queue: Queue, gpio_channel: int):
+    def __init__(self, communication_queue: EventQueue, gpio_channel: int, gpio: Optional[Any] = None,
+                 clock: Optional[Clock] = None):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
         :param gpio_channel: GPIO BOARD channel number the button is connected to.
+        :param gpio: GPIO module (RPi.GPIO or a FakeGPIO) or None to load RPi.GPIO.
+        :param clock: Clock used to measure the press duration or None for the real clock.
         """
         self.__communication_queue = communication_queue
         self.__gpio_channel = gpio_channel
+        self.__gpio = gpio or load_gpio()
+        self.__clock = clock or REAL_CLOCK
 
-        GPIO.setup(self.__gpio_channel, GPIO.IN, pull_up_down=GPIO.PUD_OFF)
-        GPIO.add_event_detect(self.__gpio_channel, GPIO.BOTH, callback=self.__button_state_change)
+        self.__gpio.setup(self.__gpio_channel, self.__gpio.IN, pull_up_down=self.__gpio.PUD_OFF)
+        self.__gpio.add_event_detect(self.__gpio_channel, self.__gpio.BOTH, callback=self.__button_state_change)
         LOG.info("Button initialized at GPIO %d.", self.__gpio_channel)
 
         super().__init__()
@@ -56,18 +61,17 @@ class Button(PassiveObject):
         """
         assert gpio_channel == self.__gpio_channel
 
-        if GPIO.input(self.__gpio_channel) == GPIO.HIGH:
+        if self.__gpio.input(self.__gpio_channel) == self.__gpio.HIGH:
             LOG.debug("Push button pressed.")
-            self.__button_press_timestamp = datetime.now()
+            self.__button_press_timestamp = self.__clock.monotonic()
         else:
-            button_press_time = datetime.now() - self.__button_press_timestamp
-            button_press_time = button_press_time.seconds + button_press_time.microseconds / 1000000
+            button_press_time = self.__clock.monotonic() - self.__button_press_timestamp
             if button_press_time >= self.__LONG_PRESS_THRESHOLD:
                 LOG.info("Long push button press detected.")
-                self.__communication_queue.put(EventButtonPressed(self.LONG_PRESS))
+                self.__communication_queue.put(EventButtonPressed.create(self.LONG_PRESS))
             else:
                 LOG.info("Short push button press detected.")
-                self.__communication_queue.put(EventButtonPressed(self.SHORT_PRESS))
+                self.__communication_queue.put(EventButtonPressed.create(self.SHORT_PRESS))
 
 
 if __name__ == "__main__":
@@ -5,40 +5,58 @@
 """
 
 import logging
+import re
 import socketserver
 import sys
 
-from queue import Queue
 from http.server import BaseHTTPRequestHandler
+from typing import Iterable, Optional, Set, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
 
 from events.event import Event
+from events.event_config_changed import EventConfigChanged
 from events.event_motion_changed import EventMotionChanged
+from events.event_queue import EventQueue
 from events.signals import Signal
+from miscellaneous.metrics import REGISTRY
 from objects.threaded_object import ThreadedObject
 
 # Define the logger
 LOG = logging.getLogger(__name__)
 
+# Valid camera IDs (short enough to be recorded in event journals)
+CAMERA_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
 
 class CameraMotion(ThreadedObject):
     """
-    Class handling camera motion detection.
+    Class handling camera motion detection. Motion is only accepted from the cameras of the stream registry, which
+    follows configuration changes. In the asyncio runtime the object isn't started, the event loop serves its requests.
     """
     # HTTP server handle.
     __httpd = None
 
-    def __init__(self, communication_queue: Queue, bind_ip: str, bind_port: int):
+    def __init__(self, communication_queue: EventQueue, bind_ip: str, bind_port: int, cameras: Iterable[str]):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
         :param bind_ip: IP to bind the HTTP server to.
         :param bind_port: Port to bind the HTTP server to.
+        :param cameras: IDs of the cameras of the stream registry.
         """
         self.__communication_queue = communication_queue
         self.__bind_ip = bind_ip
         self.__bind_port = bind_port
+        self.__cameras = frozenset(cameras)
         super().__init__(self.__start_httpd)
 
+    def bind_address(self) -> Tuple[str, int]:
+        """
+        Get the address of the HTTP motion trigger server.
+        :return: Tuple consisting of IP and port to bind the HTTP server to.
+        """
+        return self.__bind_ip, self.__bind_port
+
     class RequestHandler(BaseHTTPRequestHandler):
         """
         HTTP request handler class.
@@ -48,21 +66,15 @@ class CameraMotion(ThreadedObject):
             Handle GET requests.
             :return: None
             """
-            http_response = 200
-
-            # Simulation example: curl -X GET http://localhost:10042/?Message=start
-            if self.path == "/?Message=start":
-                LOG.info("Client %s indicated motion start.", self.client_address[0])
-                self.server.communication_queue.put(EventMotionChanged(Signal.CAMERA_MOTION_CHANGED, True))
-            elif self.path == "/?Message=stop":
-                LOG.info("Client %s indicated motion end.", self.client_address[0])
-                self.server.communication_queue.put(EventMotionChanged(Signal.CAMERA_MOTION_CHANGED, False))
-            else:
-                LOG.warning("Client %s sent unknown request: %s", self.client_address[0], self.path)
-                http_response = 400
+            http_response, body = self.server.camera_motion.handle_request(self.client_address[0], self.path)
 
             self.send_response(http_response)
+            if body is not None:
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
             self.end_headers()
+            if body is not None:
+                self.wfile.write(body)
 
         def log_message(self, _, *args: str) -> None:
             """
@@ -70,6 +82,40 @@ class CameraMotion(ThreadedObject):
             """
             return
 
+    def handle_request(self, client_ip: str, path: str) -> Tuple[int, Optional[bytes]]:
+        """
+        Handle a GET request of the HTTP motion trigger server.
+        :param client_ip: IP of the client.
+        :param path: Requested path.
+        :return: Tuple consisting of HTTP response code and response body (or None).
+        """
+        http_response = 200
+        body = None
+
+        # Simulation example: curl -X GET "http://localhost:10042/?Message=start&Camera=garage"
+        url = urlsplit(path)
+        query = parse_qs(url.query)
+        message = query.get("Message", [None])
+        camera = query.get("Camera", [None])
+        # Unknown cameras are rejected, each of them would be queued separately and keep the camera stream on
+        valid_camera = len(camera) == 1 and (camera[0] is None or camera[0] in self.__cameras)
+        if url.path == "/" and message in (["start"], ["stop"]) and valid_camera:
+            motion = message[0] == "start"
+            LOG.info("Client %s indicated motion %s%s.", client_ip, "start" if motion else "end",
+                     "" if camera[0] is None else f" of camera {camera[0]}")
+            self.__communication_queue.put(EventMotionChanged.create(Signal.CAMERA_MOTION_CHANGED, motion,
+                                                                     camera=camera[0]))
+        elif path == "/metrics":
+            body = REGISTRY.render().encode()
+        elif url.path == "/" and len(camera) == 1:
+            LOG.warning("Client %s indicated motion of unknown camera %s.", client_ip, camera[0])
+            http_response = 400
+        else:
+            LOG.warning("Client %s sent unknown request: %s", client_ip, path)
+            http_response = 400
+
+        return http_response, body
+
     def __start_httpd(self) -> None:
         """
         Start the HTTP server.
@@ -78,22 +124,32 @@ class CameraMotion(ThreadedObject):
         socketserver.TCPServer.allow_reuse_address = True
         socketserver.TCPServer.logging = False
         self.__httpd = socketserver.TCPServer((self.__bind_ip, self.__bind_port), CameraMotion.RequestHandler)
-        self.__httpd.communication_queue = self.__communication_queue
+        self.__httpd.camera_motion = self
 
         LOG.info("Starting HTTP server on %s:%d.", self.__bind_ip, self.__bind_port)
         self.__httpd.serve_forever()
         LOG.info("HTTP server has stopped.")
 
-    def dispatch(self, event: Event) -> None:
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | {Signal.CONFIG_CHANGED}
+
+    def dispatch(self, event: Union[Event, EventConfigChanged]) -> None:
         """
         Dispatch the given event to the object.
         :param event: Event to be dispatched.
         :return None
         """
-        if event.signal() == Signal.TERMINATE and self.is_running() and self.__httpd:
-            self.__httpd.shutdown()
-            self.__httpd.server_close()
-        super().dispatch(event)
+        if event.signal() is Signal.CONFIG_CHANGED:
+            self.__cameras = frozenset(event.config().streams())
+        else:
+            if event.signal() is Signal.TERMINATE and self.is_running() and self.__httpd:
+                self.__httpd.shutdown()
+                self.__httpd.server_close()
+            super().dispatch(event)
 
 
 if __name__ == "__main__":
@@ -1,74 +1,422 @@
 #!/usr/bin/env python3
 
 """
-        Module responsible for displaying the surveillance camera stream.
+        Module responsible for displaying the surveillance camera streams.
 """
 
 import logging
-import subprocess
+import math
+import re
 import sys
+import time
 
-from queue import Queue
-from typing import Union
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
 
 from events.event import Event
+from events.event_config_changed import EventConfigChanged
 from events.event_control import EventControl
+from events.event_motion_changed import EventMotionChanged
+from events.event_process_restart import EventProcessRestart
+from events.event_queue import EventQueue
 from events.signals import Signal
-from miscellaneous.miscellaneous import terminate_process
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.process import ProcessLauncher
+from miscellaneous.tracing import LATENCY_BUCKETS, Stage, record_latency
+from objects.camera_motion import CAMERA_ID_PATTERN
 from objects.passive_object import PassiveObject
+from objects.player_backend import OmxplayerBackend, PlayerBackend, PlayerSession
+from objects.process_supervisor import ProcessSupervisor
 
 # Define the logger
 LOG = logging.getLogger(__name__)
 
 
+def parse_streams(entries: Sequence[str]) -> Dict[str, str]:
+    """
+    Parse camera streams in the format [<camera ID>=]<URL>, e.g. "garage=rtsp://192.168.1.10/stream". Streams without
+    camera ID are named by their position (camera1, camera2, ...).
+    :param entries: Camera streams.
+    :return: Dictionary mapping camera IDs to stream URLs, the first camera is the default camera.
+    :raise: ValueError if a camera stream is invalid.
+    """
+    streams = {}
+    for index, entry in enumerate(entries, 1):
+        result = re.match(r"^([^:=/]+)=(.+)$", entry)
+        camera, url = (result.group(1), result.group(2)) if result else (f"camera{index}", entry)
+        if not CAMERA_ID_PATTERN.match(camera):
+            raise ValueError(f"Invalid camera ID '{camera}' given.")
+        if camera in streams:
+            raise ValueError(f"Camera ID '{camera}' given more than once.")
+        if not url:
+            raise ValueError(f"Empty stream URL given for camera '{camera}'.")
+        streams[camera] = url
+    return streams
+
+
 class CameraStream(PassiveObject):
     """
-    Class responsible for showing the camera stream.
+    Class responsible for showing the camera streams. Each camera of the registry is shown by its own player session
+    of the player backend. Sessions of cameras which are no longer shown are kept hidden up to a maximum number of
+    sessions, so switching back to a camera only shows the hidden session instead of establishing a new RTSP session.
+    The stream can also be pre-warmed, i.e. the session of the camera to be shown next is started hidden before the
+    stream needs to be shown. Visible sessions are restarted by the process supervisor if their player exits or doesn't
+    show its first frame in time.
     """
-    # Process handle
-    __process = None
+    class Policy:
+        """
+        Class defining the policies selecting the shown cameras while several cameras detect motion.
+        """
+        # The camera which detected motion most recently is shown.
+        LATEST = "latest"
+        # The first camera of the registry which detects motion is shown.
+        PRIORITY = "priority"
+        # All cameras detecting motion are shown tiled (up to the maximum number of sessions).
+        MOSAIC = "mosaic"
+
+    # Flags indicating whether the stream shall be shown and whether it shall be pre-warmed
+    __show = False
+    __prewarm = False
 
-    def __init__(self, communication_queue: Queue, stream_url: str):
+    def __init__(self, communication_queue: EventQueue, streams: Dict[str, str],
+                 backend: Optional[PlayerBackend] = None, policy: str = Policy.LATEST, max_sessions: int = 2):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
-        :param stream_url: URL of the camera stream.
+        :param streams: Dictionary mapping camera IDs to stream URLs, the first camera is the default camera.
+        :param backend: Backend playing the streams or None for an omxplayer backend with a synchronous launcher (its
+                        players are not restarted).
+        :param policy: Policy selecting the shown cameras while several cameras detect motion.
+        :param max_sessions: Maximum number of player sessions (shown and hidden).
         """
         self.__communication_queue = communication_queue
-        self.__stream_url = stream_url
+        self.__streams = dict(streams)
+        self.__backend = backend or OmxplayerBackend(ProcessSupervisor(communication_queue, ProcessLauncher()))
+        self.__policy = policy
+        self.__max_sessions = max(1, max_sessions)
+
+        # Player sessions in the order of their last use, cameras detecting motion in the order of their motion start
+        # and currently shown cameras
+        self.__sessions: Dict[str, PlayerSession] = OrderedDict()
+        self.__motions: Dict[str, None] = OrderedDict()
+        self.__shown: List[str] = []
+
+        # Time-to-first-frame measurement of the primary shown camera, the first frame is reported by the reader of
+        # the player output
+        self.__ttff_lock = Lock()
+        self.__ttff_session = None
+        self.__ttff_start = None
+        self.__ttff_kind = None
+        self.__ttff_pending = set()
+        self.__ttff = {kind: REGISTRY.histogram("camera_stream_time_to_first_frame_seconds", {"start": kind},
+                                                LATENCY_BUCKETS)
+                       for kind in ("cold", "prewarmed")}
+        self.__switches = {reused: REGISTRY.counter("camera_stream_switches_total",
+                                                    {"session": "reused" if reused else "new"})
+                           for reused in (False, True)}
         super().__init__()
 
-    def __start_stream(self) -> None:
+    def __default_camera(self) -> str:
         """
-        Start the camera stream.
+        Get the default camera, i.e. the first camera of the registry.
+        :return: Camera ID.
+        """
+        return next(iter(self.__streams))
+
+    def __select_cameras(self) -> List[str]:
+        """
+        Select the cameras to be shown according to the policy.
+        :return: List of camera IDs, the first camera is the primary camera.
+        """
+        active = [camera for camera in self.__motions if camera in self.__streams]
+        if not active:
+            # Keep showing the current camera (e.g. after the motion ended) or show the default camera
+            return self.__shown[:1] if self.__shown else [self.__default_camera()]
+
+        if self.__policy == self.Policy.LATEST:
+            return [active[-1]]
+        registry_order = sorted(active, key=list(self.__streams).index)
+        if self.__policy == self.Policy.PRIORITY:
+            return registry_order[:1]
+        return registry_order[:self.__max_sessions]
+
+    def __layout(self, count: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Get the windows of the given number of tiles arranged in a grid covering the screen.
+        :param count: Number of tiles.
+        :return: List of windows (left, top, right, bottom) in row-major order.
+        """
+        columns = math.ceil(math.sqrt(count))
+        rows = math.ceil(count / columns)
+        width, height = self.__backend.screen_size()
+        return [(column * width // columns, row * height // rows, (column + 1) * width // columns,
+                 (row + 1) * height // rows)
+                for row in range(rows) for column in range(columns)][:count]
+
+    def __measure_ttff(self, session: PlayerSession, kind: str) -> None:
+        """
+        Start measuring the time until the stream of the given session is visible with its first frame.
+        :param session: Player session of the primary shown camera.
+        :param kind: "cold" if the player is started, "prewarmed" if a hidden player is shown.
         :return: None
         """
-        stream_call = ["omxplayer", "--avdict", "rtsp_transport:tcp", "--live", self.__stream_url]
-        self.__process = subprocess.Popen(stream_call, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                          universal_newlines=True)
-        LOG.info("Camera stream has started.")
+        with self.__ttff_lock:
+            self.__ttff_session = session
+            self.__ttff_start = time.monotonic()
+            self.__ttff_kind = kind
+            self.__ttff_pending = {"shown"} if kind == "prewarmed" else set()
+            if not session.first_frame:
+                self.__ttff_pending.add("frame")
 
-    def __stop_stream(self) -> None:
+    def __complete_ttff(self, session: PlayerSession, condition: str) -> None:
         """
-        Stop the camera stream.
+        Mark a condition of a visible first frame as fulfilled and record the time-to-first-frame once all are.
+        :param session: Player session which fulfilled the condition.
+        :param condition: "frame" if the player reported the first frame, "shown" if the player has been made visible.
         :return: None
         """
-        terminate_process(self.__process.pid)
-        LOG.info("Camera stream has been stopped.")
+        with self.__ttff_lock:
+            if condition == "frame":
+                session.first_frame = True
+            if session is not self.__ttff_session or self.__ttff_start is None:
+                return
+            self.__ttff_pending.discard(condition)
+            if self.__ttff_pending:
+                return
+            ttff, kind = time.monotonic() - self.__ttff_start, self.__ttff_kind
+            self.__ttff[kind].observe(ttff)
+            self.__ttff_start = None
+        LOG.info("Camera stream of camera %s has shown its first frame after %.0f ms (%s start).", session.camera,
+                 ttff * 1000, kind)
+
+    def __start_session(self, event: Event, camera: str, window: Optional[Tuple[int, int, int, int]],
+                        primary: bool = False) -> PlayerSession:
+        """
+        Start the player session of a camera.
+        :param event: Event which triggered the start.
+        :param camera: Camera ID.
+        :param window: Window (left, top, right, bottom) to show the stream in or None to start the player hidden.
+        :param primary: True to measure the time-to-first-frame of the session.
+        :return: Player session.
+        """
+        session = PlayerSession(camera, self.__streams[camera])
+
+        def on_spawned() -> None:
+            record_latency(Stage.SPAWN, event)
+            LOG.info("Camera stream of camera %s has started%s.", camera, "" if window else " hidden (pre-warmed)")
+
+        session.visible = window is not None
+        session.window = window
+        self.__sessions[camera] = session
+        if primary and window:
+            self.__measure_ttff(session, "cold")
+        self.__backend.start(session, on_spawned, lambda: self.__complete_ttff(session, "frame"))
+        return session
+
+    def __stop_session(self, event: Event, session: PlayerSession) -> None:
+        """
+        Stop a player session.
+        :param event: Event which triggered the stop.
+        :param session: Player session.
+        :return: None
+        """
+        def on_stopped() -> None:
+            record_latency(Stage.COMPLETION, event)
+            LOG.info("Camera stream of camera %s has been stopped.", session.camera)
+
+        if self.__sessions.get(session.camera) is session:
+            del self.__sessions[session.camera]
+        with self.__ttff_lock:
+            if self.__ttff_session is session:
+                self.__ttff_start = None
+        self.__backend.stop(session, on_stopped)
+
+    def __restart_session(self, event: Event, session: PlayerSession,
+                          window: Optional[Tuple[int, int, int, int]]) -> None:
+        """
+        Restart a player session.
+        :param event: Event which triggered the restart.
+        :param session: Player session.
+        :param window: Window (left, top, right, bottom) to show the stream in or None to start the player hidden.
+        :return: None
+        """
+        self.__stop_session(event, session)
+        self.__start_session(event, session.camera, window, bool(self.__shown) and session.camera == self.__shown[0])
+
+    def __show_session(self, event: Event, session: PlayerSession,
+                       window: Optional[Tuple[int, int, int, int]]) -> None:
+        """
+        Show a running player session in the given window or hide it. If this fails the player is restarted instead,
+        the restart is requested via the communication queue as the backend may report the result from its own thread.
+        :param event: Event which triggered the change.
+        :param session: Player session.
+        :param window: Window (left, top, right, bottom) to show the stream in or None to hide the player.
+        :return: None
+        """
+        def on_completed(success: bool) -> None:
+            if success:
+                record_latency(Stage.COMPLETION, event)
+                LOG.info("Camera stream of camera %s has been %s.", session.camera, "shown" if window else "hidden")
+                if window:
+                    self.__complete_ttff(session, "shown")
+            elif self.__backend.is_running(session):
+                LOG.warning("Cannot %s camera stream of camera %s, restarting it.", "show" if window else "hide",
+                            session.camera)
+                self.__communication_queue.put(EventProcessRestart(self.__backend.process_name(session),
+                                                                   EventProcessRestart.UNRESPONSIVE, event))
+
+        # The backend compares the new window with the current window of the session
+        self.__backend.show(session, window, on_completed)
+        session.visible = window is not None
+        if window is not None:
+            session.window = window
+
+    def __show_cameras(self, event: Event, cameras: List[str]) -> None:
+        """
+        Show the given cameras and hide all others, reusing running sessions if possible.
+        :param event: Event which triggered the change.
+        :param cameras: List of camera IDs to be shown, the first camera is the primary camera.
+        :return: None
+        """
+        for session in list(self.__sessions.values()):
+            if session.visible and session.camera not in cameras:
+                self.__show_session(event, session, None)
+
+        windows = self.__layout(len(cameras)) if cameras else []
+        for index, (camera, window) in enumerate(zip(cameras, windows)):
+            session = self.__sessions.get(camera)
+            if session is None:
+                self.__start_session(event, camera, window, index == 0)
+                self.__switches[False].increment()
+            elif not session.visible:
+                if index == 0:
+                    self.__measure_ttff(session, "prewarmed")
+                self.__switches[True].increment()
+                self.__show_session(event, session, window)
+            elif session.window != window:
+                self.__show_session(event, session, window)
+            self.__sessions.move_to_end(camera)
+
+    def __update(self, event: Event) -> None:
+        """
+        Bring the player sessions in line with the requested show and pre-warm states and the cameras detecting motion.
+        :param event: Event which triggered the update.
+        :return: None
+        """
+        # Forget exited players
+        for session in [session for session in self.__sessions.values() if not self.__backend.is_running(session)]:
+            self.__stop_session(event, session)
+
+        if self.__show:
+            self.__shown = self.__select_cameras()
+            self.__show_cameras(event, self.__shown)
+        elif self.__prewarm:
+            # Keep the session of the camera to be shown next ready, the shown cameras are remembered
+            prewarmed = self.__select_cameras()[0]
+            self.__show_cameras(event, [])
+            if prewarmed not in self.__sessions:
+                self.__start_session(event, prewarmed, None)
+        else:
+            self.__shown = []
+            for session in list(self.__sessions.values()):
+                self.__stop_session(event, session)
+            return
+
+        # Evict the least recently used hidden sessions
+        for session in list(self.__sessions.values()):
+            if len(self.__sessions) <= self.__max_sessions:
+                break
+            if not session.visible:
+                self.__stop_session(event, session)
+
+    def __set_streams(self, event: Event, streams: Dict[str, str]) -> None:
+        """
+        Replace the camera stream registry, sessions of changed or removed streams are restarted or stopped.
+        :param event: Event which triggered the change.
+        :param streams: Dictionary mapping camera IDs to stream URLs, the first camera is the default camera.
+        :return: None
+        """
+        LOG.info("Camera streams have changed.")
+        self.__streams = streams
+        self.__shown = [camera for camera in self.__shown if camera in streams]
+        for camera in [camera for camera in self.__motions if camera not in streams]:
+            del self.__motions[camera]
+        for session in list(self.__sessions.values()):
+            if streams.get(session.camera) != session.url:
+                self.__stop_session(event, session)
+        self.__update(event)
+
+    def __set_motion(self, event: EventMotionChanged) -> None:
+        """
+        Take over the motion state of a camera and switch the shown (or pre-warmed) cameras.
+        :param event: CAMERA_MOTION_CHANGED event.
+        :return: None
+        """
+        camera = event.camera() or self.__default_camera()
+        if camera not in self.__streams:
+            LOG.warning("Motion of unknown camera %s ignored for the camera selection.", camera)
+            return
+        self.__motions.pop(camera, None)
+        if event.motion():
+            self.__motions[camera] = None
+        if self.__show or self.__prewarm:
+            self.__update(event)
+
+    def __restart_process(self, event: EventProcessRestart) -> None:
+        """
+        Restart the player session of a failed player, hidden sessions are stopped unless they couldn't be hidden.
+        :param event: PROCESS_RESTART event.
+        :return: None
+        """
+        session = next((session for session in self.__sessions.values()
+                        if self.__backend.process_name(session) == event.process()), None)
+        if session is None:
+            return
+        if session.visible:
+            self.__restart_session(event, session, session.window)
+        elif event.reason() == EventProcessRestart.UNRESPONSIVE and self.__backend.is_running(session):
+            # Keep the session which couldn't be hidden running hidden
+            self.__restart_session(event, session, None)
+        else:
+            self.__stop_session(event, session)
+
+    # pylint: disable=no-self-use
+    def has_blocking_dispatch(self) -> bool:
+        """
+        Check if the dispatch() function of the object may block for a noticeable time.
+        :return: True if dispatching may block, False otherwise.
+        """
+        return True
+
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | {Signal.CAMERA_STREAM_CONTROL, Signal.CAMERA_STREAM_PREWARM,
+                                    Signal.CAMERA_MOTION_CHANGED, Signal.CONFIG_CHANGED, Signal.PROCESS_RESTART}
 
-    def dispatch(self, event: Union[Event, EventControl]) -> None:
+    def dispatch(self, event: Union[Event, EventConfigChanged, EventControl, EventMotionChanged,
+                                    EventProcessRestart]) -> None:
         """
         Dispatch the given event to the object.
         :param event: Event to be dispatched.
         :return None
         """
-        if event.signal() == Signal.CAMERA_STREAM_CONTROL:
-            if event.enable():
-                if self.__process is None or self.__process.poll() is not None:
-                    self.__start_stream()
-            else:
-                if self.__process is not None and self.__process.poll() is None:
-                    self.__stop_stream()
+        if event.signal() is Signal.CAMERA_STREAM_CONTROL:
+            self.__show = event.enable()
+            self.__update(event)
+        elif event.signal() is Signal.CAMERA_STREAM_PREWARM:
+            self.__prewarm = event.enable()
+            self.__update(event)
+        elif event.signal() is Signal.CAMERA_MOTION_CHANGED:
+            self.__set_motion(event)
+        elif event.signal() is Signal.CONFIG_CHANGED:
+            if event.config().streams() != self.__streams:
+                self.__set_streams(event, event.config().streams())
+        elif event.signal() is Signal.PROCESS_RESTART:
+            self.__restart_process(event)
         else:
             super().dispatch(event)
 
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for loading the configuration file and watching it for changes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import select
+import sys
+import time
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from events.event_config_changed import EventConfigChanged
+from events.event_queue import EventQueue
+from miscellaneous.inotify import IN_CLOSE_WRITE, IN_MOVED_TO, Inotify
+from miscellaneous.metrics import REGISTRY
+from objects.camera_stream import parse_streams
+from objects.power_manager import PowerSchedule, WeeklySchedule
+from objects.threaded_object import ThreadedObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class Config:
+    """
+    Class holding the reloadable settings. Configurations are immutable and compare equal if all settings are equal.
+    """
+    __slots__ = ("__schedules", "__schedule", "__motion_timeout", "__slideshow_interval", "__stream_urls", "__streams")
+
+    # Keys of the configuration file
+    KEYS = ("schedule", "motion_timeout", "slideshow_interval", "stream_url")
+
+    def __init__(self, schedules: Sequence[str], motion_timeout: int, slideshow_interval: int,
+                 stream_urls: Sequence[str]):
+        """
+        Class constructor.
+        :param schedules: Power mode schedules in the format of the --schedule command line argument.
+        :param motion_timeout: Timeout of the motion detection in seconds.
+        :param slideshow_interval: Interval between two pictures in seconds.
+        :param stream_urls: Camera streams in the format of the --stream-url command line argument.
+        :raise: ValueError if a setting is invalid.
+        """
+        if motion_timeout <= 0:
+            raise ValueError(f"Invalid motion timeout {motion_timeout} specified.")
+        if slideshow_interval <= 0:
+            raise ValueError(f"Invalid slideshow interval {slideshow_interval} specified.")
+
+        self.__schedules = tuple(schedules)
+        self.__schedule = WeeklySchedule([PowerSchedule.parse(schedule) for schedule in schedules]) \
+            if schedules else None
+        self.__motion_timeout = motion_timeout
+        self.__slideshow_interval = slideshow_interval
+        self.__stream_urls = tuple(stream_urls)
+        self.__streams = parse_streams(stream_urls)
+
+    @staticmethod
+    def load(path: str, defaults: Config) -> Config:
+        """
+        Load a configuration file. The file contains a JSON object with any of the keys "schedule" (list of power mode
+        schedules), "motion_timeout", "slideshow_interval" (seconds) and "stream_url" (camera stream or list of camera
+        streams), missing keys keep their default.
+        :param path: Path to the configuration file.
+        :param defaults: Configuration providing the settings missing in the file.
+        :return: Loaded configuration.
+        :raise: OSError if the file cannot be read, ValueError if it is invalid.
+        """
+        with open(path, "r", encoding="utf-8") as config_file:
+            content = json.load(config_file)
+
+        if not isinstance(content, dict):
+            raise ValueError("Configuration must be a JSON object.")
+        unknown_keys = set(content) - set(Config.KEYS)
+        if unknown_keys:
+            raise ValueError(f"Unknown configuration keys: {', '.join(sorted(unknown_keys))}.")
+
+        schedules = content.get("schedule", defaults.schedules())
+        if not isinstance(schedules, (list, tuple)) or not all(isinstance(item, str) for item in schedules):
+            raise ValueError("Key 'schedule' must be a list of strings.")
+        for key in ("motion_timeout", "slideshow_interval"):
+            if key in content and (not isinstance(content[key], int) or isinstance(content[key], bool)):
+                raise ValueError(f"Key '{key}' must be an integer.")
+        stream_urls = content.get("stream_url", defaults.stream_urls())
+        if isinstance(stream_urls, str):
+            stream_urls = [stream_urls]
+        if not isinstance(stream_urls, (list, tuple)) or not all(isinstance(item, str) for item in stream_urls) or \
+                ("stream_url" in content and not stream_urls):
+            raise ValueError("Key 'stream_url' must be a non-empty string or list of strings.")
+
+        return Config(schedules, content.get("motion_timeout", defaults.motion_timeout()),
+                      content.get("slideshow_interval", defaults.slideshow_interval()), stream_urls)
+
+    def __values(self) -> Tuple[Any, ...]:
+        """
+        Get the settings compared by this configuration.
+        :return: Tuple of settings in the order of KEYS.
+        """
+        return self.__schedules, self.__motion_timeout, self.__slideshow_interval, self.__stream_urls
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Check if two configurations are equal.
+        :param other: Other configuration.
+        :return: True if all settings are equal, False otherwise.
+        """
+        if not isinstance(other, Config):
+            return NotImplemented
+        return self.__values() == other.__values()    # pylint: disable=protected-access
+
+    def __hash__(self) -> int:
+        """
+        Get the hash of the configuration.
+        :return: Hash of all settings.
+        """
+        return hash(self.__values())
+
+    def changes(self, other: Config) -> List[str]:
+        """
+        Get the settings which differ from another configuration.
+        :param other: Other configuration.
+        :return: List of keys of the changed settings.
+        """
+        # pylint: disable=protected-access
+        return [key for key, value, other_value in zip(self.KEYS, self.__values(), other.__values())
+                if value != other_value]
+
+    def schedules(self) -> Tuple[str, ...]:
+        """
+        Get the power mode schedules as specified.
+        :return: Tuple of power mode schedules.
+        """
+        return self.__schedules
+
+    def schedule(self) -> Optional[WeeklySchedule]:
+        """
+        Get the compiled power mode schedules.
+        :return: Weekly schedule or None if no schedule has been specified.
+        """
+        return self.__schedule
+
+    def motion_timeout(self) -> int:
+        """
+        Get the motion timeout.
+        :return: Timeout of the motion detection in seconds.
+        """
+        return self.__motion_timeout
+
+    def slideshow_interval(self) -> int:
+        """
+        Get the slideshow interval.
+        :return: Interval between two pictures in seconds.
+        """
+        return self.__slideshow_interval
+
+    def stream_urls(self) -> Tuple[str, ...]:
+        """
+        Get the camera streams as specified.
+        :return: Tuple of camera streams.
+        """
+        return self.__stream_urls
+
+    def streams(self) -> Dict[str, str]:
+        """
+        Get the camera stream registry.
+        :return: Dictionary mapping camera IDs to stream URLs, the first camera is the default camera.
+        """
+        return dict(self.__streams)
+
+
+class ConfigWatcher(ThreadedObject):
+    """
+    Class watching the configuration file and announcing valid changes with a CONFIG_CHANGED event. The directory of
+    the file is watched with inotify, so that files replaced by a rename (as most editors save) are detected as well.
+    If inotify is unavailable the modification time of the file is polled. Invalid files are reported and ignored, the
+    previous configuration stays active.
+    """
+    # Maximum number of seconds between two checks of the stop request, also the polling interval without inotify
+    __POLL_INTERVAL = 1.0
+
+    # inotify instance
+    __inotify = None
+
+    def __init__(self, communication_queue: EventQueue, path: str, defaults: Config):
+        """
+        Class constructor.
+        :param communication_queue: Queue used for event communication.
+        :param path: Path to the configuration file.
+        :param defaults: Configuration providing the settings missing in the file.
+        :raise: OSError if the file cannot be read, ValueError if it is invalid.
+        """
+        self.__communication_queue = communication_queue
+        self.__path = os.path.abspath(path)
+        self.__defaults = defaults
+        self.__file_state = self.__get_file_state()
+        self.__config = Config.load(self.__path, defaults)
+        self.__reloads = {result: REGISTRY.counter("config_reloads_total", {"result": result})
+                          for result in ("applied", "unchanged", "invalid")}
+        super().__init__(self.__watch)
+
+    def config(self) -> Config:
+        """
+        Get the active configuration.
+        :return: Configuration.
+        """
+        return self.__config
+
+    def __get_file_state(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Get the state of the configuration file compared by the polling fallback.
+        :return: Tuple consisting of inode, size and modification time or None if the file doesn't exist.
+        """
+        try:
+            stat = os.stat(self.__path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def __open_inotify(self) -> Optional[Inotify]:
+        """
+        Start watching the directory of the configuration file with inotify.
+        :return: inotify instance or None if inotify is unavailable.
+        """
+        inotify = None
+        try:
+            inotify = Inotify()
+            inotify.add_watch(os.path.dirname(self.__path), IN_CLOSE_WRITE | IN_MOVED_TO)
+        except OSError as exception:
+            if inotify is not None:
+                inotify.close()
+            LOG.warning("Cannot watch %s with inotify (%s), polling it instead.", self.__path, exception)
+            return None
+
+        return inotify
+
+    def __read_inotify_events(self) -> bool:
+        """
+        Read all pending inotify events.
+        :return: True if one of the events concerns the configuration file, False otherwise.
+        """
+        file_name = os.path.basename(self.__path)
+        return any(name == file_name for _, _, name in self.__inotify.read())
+
+    def reload(self) -> bool:
+        """
+        Load the configuration file and announce it if it is valid and differs from the active configuration.
+        :return: True if a new configuration has been applied, False otherwise.
+        """
+        try:
+            config = Config.load(self.__path, self.__defaults)
+            if not config.stream_urls() and self.__config.stream_urls():
+                raise ValueError("Key 'stream_url' is missing.")
+        except (OSError, ValueError) as exception:
+            LOG.error("Ignoring invalid configuration %s: %s", self.__path, exception)
+            self.__reloads["invalid"].increment()
+            return False
+
+        if config == self.__config:
+            self.__reloads["unchanged"].increment()
+            return False
+
+        LOG.info("Configuration %s changed: %s.", self.__path, ", ".join(self.__config.changes(config)))
+        self.__config = config
+        self.__reloads["applied"].increment()
+        self.__communication_queue.put(EventConfigChanged(config))
+        return True
+
+    def __watch(self) -> None:
+        """
+        Watch the configuration file until the object is stopped.
+        :return: None
+        """
+        self.__inotify = self.__open_inotify()
+        LOG.info("Configuration watcher has started.")
+
+        while self.shall_run():
+            if self.__inotify is not None:
+                ready, _, _ = select.select([self.__inotify], [], [], self.__POLL_INTERVAL)
+                if ready and self.__read_inotify_events():
+                    self.reload()
+            else:
+                time.sleep(self.__POLL_INTERVAL)
+                file_state = self.__get_file_state()
+                if file_state != self.__file_state:
+                    self.__file_state = file_state
+                    if file_state is not None:
+                        self.reload()
+
+        if self.__inotify is not None:
+            self.__inotify.close()
+            self.__inotify = None
+        LOG.info("Configuration watcher has stopped.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
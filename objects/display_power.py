@@ -5,15 +5,20 @@
 """
 
 import logging
-import subprocess
+import re
 import sys
+import time
 
-from queue import Queue
-from typing import Union
+from threading import Lock
+from typing import List, Optional, Set, Tuple, Union
 
 from events.event import Event
 from events.event_control import EventControl
+from events.event_queue import EventQueue
 from events.signals import Signal
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.process import ProcessLauncher
+from miscellaneous.tracing import Stage, record_latency
 from objects.passive_object import PassiveObject
 
 # Define the logger
@@ -22,32 +27,163 @@ LOG = logging.getLogger(__name__)
 
 class DisplayPower(PassiveObject):
     """
-    Class controlling the display power.
+    Class controlling the display power. The power state of the display is tracked (queried when the object is started
+    and taken from the output of each command), so that requests for the current state don't run vcgencmd at all. Commands are spawned without waiting for them to complete, while a command is running only the
+    latest request is kept and carried out afterwards. If the power state cannot be queried, requests are carried out
+    without knowing it.
     """
-    def __init__(self, communication_queue: Queue):
+    # Pattern of the power state reported by vcgencmd
+    __STATE_PATTERN = re.compile(r"display_power=(\d+)")
+
+    # Buckets of the command latency histogram in seconds
+    __COMMAND_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+    def __init__(self, communication_queue: EventQueue, launcher: Optional[ProcessLauncher] = None):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
+        :param launcher: Launcher used to run vcgencmd or None for a synchronous launcher.
         """
         self.__communication_queue = communication_queue
+        self.__launcher = launcher or ProcessLauncher()
+
+        # Power state of the display (None while unknown), latest request which hasn't been carried out yet (power
+        # state and triggering event), flag indicating whether a command is running and flag indicating whether the last
+        # query failed
+        self.__lock = Lock()
+        self.__power_state: Optional[bool] = None
+        self.__request: Optional[Tuple[bool, Event]] = None
+        self.__running = False
+        self.__query_failed = False
+
+        self.__latencies = {command: REGISTRY.histogram("display_power_command_seconds", {"command": command},
+                                                        self.__COMMAND_BUCKETS)
+                            for command in ("query", "switch")}
+        self.__failures = REGISTRY.counter("display_power_command_failures_total")
+        self.__suppressed = {reason: REGISTRY.counter("display_power_suppressed_total", {"reason": reason})
+                             for reason in ("redundant", "superseded")}
+        self.__state = REGISTRY.gauge("display_power_on")
         super().__init__()
 
-    @staticmethod
-    def __power_display(shall_power_on: bool) -> None:
+    def __request_power(self, shall_power_on: bool, event: Event) -> None:
         """
-        Control the display power.
+        Request a display power state, replacing a request which hasn't been carried out yet.
         :param shall_power_on: True if the display shall be powered on, False if it shall be powered off.
+        :param event: Event which triggered the request.
+        :return: None
+        """
+        with self.__lock:
+            if self.__request is not None:
+                self.__suppressed["superseded"].increment()
+            self.__request = (shall_power_on, event)
+        self.__next_command()
+
+    def start(self) -> "DisplayPower":
+        """
+        Query the power state of the display unless a command is running, so that the first request doesn't wait for
+        the query. An asynchronous launcher requires the call from the running event loop.
+        :return: Object itself.
+        """
+        with self.__lock:
+            if self.__running:
+                return self
+            self.__running = True
+        self.__run([], None)
+        return self
+
+    def __next_command(self) -> None:
+        """
+        Run the next command unless a command is running: a query if the power state is unknown (and the last query
+        hasn't failed) or a switch if the requested power state differs from the power state of the display.
+        :return: None
+        """
+        with self.__lock:
+            if self.__running or self.__request is None:
+                return
+            shall_power_on, event = self.__request
+            if shall_power_on == self.__power_state:
+                self.__request = None
+                self.__suppressed["redundant"].increment()
+                LOG.debug("Display power is already %s.", "on" if shall_power_on else "off")
+                return
+            self.__running = True
+            if self.__power_state is None and not self.__query_failed:
+                # The request is kept until the power state is known
+                arguments = []
+            else:
+                self.__request = None
+                arguments = ["1" if shall_power_on else "0"]
+        self.__run(arguments, event)
+
+    def __run(self, arguments: List[str], event: Optional[Event]) -> None:
+        """
+        Spawn vcgencmd to query or switch the display power.
+        :param arguments: Empty to query the power state, ["1"] or ["0"] to switch the display power on or off.
+        :param event: Event which triggered the command or None for the query at startup.
         :return: None
         """
-        vcgencmd_call = ["vcgencmd", "display_power", "1" if shall_power_on else "0"]
-        process = subprocess.Popen(vcgencmd_call, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
-                                   universal_newlines=True)
-        LOG.info("Display power switched %s.", "on" if shall_power_on else "off")
-        process.wait()
+        start = time.monotonic()
+        output = []
+
+        def on_spawned() -> None:
+            if arguments:
+                record_latency(Stage.SPAWN, event)
+
+        def on_exited(return_code: int) -> None:
+            self.__completed(arguments, event, output, return_code, time.monotonic() - start)
 
-        _, stderr = process.communicate()
-        if stderr:
-            LOG.error(stderr)
+        try:
+            self.__launcher.spawn(["vcgencmd", "display_power"] + arguments, on_spawned=on_spawned,
+                                  on_output=output.append, on_exited=on_exited)
+        except OSError as exception:
+            LOG.error("Cannot run vcgencmd: %s", exception)
+            on_exited(-1)
+
+    # pylint: disable=too-many-arguments
+    def __completed(self, arguments: List[str], event: Optional[Event], output: List[str], return_code: int,
+                    latency: float) -> None:
+        """
+        Take over the power state reported by a completed command and run the next command.
+        :param arguments: Arguments of the command (see __run()).
+        :param event: Event which triggered the command or None for the query at startup.
+        :param output: Output lines of the command.
+        :param return_code: Return code of the command.
+        :param latency: Time from spawning the command until its completion in seconds.
+        :return: None
+        """
+        matches = [match for match in map(self.__STATE_PATTERN.search, output) if match]
+        with self.__lock:
+            self.__running = False
+            self.__latencies["switch" if arguments else "query"].observe(latency)
+            if return_code == 0 and matches:
+                self.__power_state = matches[-1].group(1) != "0"
+                self.__state.set(1 if self.__power_state else 0)
+                self.__query_failed = False
+            else:
+                self.__power_state = None
+                self.__failures.increment()
+                if not arguments:
+                    # Carry out the pending request without knowing the power state instead of querying over and over
+                    # again
+                    self.__query_failed = True
+            power_state = self.__power_state
+
+        if power_state is None:
+            LOG.error("%s failed with return code %d: %s", " ".join(["vcgencmd", "display_power"] + arguments),
+                      return_code, " ".join(output))
+        elif arguments:
+            LOG.info("Display power switched %s in %.0f ms.", "on" if power_state else "off", latency * 1000)
+            record_latency(Stage.COMPLETION, event)
+        else:
+            LOG.info("Display power is %s.", "on" if power_state else "off")
+        self.__next_command()
+
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | {Signal.DISPLAY_POWER_CONTROL}
 
     def dispatch(self, event: Union[Event, EventControl]) -> None:
         """
@@ -55,8 +191,8 @@ class DisplayPower(PassiveObject):
         :param event: Event to be dispatched.
         :return None
         """
-        if event.signal() == Signal.DISPLAY_POWER_CONTROL:
-            self.__power_display(event.enable())
+        if event.signal() is Signal.DISPLAY_POWER_CONTROL:
+            self.__request_power(event.enable(), event)
         else:
             super().dispatch(event)
 
@@ -4,46 +4,148 @@
         Module responsible for dispatching events between objects.
 """
 
+from __future__ import annotations
+
 import logging
 import sys
 import time
 
-from queue import Queue
-from typing import List
+from typing import List, Optional
 
+from events.event import Event
+from events.event_journal import EventJournalWriter
+from events.event_queue import EventQueue
+from events.signals import SIGNAL_TABLE_SIZE, Signal
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.tracing import Stage, record_latency
 from objects.passive_object import PassiveObject
+from objects.subscriber_worker import SubscriberWorker
 from objects.threaded_object import ThreadedObject
 
+# Define the logger
+LOG = logging.getLogger(__name__)
+
 
 class EventDispatcher(ThreadedObject):
     """
     Class dispatching events to objects. An event posted to the EventDispatcher queue will be dispatched to all assigned
-    objects.
+    objects consuming the signal of the event. Events are taken from the queue in the order of their priority lanes.
     """
-    def __init__(self, communication_queue: Queue, objects: List[PassiveObject]):
+    def __init__(self, communication_queue: EventQueue, objects: List[PassiveObject], subscriber_workers: bool = False,
+                 recorder: Optional[EventJournalWriter] = None):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
-        :param objects: List of objects to dispatch all received events to. Each object must have a dispatch() function.
+        :param objects: List of objects to dispatch received events to. Each object must have a signals() and a
+                        dispatch() function.
+        :param subscriber_workers: True to serve objects with a blocking dispatch() function from their own worker
+                                   thread, False to dispatch all events from the dispatcher thread.
+        :param recorder: Journal recording all dispatched events or None.
         """
         self.__communication_queue = communication_queue
-        self.__objects = objects
+        self.__recorder = recorder
+
+        # Objects with a blocking dispatch function get their own worker
+        objects = list(objects)
+        self.__workers = []
+        if subscriber_workers:
+            for index, element in enumerate(objects):
+                if element.has_blocking_dispatch():
+                    objects[index] = SubscriberWorker(element)
+                    self.__workers.append(objects[index])
+                    LOG.debug("Dispatching to %s from a worker thread.", type(element).__name__)
+
+        # Subscription index: signal -> objects consuming the signal (tuples indexed by the signal value)
+        subscribers = [[] for _ in range(SIGNAL_TABLE_SIZE)]
+        for element in objects:
+            for signal in element.signals():
+                subscribers[signal].append(element)
+        self.__subscribers = tuple(tuple(elements) for elements in subscribers)
+
+        for signal in Signal:
+            subscribers = self.__subscribers[signal]
+            LOG.debug("%s is consumed by %s.", signal, ", ".join(type(element).__name__ for element in subscribers)
+                      if subscribers else "no object")
+
+        # Per-subscriber metrics of objects served by the dispatcher thread
+        self.__lags = {}
+        self.__durations = {}
+        for element in objects:
+            if not isinstance(element, SubscriberWorker):
+                labels = {"subscriber": type(element).__name__}
+                self.__lags[element] = REGISTRY.histogram("subscriber_lag_seconds", labels)
+                self.__durations[element] = REGISTRY.histogram("subscriber_dispatch_seconds", labels)
+
         super().__init__(self.__dispatch_events)
 
     def __dispatch_events(self) -> None:
         """
-        Dispatch incoming events to assigned queues.
+        Dispatch incoming events to the subscribed objects. Blocks on the queue until an event arrives.
         :return: None
         """
         while self.shall_run():
-            if self.__communication_queue.empty():
-                time.sleep(0.1)
-                continue
-
             event = self.__communication_queue.get()
-            for element in self.__objects:
+            if not self.shall_run():
+                # Woken up for termination
+                break
+
+            self.dispatch_event(event)
+
+    def dispatch_event(self, event: Event) -> None:
+        """
+        Dispatch an event to the subscribed objects from the calling thread.
+        :param event: Event to be dispatched.
+        :return: None
+        """
+        record_latency(Stage.DISPATCH, event)
+        if self.__recorder:
+            self.__recorder.record(event)
+
+        receive_time = time.monotonic()
+        for element in self.__subscribers[event.signal()]:
+            if element in self.__lags:
+                start_time = time.monotonic()
+                self.__lags[element].observe(start_time - receive_time)
+                element.dispatch(event)
+                self.__durations[element].observe(time.monotonic() - start_time)
+            else:
                 element.dispatch(event)
 
+    def start(self) -> EventDispatcher:
+        """
+        Start the dispatcher thread and the subscriber worker threads.
+        :return: Class instance.
+        """
+        for worker in self.__workers:
+            worker.start()
+        super().start()
+        return self
+
+    def is_running(self) -> bool:
+        """
+        Check if the dispatcher thread and all subscriber worker threads are running.
+        :return: True if all threads are running, False otherwise.
+        """
+        return super().is_running() and all(worker.is_running() for worker in self.__workers)
+
+    def dispatch(self, event: Event) -> None:
+        """
+        Dispatch the given event to the object.
+        :param event: Event to be dispatched.
+        :return: None
+        """
+        if event.signal() is Signal.TERMINATE:
+            if super().is_running():
+                # Wake up the dispatcher thread blocking on the queue
+                self.stop()
+                self.__communication_queue.put(event)
+            super().dispatch(event)
+
+            for worker in self.__workers:
+                worker.dispatch(event)
+        else:
+            super().dispatch(event)
+
 
 if __name__ == "__main__":
     logging.basicConfig(format="%(levelname)s: %(message)s")
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for showing the picture slideshow directly in the framebuffer.
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from threading import Event as Flag, Lock
+from typing import Deque, List, Optional, Set, Tuple, Union
+
+from events.event import Event
+from events.event_config_changed import EventConfigChanged
+from events.event_control import EventControl
+from events.signals import Signal
+from miscellaneous.framebuffer import Framebuffer, FramebufferGeometry
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.tracing import Stage, record_latency
+from objects.picture_cache import PictureCache
+from objects.picture_catalog import PictureCatalog
+from objects.picture_index import PictureIndex
+from objects.picture_mirror import PictureMirror
+from objects.threaded_object import ThreadedObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+def _init_worker() -> None:
+    """
+    Initialize a decoding process, decoding must not slow down the players.
+    :return: None
+    """
+    os.nice(10)
+
+
+# pylint: disable=too-many-locals
+def _render(path: str, geometry: FramebufferGeometry) -> Tuple[bytes, float]:
+    """
+    Decode a picture, rotate it according to its EXIF orientation, scale it down to fit the screen and convert it to a
+    frame in the pixel format of the framebuffer with the picture centered on black (run by the process pool).
+    :param path: Path to the picture.
+    :param geometry: Geometry of the framebuffer.
+    :return: Tuple consisting of the frame and the decoding time in seconds.
+    :raise: OSError if the picture cannot be read.
+    """
+    # pylint: disable=import-error,import-outside-toplevel
+    import numpy
+    from PIL import Image, ImageOps
+
+    start = time.monotonic()
+    try:
+        with Image.open(path) as image:
+            # Let the JPEG decoder scale down while decoding
+            image.draft("RGB", (geometry.width, geometry.height))
+            picture = ImageOps.exif_transpose(image)
+            picture.thumbnail((geometry.width, geometry.height), Image.Resampling.LANCZOS)
+            pixels = numpy.asarray(picture.convert("RGB"))
+    except (ValueError, SyntaxError, Image.DecompressionBombError) as exception:
+        raise OSError(f"Invalid picture ({exception})") from exception
+
+    height, width = pixels.shape[:2]
+    top, left = (geometry.height - height) // 2, (geometry.width - width) // 2
+    bytes_per_pixel = geometry.bits_per_pixel // 8
+    frame = numpy.zeros((geometry.height, geometry.line_length), numpy.uint8)
+    channels = ((geometry.red, pixels[..., 0]), (geometry.green, pixels[..., 1]), (geometry.blue, pixels[..., 2]))
+    if geometry.bits_per_pixel == 16:
+        # Pack the channels truncated to their lengths into native 16 bit pixels
+        packed = numpy.zeros((height, width), numpy.uint16)
+        for (offset, length), channel in channels:
+            packed |= (channel.astype(numpy.uint16) >> (8 - length)) << offset
+        frame.view(numpy.uint16)[top:top + height, left:left + width] = packed
+    else:
+        # Each channel is one byte of the little-endian pixel
+        area = frame[top:top + height, left * bytes_per_pixel:(left + width) * bytes_per_pixel]
+        for (offset, _), channel in channels:
+            area[:, offset // 8::bytes_per_pixel] = channel
+        if geometry.transparency[1]:
+            area[:, geometry.transparency[0] // 8::bytes_per_pixel] = 0xFF
+    return frame.tobytes(), time.monotonic() - start
+
+
+class FramebufferSlideshow(ThreadedObject):
+    """
+    Class showing the picture slideshow directly in the framebuffer, without X server and picture viewer. The next
+    pictures are decoded ahead of time by a pool of background processes into frames in the pixel format of the
+    framebuffer, so that showing a picture is a copy into the mapped framebuffer. A new picture wipes the previous one
+    from top to bottom, copying the lines straight from the decoded frame. The pictures are shown in the order of the
+    file list of the picture index (or picture cache or catalog), a changed list is continued after the current picture.
+    While the display is powered off no pictures are decoded or shown.
+    """
+    # Number of steps and duration in seconds of the wipe between two pictures
+    __TRANSITION_STEPS = 15
+    __TRANSITION_TIME = 0.5
+
+    # Maximum number of seconds between two checks of the stop request
+    __POLL_INTERVAL = 1.0
+
+    # Buckets of the decoding and blitting time histograms in seconds
+    __DECODE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    __BLIT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+    # Index of the picture directory
+    __picture_index = None
+
+    def __init__(self, framebuffer: Framebuffer, slideshow_interval: int, lookahead: int = 3,
+                 workers: Optional[int] = None):
+        """
+        Class constructor.
+        :param framebuffer: Framebuffer the pictures are shown in.
+        :param slideshow_interval: Interval between two pictures.
+        :param lookahead: Number of pictures decoded ahead of time.
+        :param workers: Number of decoding processes or None for half the number of CPUs (at most the lookahead).
+        """
+        self.__framebuffer = framebuffer
+        self.__slideshow_interval = slideshow_interval
+        self.__lookahead = max(1, lookahead)
+        self.__workers = min(self.__lookahead, workers or max(1, (os.cpu_count() or 2) // 2))
+
+        # Control state set by the dispatcher: flags indicating whether the slideshow is running and the display is
+        # powered and the event which started the slideshow until its first picture is shown
+        self.__lock = Lock()
+        self.__wakeup = Flag()
+        self.__playing = False
+        self.__display_on = True
+        self.__start_event: Optional[Event] = None
+
+        # Listed pictures and state of the file list (path, inode, size and modification time), index of the next
+        # picture to be decoded, path of the shown picture and decodings ahead of time
+        self.__pictures: List[str] = []
+        self.__list_state = None
+        self.__next_index = 0
+        self.__shown: Optional[str] = None
+        self.__pool: Optional[ProcessPoolExecutor] = None
+        self.__decodings: Deque[Tuple[str, Future]] = deque()
+        self.__next_frame = 0.0
+        self.__late = False
+
+        self.__frames = REGISTRY.counter("framebuffer_frames_total")
+        self.__failures = REGISTRY.counter("framebuffer_decode_failures_total")
+        self.__late_frames = REGISTRY.counter("framebuffer_late_frames_total")
+        self.__decode_time = REGISTRY.histogram("framebuffer_decode_seconds", None, self.__DECODE_BUCKETS)
+        self.__blit_time = REGISTRY.histogram("framebuffer_blit_seconds", None, self.__BLIT_BUCKETS)
+        super().__init__(self.__show)
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Check if pictures can be decoded, i.e. if Pillow and NumPy are installed.
+        :return: True if Pillow and NumPy are installed, False otherwise.
+        """
+        try:
+            # pylint: disable=import-error,import-outside-toplevel,unused-import
+            import numpy
+            import PIL.Image
+        except ImportError:
+            return False
+        return True
+
+    def set_picture_index(self,
+                          picture_index: Union[PictureIndex, PictureCache, PictureCatalog, PictureMirror]) -> None:
+        """
+        Set the index of the picture directory whose file list is shown.
+        :param picture_index: Picture index, the picture cache in front of it, the picture catalog writing the
+                              playlist or the picture mirror of any of them.
+        :return: None
+        """
+        self.__picture_index = picture_index
+
+    def __read_list(self) -> bool:
+        """
+        Read the file list of the picture index if it has changed.
+        :return: True if the file list has changed, False otherwise.
+        """
+        path = self.__picture_index.list_path() if self.__picture_index else None
+        if path is None:
+            return False
+        try:
+            stat = os.stat(path)
+            state = (path, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if state == self.__list_state:
+                return False
+            with open(path, "r", encoding="utf-8", errors="surrogateescape") as list_file:
+                pictures = list_file.read().splitlines()
+        except OSError as exception:
+            LOG.warning("Cannot read file list %s: %s", path, exception)
+            return False
+
+        self.__list_state = state
+        self.__pictures = pictures
+        # Continue after the current picture like feh does
+        position = pictures.index(self.__shown) if self.__shown in pictures else -1
+        self.__next_index = position + 1
+        LOG.debug("Framebuffer slideshow lists %d pictures.", len(pictures))
+        return True
+
+    def __cancel_decodings(self) -> None:
+        """
+        Cancel the decodings ahead of time.
+        :return: None
+        """
+        for _, future in self.__decodings:
+            future.cancel()
+        self.__decodings.clear()
+
+    def __start_pool(self) -> None:
+        """
+        Start the decoding processes, replacing a broken pool (e.g. after a decoding process has been killed).
+        :return: None
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=False, cancel_futures=True)
+        self.__pool = ProcessPoolExecutor(self.__workers, multiprocessing.get_context("spawn"), _init_worker)
+
+    def __decode_ahead(self) -> None:
+        """
+        Submit the decodings of the next pictures up to the lookahead.
+        :return: None
+        """
+        while self.__pictures and len(self.__decodings) < self.__lookahead:
+            path = self.__pictures[self.__next_index % len(self.__pictures)]
+            try:
+                future = self.__pool.submit(_render, path, self.__framebuffer.geometry())
+            except BrokenProcessPool:
+                LOG.warning("Decoding processes have failed, restarting them.")
+                self.__cancel_decodings()
+                self.__start_pool()
+                continue
+            self.__next_index = (self.__next_index + 1) % len(self.__pictures)
+            self.__decodings.append((path, future))
+
+    def __present(self, path: str, frame: bytes, transition: bool) -> float:
+        """
+        Copy a decoded frame to the framebuffer.
+        :param path: Path to the picture.
+        :param frame: Decoded frame.
+        :param transition: True to wipe the previous picture, False to replace it at once.
+        :return: Number of seconds spent copying.
+        """
+        view = memoryview(frame)
+        height = self.__framebuffer.geometry().height
+        steps = self.__TRANSITION_STEPS if transition else 1
+        copy_time = 0.0
+        for step in range(steps):
+            if step:
+                time.sleep(self.__TRANSITION_TIME / steps)
+            start = time.monotonic()
+            self.__framebuffer.blit(view, height * step // steps, height * (step + 1) // steps)
+            copy_time += time.monotonic() - start
+        self.__shown = path
+        return copy_time
+
+    def __show_next(self) -> None:
+        """
+        Show the next picture once it has been decoded.
+        :return: None
+        """
+        path, future = self.__decodings[0]
+        if not future.done():
+            # The first picture after the start cannot be decoded ahead of time
+            if not self.__late and self.__shown is not None:
+                self.__late = True
+                self.__late_frames.increment()
+                LOG.debug("Picture %s hasn't been decoded in time.", path)
+            wait([future], self.__POLL_INTERVAL)
+            return
+        self.__decodings.popleft()
+        self.__late = False
+        try:
+            frame, decode_time = future.result()
+        except (OSError, BrokenProcessPool) as exception:
+            LOG.warning("Cannot show picture %s: %s", path, exception)
+            self.__failures.increment()
+            return
+
+        blit_time = self.__present(path, frame, self.__shown is not None)
+        self.__decode_time.observe(decode_time)
+        self.__blit_time.observe(blit_time)
+        self.__frames.increment()
+        LOG.debug("Picture %s decoded in %.3f seconds and copied in %.4f seconds.", path, decode_time, blit_time)
+        self.__next_frame = time.monotonic() + self.__slideshow_interval
+        with self.__lock:
+            start_event, self.__start_event = self.__start_event, None
+        if start_event is not None:
+            record_latency(Stage.COMPLETION, start_event)
+
+    def __show(self) -> None:
+        """
+        Show the pictures until the object is stopped.
+        :return: None
+        """
+        LOG.info("Framebuffer slideshow has started on %s (%s) with %d decoding processes.",
+                 self.__framebuffer.path(), self.__framebuffer.geometry(), self.__workers)
+        self.__start_pool()
+        playing = False
+
+        while self.shall_run():
+            self.__wakeup.clear()
+            with self.__lock:
+                was_playing, playing, display_on = playing, self.__playing, self.__display_on
+            if was_playing and not playing:
+                self.__cancel_decodings()
+                self.__framebuffer.clear()
+                self.__shown = None
+                LOG.info("Framebuffer slideshow has been stopped.")
+            elif playing and not was_playing:
+                self.__next_frame = 0.0
+                LOG.info("Framebuffer slideshow has been started with an interval of %d seconds.",
+                         self.__slideshow_interval)
+
+            if self.__read_list():
+                self.__cancel_decodings()
+            if not playing or not display_on:
+                # Pictures decoded already are kept while the display is off
+                self.__wakeup.wait(self.__POLL_INTERVAL)
+                continue
+
+            self.__decode_ahead()
+            time_to_next_frame = self.__next_frame - time.monotonic()
+            if not self.__decodings:
+                self.__wakeup.wait(self.__POLL_INTERVAL)
+            elif time_to_next_frame > 0:
+                self.__wakeup.wait(min(time_to_next_frame, self.__POLL_INTERVAL))
+            else:
+                self.__show_next()
+
+        self.__pool.shutdown(wait=True, cancel_futures=True)
+        self.__framebuffer.close()
+        LOG.info("Framebuffer slideshow has stopped.")
+
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | {Signal.SLIDESHOW_CONTROL, Signal.DISPLAY_POWER_CONTROL, Signal.CONFIG_CHANGED}
+
+    def dispatch(self, event: Union[Event, EventConfigChanged, EventControl]) -> None:
+        """
+        Dispatch the given event to the object.
+        :param event: Event to be dispatched.
+        :return None
+        """
+        if event.signal() is Signal.SLIDESHOW_CONTROL:
+            with self.__lock:
+                if event.enable() and not self.__playing:
+                    self.__start_event = event
+                self.__playing = event.enable()
+            self.__wakeup.set()
+        elif event.signal() is Signal.DISPLAY_POWER_CONTROL:
+            with self.__lock:
+                self.__display_on = event.enable()
+            self.__wakeup.set()
+        elif event.signal() is Signal.CONFIG_CHANGED:
+            if event.config().slideshow_interval() != self.__slideshow_interval:
+                # Applied from the next picture on
+                self.__slideshow_interval = event.config().slideshow_interval()
+                LOG.info("Slideshow interval changed to %s.", self.__slideshow_interval)
+        else:
+            if event.signal() is Signal.TERMINATE:
+                # Let the worker leave its wait before it is joined
+                self.stop()
+                self.__wakeup.set()
+            super().dispatch(event)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
@@ -7,12 +7,12 @@
 import logging
 import sys
 
-from queue import Queue
-
-import RPi.GPIO as GPIO     # pylint: disable=import-error
+from typing import Any, Optional
 
 from events.event_motion_changed import EventMotionChanged
+from events.event_queue import EventQueue
 from events.signals import Signal
+from miscellaneous.gpio import load_gpio
 from objects.passive_object import PassiveObject
 
 # Define the logger
@@ -23,17 +23,19 @@ class MotionSensor(PassiveObject):
     """
     Class handling motion sensor detection.
     """
-    def __init__(self, communication_queue: Queue, gpio_channel: int):
+    def __init__(self, communication_queue: EventQueue, gpio_channel: int, gpio: Optional[Any] = None):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
         :param gpio_channel: GPIO BOARD channel number the motion sensor is connected to.
+        :param gpio: GPIO module (RPi.GPIO or a FakeGPIO) or None to load RPi.GPIO.
         """
         self.__communication_queue = communication_queue
         self.__gpio_channel = gpio_channel
+        self.__gpio = gpio or load_gpio()
 
-        GPIO.setup(self.__gpio_channel, GPIO.IN, pull_up_down=GPIO.PUD_OFF)
-        GPIO.add_event_detect(self.__gpio_channel, GPIO.BOTH, callback=self.__motion_detected)
+        self.__gpio.setup(self.__gpio_channel, self.__gpio.IN, pull_up_down=self.__gpio.PUD_OFF)
+        self.__gpio.add_event_detect(self.__gpio_channel, self.__gpio.BOTH, callback=self.__motion_detected)
         LOG.info("Motion sensor initialized at GPIO %d.", self.__gpio_channel)
 
         super().__init__()
@@ -46,12 +48,12 @@ class MotionSensor(PassiveObject):
         """
         assert gpio_channel == self.__gpio_channel
 
-        if GPIO.input(self.__gpio_channel) == GPIO.HIGH:
+        if self.__gpio.input(self.__gpio_channel) == self.__gpio.HIGH:
             LOG.info("Motion has been detected.")
-            self.__communication_queue.put(EventMotionChanged(Signal.SENSOR_MOTION_CHANGED, True))
+            self.__communication_queue.put(EventMotionChanged.create(Signal.SENSOR_MOTION_CHANGED, True))
         else:
             LOG.info("Motion has ended.")
-            self.__communication_queue.put(EventMotionChanged(Signal.SENSOR_MOTION_CHANGED, False))
+            self.__communication_queue.put(EventMotionChanged.create(Signal.SENSOR_MOTION_CHANGED, False))
 
 
 if __name__ == "__main__":
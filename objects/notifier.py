@@ -5,17 +5,17 @@
 """
 
 import logging
-import subprocess
 import sys
 import time
 
-from queue import Queue
 from shutil import which
-from typing import Union
+from typing import Optional, Set, Union
 
 from events.event import Event
 from events.event_notify import EventNotify
+from events.event_queue import EventQueue
 from events.signals import Signal
+from miscellaneous.process import ProcessLauncher
 from objects.threaded_object import ThreadedObject
 
 # Define the logger
@@ -29,14 +29,33 @@ class Notifier(ThreadedObject):
     # Notification text
     __text = None
 
-    def __init__(self, communication_queue: Queue):
+    def __init__(self, communication_queue: EventQueue, launcher: Optional[ProcessLauncher] = None):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
+        :param launcher: Launcher used to run aosd_cat or None for a synchronous launcher.
         """
         self.__communication_queue = communication_queue
+        self.__launcher = launcher or ProcessLauncher()
         super().__init__(self.__show_notification)
 
+    def show_pending(self) -> None:
+        """
+        Show the pending notification (if any).
+        :return: None
+        """
+        if self.__text:
+            if which("aosd_cat") is not None:
+                LOG.debug("Notification: %s", self.__text)
+
+                aosd_cat_call = ["aosd_cat", "--fore-color", "white", "--font", "Helvetica 20", "--position", "8",
+                                 "--x-offset", "-50", "--fade-in", "100", "--fade-full", "1000"]
+                self.__launcher.run(aosd_cat_call, input_text=self.__text)
+            else:
+                LOG.warning("Cannot show notification '%s', aosd_cat is unavailable.", self.__text)
+
+            self.__text = None
+
     def __show_notification(self) -> None:
         """
         Show received notifications.
@@ -45,30 +64,27 @@ class Notifier(ThreadedObject):
         LOG.info("Notifier has started.")
 
         while self.shall_run():
-            if self.__text:
-                if which("aosd_cat") is not None:
-                    LOG.debug("Notification: %s", self.__text)
-
-                    aosd_cat_call = ["aosd_cat", "--fore-color", "white", "--font", "Helvetica 20", "--position", "8",
-                                     "--x-offset", "-50", "--fade-in", "100", "--fade-full", "1000"]
-                    subprocess.run(aosd_cat_call, input=self.__text, check=False, universal_newlines=True)
-                else:
-                    LOG.warning("Cannot show notification '%s', aosd_cat is unavailable.", self.__text)
-
-                self.__text = None
+            self.show_pending()
 
             # Let the CPU take a rest
             time.sleep(0.25)
 
         LOG.info("Notifier has stopped.")
 
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | {Signal.NOTIFY}
+
     def dispatch(self, event: Union[Event, EventNotify]) -> None:
         """
         Dispatch the given event to the object.
         :param event: Event to be dispatched.
         :return None
         """
-        if event.signal() == Signal.NOTIFY:
+        if event.signal() is Signal.NOTIFY:
             self.__text = event.text()
         else:
             super().dispatch(event)
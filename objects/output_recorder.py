@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for recording events instead of acting on them, e.g. as fake outputs for replays.
+"""
+
+import logging
+import sys
+
+from threading import Condition
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from events.event import Event
+from events.signals import Signal
+from miscellaneous.clock import Clock, REAL_CLOCK
+from objects.passive_object import PassiveObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class OutputRecorder(PassiveObject):
+    """
+    Class recording the events dispatched to it. By default it consumes the control events, i.e. it stands in for the
+    display power, camera stream and slideshow objects.
+    """
+    # Default consumed signals
+    CONTROL_SIGNALS = (Signal.CAMERA_STREAM_CONTROL, Signal.DISPLAY_POWER_CONTROL, Signal.SLIDESHOW_CONTROL,
+                       Signal.CAMERA_STREAM_PREWARM)
+
+    def __init__(self, signals: Iterable[Signal] = CONTROL_SIGNALS, clock: Optional[Clock] = None):
+        """
+        Class constructor.
+        :param signals: Signals to be consumed.
+        :param clock: Clock used to timestamp the timeline or None for the real clock.
+        """
+        self.__clock = clock or REAL_CLOCK
+        self.__signals = set(signals)
+        self.__recorded = Condition()
+        self.__total = 0
+        self.__counts = {}
+        self.__states = {}
+        self.__timeline = []
+        super().__init__()
+
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | self.__signals
+
+    def dispatch(self, event: Event) -> None:
+        """
+        Record the given event.
+        :param event: Event to be recorded.
+        :return: None
+        """
+        signal = event.signal()
+        self.__counts[signal] = self.__counts.get(signal, 0) + 1
+        if self.__states.get(signal) != event.payload():
+            self.__states[signal] = event.payload()
+            self.__timeline.append((self.__clock.monotonic(), signal, event.payload()))
+        with self.__recorded:
+            self.__total += 1
+            self.__recorded.notify_all()
+
+    def wait_recorded(self, count: int, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a number of events has been recorded.
+        :param count: Number of recorded events to wait for.
+        :param timeout: Maximum number of seconds to wait or None to wait forever.
+        :return: True if the events have been recorded, False if the timeout expired.
+        """
+        with self.__recorded:
+            return self.__recorded.wait_for(lambda: self.__total >= count, timeout)
+
+    def counts(self) -> Dict[Signal, int]:
+        """
+        Get the number of recorded events per signal.
+        :return: Dictionary mapping signals to event counts.
+        """
+        return dict(self.__counts)
+
+    def timeline(self) -> List[Tuple[float, Signal, object]]:
+        """
+        Get the recorded payload changes.
+        :return: List of tuples consisting of monotonic time, signal and new payload.
+        """
+        return list(self.__timeline)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
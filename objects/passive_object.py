@@ -7,11 +7,33 @@
 import logging
 import sys
 
+from typing import Set
+
+from events.signals import Signal
+
 
 class PassiveObject:
     """
     Base class for all passive (i.e. non-threaded) objects.
     """
+    # pylint: disable=no-self-use
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object. Only events with one of these signals will
+        be dispatched to the object.
+        :return: Set of consumed signals.
+        """
+        return set()
+
+    # pylint: disable=no-self-use
+    def has_blocking_dispatch(self) -> bool:
+        """
+        Check if the dispatch() function of the object may block for a noticeable time (e.g. by waiting for processes or
+        hardware). Such objects can be served by their own worker thread.
+        :return: True if dispatching may block, False otherwise.
+        """
+        return False
+
     # pylint: disable=no-self-use
     def dispatch(self, _) -> None:
         """
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for caching the pictures of the slideshow scaled to the screen size.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.miscellaneous import read_screen_size
+from objects.picture_index import PictureIndex, PictureList
+from objects.threaded_object import ThreadedObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+# EXIF tag of the orientation and orientations rotating the picture by 90 degrees
+_EXIF_ORIENTATION = 0x0112
+_ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def _init_worker() -> None:
+    """
+    Initialize a conversion process, conversions must not slow down the players.
+    :return: None
+    """
+    os.nice(10)
+
+
+# pylint: disable=too-many-locals
+def _convert(path: str, cache_dir: str, screen_size: Tuple[int, int], quality: int) -> Tuple[str, Optional[str], int]:
+    """
+    Convert a picture to a JPEG fitting the screen and rotated according to its EXIF orientation (run by the process
+    pool). Pictures which already fit the screen unrotated are not converted.
+    :param path: Path to the picture.
+    :param cache_dir: Path to the cache directory.
+    :param screen_size: Tuple consisting of width and height of the screen in pixels.
+    :param quality: JPEG quality of the converted picture.
+    :return: Tuple consisting of the content hash of the picture, the file name of the converted picture in the cache
+             directory (None if the picture hasn't been converted) and the size of the picture in bytes.
+    :raise: OSError if the picture cannot be read or converted.
+    """
+    from PIL import Image, ImageOps     # pylint: disable=import-error,import-outside-toplevel
+
+    with open(path, "rb") as picture_file:
+        data = picture_file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{digest}-{screen_size[0]}x{screen_size[1]}.jpg"
+    entry_path = os.path.join(cache_dir, name)
+    if os.path.exists(entry_path):
+        # Same content under another path
+        return digest, name, len(data)
+
+    temporary_path = f"{entry_path}.{os.getpid()}.tmp"
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            orientation = image.getexif().get(_EXIF_ORIENTATION, 1)
+            if image.width <= screen_size[0] and image.height <= screen_size[1] and orientation == 1:
+                return digest, None, len(data)
+
+            # Let the JPEG decoder scale down while decoding
+            image.draft("RGB", screen_size[::-1] if orientation in _ROTATED_ORIENTATIONS else screen_size)
+            converted = ImageOps.exif_transpose(image)
+            converted.thumbnail(screen_size, Image.Resampling.LANCZOS)
+            if converted.mode not in ("RGB", "L"):
+                converted = converted.convert("RGB")
+            converted.save(temporary_path, "JPEG", quality=quality)
+    except (ValueError, SyntaxError, Image.DecompressionBombError) as exception:
+        raise OSError(f"Invalid picture ({exception})") from exception
+    os.replace(temporary_path, entry_path)
+    return digest, name, len(data)
+
+
+class _CacheEntry:
+    """
+    Class holding a converted picture of the cache.
+    """
+    __slots__ = ("size", "original_size", "last_used")
+
+    def __init__(self, size: int, original_size: int, last_used: float):
+        """
+        Class constructor.
+        :param size: Size of the converted picture in bytes.
+        :param original_size: Size of the original picture in bytes.
+        :param last_used: Time (seconds since the epoch) the converted picture has been used last.
+        """
+        self.size = size
+        self.original_size = original_size
+        self.last_used = last_used
+
+
+class PictureCache(ThreadedObject):
+    """
+    Class caching the pictures of the picture index scaled down to the screen size and rotated according to their EXIF
+    orientation, so that the picture viewer doesn't need to decode and scale full-resolution pictures. The pictures are
+    converted by a pool of background processes. Converted pictures are stored by their content hash, pictures are
+    only hashed again if their path, size or modification time changes. Once the cache exceeds its size budget the
+    least recently used pictures are evicted, the access time of a converted picture gives it a second chance. The
+    file list of the cache lists the converted pictures and the originals of the pictures not converted (yet).
+    """
+    # Path of the default file list
+    __LIST_PATH = "/tmp/surveillance_frame.{pid}.cached_pictures"
+
+    # File name of the manifest in the cache directory
+    __MANIFEST = "manifest.json"
+
+    # JPEG quality of the converted pictures
+    __QUALITY = 90
+
+    # Number of conversions queued per worker process
+    __CONVERSIONS_PER_WORKER = 2
+
+    # Number of seconds without changes until the file list is rewritten and maximum delay of a rewrite
+    __SETTLE_TIME = 2.0
+    __MAX_WRITE_DELAY = 30.0
+
+    # Number of seconds between two writes of a changed manifest
+    __MANIFEST_INTERVAL = 60.0
+
+    # Maximum number of seconds between two checks of the stop request
+    __POLL_INTERVAL = 1.0
+
+    # Buckets of the conversion time histogram in seconds
+    __CONVERSION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, picture_index: PictureIndex, cache_dir: str, size_budget: int, workers: Optional[int] = None,
+                 list_path: Optional[str] = None):
+        """
+        Class constructor.
+        :param picture_index: Index of the pictures to be cached.
+        :param cache_dir: Path to the cache directory, created if it doesn't exist.
+        :param size_budget: Maximum size of the converted pictures in bytes.
+        :param workers: Number of conversion processes or None for half the number of CPUs.
+        :param list_path: Path of the file list written for the picture viewer or None for a temporary file.
+        :raise: OSError if the cache directory cannot be created.
+        """
+        self.__picture_index = picture_index
+        self.__cache_dir = os.path.abspath(cache_dir)
+        self.__size_budget = size_budget
+        self.__workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.__screen_size = read_screen_size()
+        self.__list = PictureList(list_path or self.__LIST_PATH.format(pid=os.getpid()),
+                                  REGISTRY.counter("picture_cache_list_writes_total"))
+        os.makedirs(self.__cache_dir, exist_ok=True)
+
+        # Pictures of the index and their version, cache records by picture path (modification time, size, content
+        # hash and file name of the converted picture or None) and converted pictures by file name in LRU order
+        self.__version = None
+        self.__pictures: Tuple[str, ...] = ()
+        self.__records: Dict[str, Tuple[int, int, str, Optional[str]]] = {}
+        self.__entries: Dict[str, _CacheEntry] = OrderedDict()
+        self.__cache_size = 0
+        self.__bytes_saved = 0
+
+        # Queued and running conversions, flag indicating whether the cache is full, i.e. further conversions would
+        # evict converted pictures still listed
+        self.__pool: Optional[ProcessPoolExecutor] = None
+        self.__queue: Deque[Tuple[str, int, int]] = deque()
+        self.__running: Dict[Future, Tuple[str, int, int, float]] = {}
+        self.__full = False
+
+        # Start of the pending changes of the file list, time of the last change (None if the file list is up to
+        # date) and time of the last write of the manifest (None if the manifest is up to date)
+        self.__pending_since: Optional[float] = None
+        self.__last_change: Optional[float] = None
+        self.__manifest_changed: Optional[float] = None
+
+        self.__lookups = {result: REGISTRY.counter("picture_cache_lookups_total", {"result": result})
+                          for result in ("hit", "miss")}
+        self.__conversions = {result: REGISTRY.counter("picture_cache_conversions_total", {"result": result})
+                              for result in ("converted", "duplicate", "unchanged", "failed")}
+        self.__conversion_time = REGISTRY.histogram("picture_cache_conversion_seconds", None,
+                                                    self.__CONVERSION_BUCKETS)
+        self.__evictions = REGISTRY.counter("picture_cache_evictions_total")
+        self.__pending = REGISTRY.gauge("picture_cache_pending")
+        self.__size = REGISTRY.gauge("picture_cache_bytes")
+        self.__saved = REGISTRY.gauge("picture_cache_bytes_saved")
+        super().__init__(self.__maintain)
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Check if pictures can be converted, i.e. if Pillow is installed.
+        :return: True if Pillow is installed, False otherwise.
+        """
+        try:
+            import PIL.Image    # pylint: disable=import-error,import-outside-toplevel,unused-import
+        except ImportError:
+            return False
+        return True
+
+    def list_path(self) -> Optional[str]:
+        """
+        Get the file list of the cached pictures.
+        :return: Path of the file list or None if the pictures of the index haven't been looked up yet.
+        """
+        return self.__list.path()
+
+    def set_on_list_ready(self, on_ready: Callable[[], None]) -> None:
+        """
+        Set the function called once the file list has been written for the first time.
+        :param on_ready: Function called from the cache thread (or right away if the list has already been written).
+        :return: None
+        """
+        self.__list.set_on_ready(on_ready)
+
+    def pictures(self) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Get the cached pictures as written to the file list.
+        :return: Tuple consisting of the version of the file list and the paths to the converted pictures or their
+                 originals.
+        """
+        return self.__list.pictures()
+
+    def cached_path(self, picture: str) -> str:
+        """
+        Get the path of the converted picture of an original picture.
+        :param picture: Path to the original picture.
+        :return: Path to the converted picture or to the original if it hasn't been converted.
+        """
+        record = self.__records.get(picture)
+        name = record[3] if record else None
+        return os.path.join(self.__cache_dir, name) if name in self.__entries else picture
+
+    def __changed(self) -> None:
+        """
+        Mark the file list and the manifest as changed.
+        :return: None
+        """
+        self.__last_change = time.monotonic()
+        if self.__pending_since is None:
+            self.__pending_since = self.__last_change
+        if self.__manifest_changed is None:
+            self.__manifest_changed = self.__last_change
+        self.__pending.set(len(self.__queue) + len(self.__running))
+        self.__size.set(self.__cache_size)
+        self.__saved.set(self.__bytes_saved)
+
+    def __add_entry(self, name: str, size: int, original_size: int, last_used: float) -> None:
+        """
+        Add a converted picture to the cache.
+        :param name: File name of the converted picture.
+        :param size: Size of the converted picture in bytes.
+        :param original_size: Size of the original picture in bytes.
+        :param last_used: Time (seconds since the epoch) the converted picture has been used last.
+        :return: None
+        """
+        self.__entries[name] = _CacheEntry(size, original_size, last_used)
+        self.__cache_size += size
+        self.__bytes_saved += original_size - size
+
+    def __remove_entry(self, name: str) -> None:
+        """
+        Remove a converted picture from the cache.
+        :param name: File name of the converted picture.
+        :return: None
+        """
+        entry = self.__entries.pop(name)
+        self.__cache_size -= entry.size
+        self.__bytes_saved -= entry.original_size - entry.size
+        try:
+            os.remove(os.path.join(self.__cache_dir, name))
+        except OSError as exception:
+            LOG.warning("Cannot remove cached picture %s: %s", name, exception)
+
+    def __load_manifest(self) -> None:
+        """
+        Load the manifest of the cache directory. Converted pictures missing in the manifest (e.g. after a crash) and
+        pictures converted for another screen size are removed.
+        :return: None
+        """
+        path = os.path.join(self.__cache_dir, self.__MANIFEST)
+        try:
+            with open(path, "r", encoding="utf-8", errors="surrogateescape") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get("screen") != list(self.__screen_size):
+                raise ValueError("screen size changed")
+            entries = manifest["entries"]
+            records = manifest["records"]
+        except FileNotFoundError:
+            entries, records = {}, {}
+        except (OSError, ValueError, KeyError, AttributeError) as exception:
+            LOG.warning("Discarding picture cache manifest %s: %s", path, exception)
+            entries, records = {}, {}
+
+        for name in sorted(os.listdir(self.__cache_dir)):
+            file_path = os.path.join(self.__cache_dir, name)
+            if name == self.__MANIFEST:
+                continue
+            if name in entries and os.path.isfile(file_path):
+                _, original_size, last_used = entries[name]
+                self.__add_entry(name, os.path.getsize(file_path), original_size, last_used)
+            elif os.path.isfile(file_path):
+                os.remove(file_path)
+
+        # Restore the LRU order
+        for name in sorted(self.__entries, key=lambda name: self.__entries[name].last_used):
+            self.__entries.move_to_end(name)
+        self.__records = {picture: tuple(record) for picture, record in records.items()
+                          if record[3] is None or record[3] in self.__entries}
+        self.__changed()
+        LOG.info("Picture cache %s contains %d pictures (%.1f MB).", self.__cache_dir, len(self.__entries),
+                 self.__cache_size / 1e6)
+
+    def __save_manifest(self) -> None:
+        """
+        Write the manifest of the cache directory atomically.
+        :return: None
+        """
+        path = os.path.join(self.__cache_dir, self.__MANIFEST)
+        manifest = {"screen": list(self.__screen_size),
+                    "entries": {name: [entry.size, entry.original_size, entry.last_used]
+                                for name, entry in self.__entries.items()},
+                    "records": self.__records}
+        try:
+            with open(f"{path}.tmp", "w", encoding="utf-8", errors="surrogateescape") as manifest_file:
+                json.dump(manifest, manifest_file)
+            os.replace(f"{path}.tmp", path)
+        except OSError as exception:
+            LOG.error("Cannot write picture cache manifest %s: %s", path, exception)
+        self.__manifest_changed = None
+
+    def __look_up(self, pictures: Tuple[str, ...]) -> None:
+        """
+        Look up the pictures of the index, queueing the conversion of pictures not cached.
+        :param pictures: Paths to the pictures.
+        :return: None
+        """
+        self.__pictures = pictures
+        self.__queue.clear()
+        self.__full = False
+        queued = {path for path, _, _, _ in self.__running.values()}
+        for picture in pictures:
+            try:
+                stat = os.stat(picture)
+            except OSError:
+                continue
+            record = self.__records.get(picture)
+            if record is not None and record[:2] == (stat.st_mtime_ns, stat.st_size) and \
+                    (record[3] is None or record[3] in self.__entries):
+                self.__lookups["hit"].increment()
+                continue
+            self.__lookups["miss"].increment()
+            self.__records.pop(picture, None)
+            if picture not in queued:
+                self.__queue.append((picture, stat.st_mtime_ns, stat.st_size))
+
+        listed = set(pictures)
+        self.__records = {picture: record for picture, record in self.__records.items() if picture in listed}
+        self.__changed()
+
+    def __evict(self) -> None:
+        """
+        Evict the least recently used converted pictures until the cache fits its size budget.
+        :return: None
+        """
+        listed = None
+        while self.__cache_size > self.__size_budget and self.__entries:
+            name, entry = next(iter(self.__entries.items()))
+            try:
+                accessed = os.stat(os.path.join(self.__cache_dir, name)).st_atime
+            except OSError:
+                accessed = entry.last_used
+            if accessed > entry.last_used:
+                # The picture viewer has read the picture since, give it a second chance
+                entry.last_used = accessed
+                self.__entries.move_to_end(name)
+                continue
+
+            if listed is None:
+                listed = {record[3] for record in self.__records.values()}
+            if name in listed:
+                # Stop converting pictures at the expense of others still listed
+                self.__full = True
+            self.__remove_entry(name)
+            self.__evictions.increment()
+
+    def __complete(self, future: Future) -> None:
+        """
+        Handle a completed conversion.
+        :param future: Future of the conversion.
+        :return: None
+        """
+        picture, modification_time, size, start = self.__running.pop(future)
+        self.__conversion_time.observe(time.monotonic() - start)
+        try:
+            digest, name, original_size = future.result()
+        except (OSError, BrokenProcessPool) as exception:
+            # The original is listed until the picture changes
+            LOG.warning("Cannot convert picture %s: %s", picture, exception)
+            self.__conversions["failed"].increment()
+            self.__records[picture] = (modification_time, size, "", None)
+            self.__changed()
+            return
+
+        if name is None:
+            self.__conversions["unchanged"].increment()
+        elif name in self.__entries:
+            self.__conversions["duplicate"].increment()
+            self.__entries.move_to_end(name)
+        else:
+            self.__conversions["converted"].increment()
+            self.__add_entry(name, os.path.getsize(os.path.join(self.__cache_dir, name)), original_size, time.time())
+            self.__evict()
+        self.__records[picture] = (modification_time, size, digest, name)
+        self.__changed()
+
+    def __start_pool(self) -> None:
+        """
+        Start the conversion processes, replacing a broken pool (e.g. after a conversion process has been killed).
+        :return: None
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=False)
+        self.__pool = ProcessPoolExecutor(self.__workers, multiprocessing.get_context("spawn"), _init_worker)
+
+    def __submit(self) -> None:
+        """
+        Submit queued conversions to the process pool.
+        :return: None
+        """
+        while self.__queue and not self.__full and \
+                len(self.__running) < self.__workers * self.__CONVERSIONS_PER_WORKER:
+            picture, modification_time, size = self.__queue[0]
+            try:
+                future = self.__pool.submit(_convert, picture, self.__cache_dir, self.__screen_size, self.__QUALITY)
+            except BrokenProcessPool:
+                LOG.warning("Conversion processes have failed, restarting them.")
+                self.__start_pool()
+                continue
+            self.__queue.popleft()
+            self.__running[future] = (picture, modification_time, size, time.monotonic())
+
+    def __flush(self) -> None:
+        """
+        Write the file list, listing the converted pictures instead of their originals.
+        :return: None
+        """
+        self.__list.update([self.cached_path(picture) for picture in self.__pictures])
+        self.__pending_since = None
+        self.__last_change = None
+
+    def __maintain(self) -> None:
+        """
+        Keep the cache in line with the picture index until the object is stopped.
+        :return: None
+        """
+        LOG.info("Picture cache has started with %d conversion processes.", self.__workers)
+        self.__load_manifest()
+        self.__start_pool()
+
+        while self.shall_run():
+            version, pictures = self.__picture_index.pictures()
+            if version != self.__version and self.__picture_index.list_path() is not None:
+                self.__version = version
+                self.__look_up(pictures)
+                if self.__list.path() is None:
+                    # List the pictures right away, converted or not
+                    self.__flush()
+            self.__submit()
+
+            timeout = self.__POLL_INTERVAL
+            if self.__last_change is not None:
+                flush_time = min(self.__last_change + self.__SETTLE_TIME, self.__pending_since + self.__MAX_WRITE_DELAY)
+                timeout = max(0.0, min(timeout, flush_time - time.monotonic()))
+            if self.__running:
+                completed, _ = wait(list(self.__running), timeout, FIRST_COMPLETED)
+                for future in completed:
+                    self.__complete(future)
+            else:
+                time.sleep(timeout)
+
+            now = time.monotonic()
+            if self.__last_change is not None and (now >= self.__last_change + self.__SETTLE_TIME or
+                                                   now >= self.__pending_since + self.__MAX_WRITE_DELAY):
+                self.__flush()
+            if self.__manifest_changed is not None and now >= self.__manifest_changed + self.__MANIFEST_INTERVAL:
+                self.__save_manifest()
+
+        self.__pool.shutdown(wait=True, cancel_futures=True)
+        self.__save_manifest()
+        self.__list.remove()
+        LOG.info("Picture cache has stopped.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
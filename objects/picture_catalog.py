@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for the metadata catalog of the pictures and the playlists of the slideshow.
+"""
+
+import datetime
+import hashlib
+import io
+import logging
+import math
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from miscellaneous.metrics import REGISTRY
+from objects.picture_cache import PictureCache
+from objects.picture_index import PictureIndex, PictureList
+from objects.threaded_object import ThreadedObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+# EXIF tags of the orientation, the EXIF IFD and the capture and modification dates
+_EXIF_ORIENTATION = 0x0112
+_EXIF_IFD = 0x8769
+_EXIF_DATE_TIME_ORIGINAL = 0x9003
+_EXIF_DATE_TIME = 0x0132
+
+# Size of the picture the fingerprint (difference hash) is computed from, one column more than bits per row
+_FINGERPRINT_SIZE = (9, 8)
+
+# Picture metadata: content hash, capture date, EXIF orientation, width, height and fingerprint
+Metadata = Tuple[str, Optional[str], int, int, int, int]
+
+
+def _init_worker() -> None:
+    """
+    Initialize a metadata reading process, reading must not slow down the players.
+    :return: None
+    """
+    os.nice(10)
+
+
+def _parse_exif_date(value: Optional[str]) -> Optional[str]:
+    """
+    Convert an EXIF date to the date format of SQLite.
+    :param value: EXIF date in the format "YYYY:MM:DD HH:MM:SS" or None.
+    :return: Date in the format "YYYY-MM-DD HH:MM:SS" or None if the date is missing or invalid.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.datetime.strptime(value.strip("\0 "), "%Y:%m:%d %H:%M:%S").isoformat(" ")
+    except ValueError:
+        return None
+
+
+# pylint: disable=too-many-locals
+def _read_metadata(path: str) -> Metadata:
+    """
+    Read the metadata of a picture (run by the process pool). Only the EXIF data and a heavily downscaled version of
+    the picture are decoded.
+    :param path: Path to the picture.
+    :return: Tuple consisting of the content hash, the capture date (None if unknown), the EXIF orientation, width and
+             height in pixels and the fingerprint (a 64 bit difference hash) of the picture.
+    :raise: OSError if the picture cannot be read.
+    """
+    from PIL import Image   # pylint: disable=import-error,import-outside-toplevel
+
+    with open(path, "rb") as picture_file:
+        data = picture_file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            exif = image.getexif()
+            orientation = exif.get(_EXIF_ORIENTATION, 1)
+            taken = _parse_exif_date(exif.get_ifd(_EXIF_IFD).get(_EXIF_DATE_TIME_ORIGINAL)) or \
+                _parse_exif_date(exif.get(_EXIF_DATE_TIME))
+            width, height = image.size
+
+            # Let the JPEG decoder scale down while decoding
+            image.draft("L", (64, 64))
+            pixels = list(image.convert("L").resize(_FINGERPRINT_SIZE, Image.Resampling.BILINEAR).getdata())
+    except (ValueError, SyntaxError, Image.DecompressionBombError) as exception:
+        raise OSError(f"Invalid picture ({exception})") from exception
+
+    fingerprint = 0
+    for row in range(_FINGERPRINT_SIZE[1]):
+        for column in range(_FINGERPRINT_SIZE[0] - 1):
+            offset = row * _FINGERPRINT_SIZE[0] + column
+            fingerprint = fingerprint << 1 | (pixels[offset] > pixels[offset + 1])
+    # SQLite integers are signed
+    if fingerprint >= 1 << 63:
+        fingerprint -= 1 << 64
+    return digest, taken, orientation, width, height, fingerprint
+
+
+class PictureCatalog(ThreadedObject):
+    """
+    Class maintaining a persistent catalog (SQLite database) of the metadata of the pictures of the picture index, i.e.
+    capture date, EXIF orientation, dimensions, content hash and a fingerprint to find similar pictures, and writing the
+    playlist of the slideshow from it. The metadata is read by a pool of background processes, pictures are only read
+    again if their path, size or modification time changes. At start the playlist is written from the catalog right
+    away, without scanning the picture directory or decoding pictures. Playlists:
+    - chronological: all pictures in the order they were taken
+    - shuffle: random order, weighted against pictures shown recently
+    - on-this-day: pictures taken around today's date in former years, followed by a shuffle
+    Pictures with the same content are listed once, similar pictures taken in a burst are optionally listed once too.
+    Pictures not in the catalog yet are listed as if they had never been shown.
+    """
+    # Playlists
+    PLAYLISTS = ("chronological", "shuffle", "on-this-day")
+
+    # Path of the default playlist
+    __LIST_PATH = "/tmp/surveillance_frame.{pid}.playlist"
+
+    # Version of the database schema, a catalog of another version is rebuilt
+    __SCHEMA_VERSION = 1
+
+    # Number of metadata reads queued per worker process
+    __READS_PER_WORKER = 2
+
+    # Number of seconds of slideshow a playlist is generated for, it is regenerated afterwards
+    __PLAYLIST_PERIOD = 3600.0
+
+    # Number of seconds until the weight of a shown picture has recovered by half
+    __REPEAT_HALF_LIFE = 7 * 86400.0
+
+    # Number of days before and after today's date shown by the on-this-day playlist
+    __ON_THIS_DAY_RANGE = 3
+
+    # Maximum number of seconds between two pictures of a burst and maximum number of differing fingerprint bits of
+    # similar pictures
+    __BURST_GAP = 10.0
+    __SIMILARITY_DISTANCE = 6
+
+    # Number of seconds without changes until the playlist is rewritten and maximum delay of a rewrite
+    __SETTLE_TIME = 2.0
+    __MAX_WRITE_DELAY = 30.0
+
+    # Maximum number of seconds between two commits of read metadata
+    __COMMIT_INTERVAL = 5.0
+
+    # Maximum number of seconds between two checks of the stop request
+    __POLL_INTERVAL = 1.0
+
+    # Buckets of the read time histogram in seconds
+    __READ_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    # Picture cache whose converted pictures are listed instead of the originals
+    __picture_cache = None
+
+    def __init__(self, picture_index: PictureIndex, catalog_path: str, playlist: str, slideshow_interval: int,
+                 skip_similar: bool = False):
+        """
+        Class constructor.
+        :param picture_index: Index of the pictures to be cataloged.
+        :param catalog_path: Path of the catalog database, created if it doesn't exist.
+        :param playlist: Playlist, one of PLAYLISTS.
+        :param slideshow_interval: Interval between two pictures in seconds.
+        :param skip_similar: True to list similar pictures taken in a burst once, False otherwise.
+        :raise: OSError if the catalog cannot be opened.
+        """
+        self.__picture_index = picture_index
+        self.__catalog_path = catalog_path
+        self.__playlist_name = playlist
+        self.__slideshow_interval = slideshow_interval
+        self.__skip_similar = skip_similar
+        self.__workers = max(1, (os.cpu_count() or 2) // 2)
+        self.__list = PictureList(self.__LIST_PATH.format(pid=os.getpid()),
+                                  REGISTRY.counter("picture_catalog_list_writes_total"))
+        self.__database = self.__open(catalog_path)
+
+        # Pictures of the index (None until the index has been built) and their version, cataloged pictures
+        # (modification time and size) by path and listed pictures
+        self.__version = None
+        self.__pictures: Optional[Tuple[str, ...]] = None
+        self.__records: Dict[str, Tuple[int, int]] = {}
+        self.__playlist: List[str] = []
+        self.__cache_version = None
+
+        # Queued and running reads, metadata read but not committed yet and time of the first uncommitted write
+        self.__pool: Optional[ProcessPoolExecutor] = None
+        self.__queue: Deque[Tuple[str, int, int]] = deque()
+        self.__running: Dict[Future, Tuple[str, int, int, float]] = {}
+        self.__uncommitted: Optional[float] = None
+
+        # Start of the pending changes, time of the last change (None if the playlist is up to date), flag indicating
+        # whether the listed pictures need to be refreshed and time of the next regeneration of the playlist
+        self.__pending_since: Optional[float] = None
+        self.__last_change: Optional[float] = None
+        self.__refresh = False
+        self.__next_playlist = 0.0
+
+        self.__reads = {result: REGISTRY.counter("picture_catalog_reads_total", {"result": result})
+                        for result in ("read", "failed")}
+        self.__read_time = REGISTRY.histogram("picture_catalog_read_seconds", None, self.__READ_BUCKETS)
+        self.__playlists = REGISTRY.counter("picture_catalog_playlists_total", {"playlist": playlist})
+        self.__pending = REGISTRY.gauge("picture_catalog_pending")
+        self.__size = REGISTRY.gauge("picture_catalog_pictures")
+        super().__init__(self.__maintain)
+
+    def set_picture_cache(self, picture_cache: PictureCache) -> None:
+        """
+        Set the cache of the cataloged pictures, by default the playlist lists the original pictures.
+        :param picture_cache: Picture cache of the same picture index.
+        :return: None
+        """
+        self.__picture_cache = picture_cache
+
+    def list_path(self) -> Optional[str]:
+        """
+        Get the playlist.
+        :return: Path of the playlist or None if it hasn't been written yet.
+        """
+        return self.__list.path()
+
+    def set_on_list_ready(self, on_ready: Callable[[], None]) -> None:
+        """
+        Set the function called once the file list has been written for the first time.
+        :param on_ready: Function called from the catalog thread (or right away if the list has already been written).
+        :return: None
+        """
+        self.__list.set_on_ready(on_ready)
+
+    def pictures(self) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Get the listed pictures as written to the playlist.
+        :return: Tuple consisting of the version of the playlist and the paths to the pictures.
+        """
+        return self.__list.pictures()
+
+    def __open(self, catalog_path: str) -> sqlite3.Connection:
+        """
+        Open the catalog database, it is only used by the catalog thread afterwards.
+        :param catalog_path: Path of the catalog database.
+        :return: Database connection.
+        :raise: OSError if the catalog cannot be opened.
+        """
+        try:
+            database = sqlite3.connect(catalog_path, check_same_thread=False)
+            database.execute("PRAGMA journal_mode = WAL")
+            database.execute("PRAGMA synchronous = NORMAL")
+            if database.execute("PRAGMA user_version").fetchone()[0] != self.__SCHEMA_VERSION:
+                database.execute("DROP TABLE IF EXISTS pictures")
+                database.execute(f"PRAGMA user_version = {self.__SCHEMA_VERSION}")
+            # Paths are stored as bytes, they need not be valid UTF-8. Pictures which cannot be read have a width of 0.
+            database.execute("CREATE TABLE IF NOT EXISTS pictures ("
+                             "path BLOB PRIMARY KEY, modification_time INTEGER NOT NULL, size INTEGER NOT NULL, "
+                             "hash TEXT NOT NULL, taken TEXT, orientation INTEGER NOT NULL, width INTEGER NOT NULL, "
+                             "height INTEGER NOT NULL, fingerprint INTEGER NOT NULL, last_shown REAL)")
+            database.commit()
+        except sqlite3.Error as exception:
+            raise OSError(f"Cannot open picture catalog {catalog_path}: {exception}") from exception
+        return database
+
+    def __changed(self, refresh: bool = True) -> None:
+        """
+        Mark the playlist as changed.
+        :param refresh: True if the listed pictures need to be refreshed, False if only their paths changed.
+        :return: None
+        """
+        self.__refresh |= refresh
+        self.__last_change = time.monotonic()
+        if self.__pending_since is None:
+            self.__pending_since = self.__last_change
+        self.__pending.set(len(self.__queue) + len(self.__running))
+        self.__size.set(len(self.__records))
+
+    def __load(self) -> None:
+        """
+        Load the catalog and write the playlist from it.
+        :return: None
+        """
+        start = time.monotonic()
+        for path, modification_time, size in \
+                self.__database.execute("SELECT path, modification_time, size FROM pictures"):
+            self.__records[os.fsdecode(path)] = (modification_time, size)
+        self.__size.set(len(self.__records))
+        LOG.info("Picture catalog %s contains %d pictures, loaded in %.2f seconds.", self.__catalog_path,
+                 len(self.__records), time.monotonic() - start)
+        if self.__records:
+            self.__generate()
+            self.__flush()
+
+    def __look_up(self, pictures: Tuple[str, ...]) -> None:
+        """
+        Look up the pictures of the index, queueing the metadata reads of pictures not cataloged and removing the
+        pictures no longer indexed.
+        :param pictures: Paths to the pictures.
+        :return: None
+        """
+        self.__pictures = pictures
+        self.__queue.clear()
+        queued = {path for path, _, _, _ in self.__running.values()}
+        for picture in pictures:
+            try:
+                stat = os.stat(picture)
+            except OSError:
+                continue
+            if self.__records.get(picture) != (stat.st_mtime_ns, stat.st_size) and picture not in queued:
+                self.__queue.append((picture, stat.st_mtime_ns, stat.st_size))
+
+        listed = set(pictures)
+        removed = [picture for picture in self.__records if picture not in listed]
+        for picture in removed:
+            del self.__records[picture]
+        self.__database.executemany("DELETE FROM pictures WHERE path = ?",
+                                    ((os.fsencode(picture),) for picture in removed))
+        self.__database.commit()
+        if self.__queue:
+            LOG.info("Picture catalog is reading the metadata of %d pictures.", len(self.__queue))
+        self.__changed()
+
+    def __complete(self, future: Future) -> None:
+        """
+        Handle a completed metadata read.
+        :param future: Future of the read.
+        :return: None
+        """
+        picture, modification_time, size, start = self.__running.pop(future)
+        self.__read_time.observe(time.monotonic() - start)
+        try:
+            digest, taken, orientation, width, height, fingerprint = future.result()
+            self.__reads["read"].increment()
+        except (OSError, BrokenProcessPool) as exception:
+            # The picture is not listed until it changes
+            LOG.warning("Cannot read picture %s: %s", picture, exception)
+            self.__reads["failed"].increment()
+            digest, taken, orientation, width, height, fingerprint = "", None, 1, 0, 0, 0
+
+        self.__database.execute(
+            "INSERT INTO pictures (path, modification_time, size, hash, taken, orientation, width, height, "
+            "fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (path) DO UPDATE SET "
+            "modification_time = excluded.modification_time, size = excluded.size, hash = excluded.hash, "
+            "taken = excluded.taken, orientation = excluded.orientation, width = excluded.width, "
+            "height = excluded.height, fingerprint = excluded.fingerprint",
+            (os.fsencode(picture), modification_time, size, digest, taken, orientation, width, height, fingerprint))
+        if self.__uncommitted is None:
+            self.__uncommitted = time.monotonic()
+        self.__records[picture] = (modification_time, size)
+        self.__changed()
+        if not self.__queue and not self.__running:
+            # The playlist has been generated from incomplete metadata
+            LOG.info("Picture catalog has read the metadata of all pictures.")
+            self.__next_playlist = time.monotonic()
+
+    def __start_pool(self) -> None:
+        """
+        Start the reading processes, replacing a broken pool (e.g. after a reading process has been killed).
+        :return: None
+        """
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=False)
+        self.__pool = ProcessPoolExecutor(self.__workers, multiprocessing.get_context("spawn"), _init_worker)
+
+    def __submit(self) -> None:
+        """
+        Submit queued metadata reads to the process pool.
+        :return: None
+        """
+        while self.__queue and len(self.__running) < self.__workers * self.__READS_PER_WORKER:
+            picture, modification_time, size = self.__queue[0]
+            try:
+                future = self.__pool.submit(_read_metadata, picture)
+            except BrokenProcessPool:
+                LOG.warning("Reading processes have failed, restarting them.")
+                self.__start_pool()
+                continue
+            self.__queue.popleft()
+            self.__running[future] = (picture, modification_time, size, time.monotonic())
+
+    def __find_bursts(self, dates: Dict[str, str], fingerprints: Dict[str, int]) -> Dict[str, str]:
+        """
+        Group similar pictures taken in bursts.
+        :param dates: Capture dates by picture path.
+        :param fingerprints: Fingerprints by picture path.
+        :return: Dictionary mapping picture paths to the first picture of their burst.
+        """
+        bursts = {}
+        previous, previous_time = None, None
+        for picture in sorted(dates, key=lambda picture: (dates[picture], picture)):
+            taken = datetime.datetime.fromisoformat(dates[picture]).timestamp()
+            if previous is not None and taken - previous_time <= self.__BURST_GAP and \
+                    bin((fingerprints[picture] ^ fingerprints[previous]) & 0xFFFFFFFFFFFFFFFF).count("1") <= \
+                    self.__SIMILARITY_DISTANCE:
+                bursts[picture] = bursts[previous]
+            else:
+                bursts[picture] = picture
+            previous, previous_time = picture, taken
+        return bursts
+
+    def __shuffle(self, pictures: List[str], last_shown: Dict[str, float]) -> List[str]:
+        """
+        Shuffle pictures, pictures shown recently are likely to be listed late (weighted random sampling).
+        :param pictures: Paths to the pictures.
+        :param last_shown: Time (seconds since the epoch) each picture has been shown last by picture path.
+        :return: Shuffled paths to the pictures.
+        """
+        now = time.time()
+        keys = {}
+        for picture in pictures:
+            shown = last_shown.get(picture)
+            weight = 1.0 if shown is None else 1.0 - 0.5 ** (max(0.0, now - shown) / self.__REPEAT_HALF_LIFE)
+            keys[picture] = math.log(1.0 - random.random()) / max(weight, 1e-6)
+        return sorted(pictures, key=keys.__getitem__, reverse=True)
+
+    def __on_this_day(self, dates: Dict[str, str]) -> List[str]:
+        """
+        Find the pictures taken around today's date in former years.
+        :param dates: Capture dates by picture path.
+        :return: Paths to the pictures in the order they were taken.
+        """
+        today = datetime.date.today()
+        days = {(today + datetime.timedelta(days=offset)).strftime("%m-%d")
+                for offset in range(-self.__ON_THIS_DAY_RANGE, self.__ON_THIS_DAY_RANGE + 1)}
+        return sorted((picture for picture, date in dates.items() if date[5:10] in days and date[:4] < str(today.year)),
+                      key=lambda picture: (dates[picture], picture))
+
+    # pylint: disable=too-many-locals
+    def __generate(self) -> None:
+        """
+        Generate the playlist from the catalog.
+        :return: None
+        """
+        start = time.monotonic()
+        dates, hashes, fingerprints, last_shown = {}, {}, {}, {}
+        failed = set()
+        for path, digest, taken, width, fingerprint, shown in self.__database.execute(
+                "SELECT path, hash, COALESCE(taken, datetime(modification_time / 1000000000, 'unixepoch', "
+                "'localtime')), width, fingerprint, last_shown FROM pictures"):
+            picture = os.fsdecode(path)
+            if not width:
+                failed.add(picture)
+                continue
+            dates[picture], hashes[picture], fingerprints[picture] = taken, digest, fingerprint
+            if shown is not None:
+                last_shown[picture] = shown
+        pictures = [picture for picture in (self.__pictures if self.__pictures is not None else dates)
+                    if picture not in failed]
+
+        # The playlist slightly outlasts its period, so that it is regenerated before the picture viewer repeats it
+        length = int(self.__PLAYLIST_PERIOD / self.__slideshow_interval)
+        if self.__playlist_name == "chronological":
+            ordered = sorted(pictures, key=lambda picture: (dates.get(picture, "~"), picture))
+        elif self.__playlist_name == "on-this-day":
+            ordered = self.__on_this_day({picture: dates[picture] for picture in pictures if picture in dates})
+            ordered += self.__shuffle(sorted(set(pictures) - set(ordered)), last_shown)
+        else:
+            ordered = self.__shuffle(pictures, last_shown)
+
+        bursts = self.__find_bursts({picture: dates[picture] for picture in pictures if picture in dates},
+                                    fingerprints) if self.__skip_similar else {}
+        playlist, listed = [], set()
+        for picture in ordered:
+            key = bursts.get(picture) or hashes.get(picture) or picture
+            if key not in listed:
+                listed.add(key)
+                playlist.append(picture)
+        if self.__playlist_name != "chronological":
+            playlist = playlist[:length + length // 4 + 1]
+            # The pictures are expected to be shown at the slideshow interval
+            now = time.time()
+            self.__database.executemany("UPDATE pictures SET last_shown = ? WHERE path = ?",
+                                        ((now + position * self.__slideshow_interval, os.fsencode(picture))
+                                         for position, picture in enumerate(playlist[:length])))
+            self.__database.commit()
+
+        self.__playlist = playlist
+        self.__refresh = False
+        self.__next_playlist = time.monotonic() + self.__PLAYLIST_PERIOD
+        self.__playlists.increment()
+        LOG.debug("Playlist %s generated with %d of %d pictures in %.2f seconds.", self.__playlist_name,
+                  len(playlist), len(pictures), time.monotonic() - start)
+
+    def __flush(self) -> None:
+        """
+        Write the playlist, listing the converted pictures of the picture cache instead of their originals.
+        :return: None
+        """
+        if self.__refresh:
+            if self.__playlist_name == "chronological" or not self.__playlist:
+                self.__generate()
+            elif self.__pictures is not None:
+                # Other playlists only drop removed pictures until they are regenerated
+                indexed = set(self.__pictures)
+                self.__playlist = [picture for picture in self.__playlist if picture in indexed]
+            self.__refresh = False
+        if self.__playlist or self.__pictures is not None:
+            self.__list.update([self.__picture_cache.cached_path(picture) for picture in self.__playlist]
+                               if self.__picture_cache else self.__playlist)
+        self.__pending_since = None
+        self.__last_change = None
+
+    def __maintain(self) -> None:
+        """
+        Keep the catalog in line with the picture index and write the playlist until the object is stopped.
+        :return: None
+        """
+        LOG.info("Picture catalog has started with %d reading processes and the %s playlist.", self.__workers,
+                 self.__playlist_name)
+        self.__load()
+        self.__start_pool()
+
+        while self.shall_run():
+            version, pictures = self.__picture_index.pictures()
+            if version != self.__version and self.__picture_index.list_path() is not None:
+                self.__version = version
+                self.__look_up(pictures)
+            if self.__picture_cache and self.__picture_cache.pictures()[0] != self.__cache_version:
+                self.__cache_version = self.__picture_cache.pictures()[0]
+                self.__changed(False)
+            self.__submit()
+
+            timeout = self.__POLL_INTERVAL
+            if self.__last_change is not None:
+                flush_time = min(self.__last_change + self.__SETTLE_TIME, self.__pending_since + self.__MAX_WRITE_DELAY)
+                timeout = max(0.0, min(timeout, flush_time - time.monotonic()))
+            if self.__running:
+                completed, _ = wait(list(self.__running), timeout, FIRST_COMPLETED)
+                for future in completed:
+                    self.__complete(future)
+            else:
+                time.sleep(timeout)
+
+            now = time.monotonic()
+            if self.__uncommitted is not None and (now >= self.__uncommitted + self.__COMMIT_INTERVAL or
+                                                   not self.__running):
+                self.__database.commit()
+                self.__uncommitted = None
+            if self.__pictures is not None and now >= self.__next_playlist:
+                self.__generate()
+                self.__flush()
+            elif self.__last_change is not None and (now >= self.__last_change + self.__SETTLE_TIME or
+                                                     now >= self.__pending_since + self.__MAX_WRITE_DELAY):
+                self.__flush()
+
+        self.__pool.shutdown(wait=True, cancel_futures=True)
+        self.__database.commit()
+        self.__database.close()
+        self.__list.remove()
+        LOG.info("Picture catalog has stopped.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
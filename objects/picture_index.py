@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for maintaining the index of the pictures shown by the slideshow.
+"""
+
+import logging
+import os
+import select
+import sys
+import time
+
+from threading import Event as Flag, Lock
+from typing import Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from events.event import Event
+from events.signals import Signal
+from miscellaneous.inotify import IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_IGNORED, IN_ISDIR, \
+    IN_MOVE_SELF, IN_MOVED_FROM, IN_MOVED_TO, IN_ONLYDIR, IN_Q_OVERFLOW, Inotify
+from miscellaneous.metrics import REGISTRY, Counter
+from miscellaneous.miscellaneous import is_network_filesystem
+from objects.threaded_object import ThreadedObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class PictureList:
+    """
+    Class writing a file list for the picture viewer. The list is replaced atomically, so that the viewer never reads a
+    partial list, and restored if it has been modified by someone else, e.g. by feh which writes its own file list on
+    exit.
+    """
+    def __init__(self, path: str, writes: Counter):
+        """
+        Class constructor.
+        :param path: Path of the file list.
+        :param writes: Counter of the writes of the file list.
+        """
+        self.__path = path
+        self.__writes = writes
+
+        # Listed pictures, their version (incremented with every update) and content and state (inode, size and
+        # modification time) of the written file list
+        self.__lock = Lock()
+        self.__pictures: Tuple[str, ...] = ()
+        self.__version = 0
+        self.__content = ""
+        self.__state: Optional[Tuple[int, int, int]] = None
+        self.__ready = Flag()
+        self.__on_ready: Optional[Callable[[], None]] = None
+
+    def path(self) -> Optional[str]:
+        """
+        Get the path of the file list, restoring the list if it has been modified.
+        :return: Path of the file list or None if the list hasn't been written yet.
+        """
+        if not self.__ready.is_set():
+            return None
+        with self.__lock:
+            if self.__get_state() != self.__state:
+                LOG.info("File list %s has been modified, restoring it.", self.__path)
+                self.__write(self.__content)
+        return self.__path
+
+    def set_on_ready(self, on_ready: Callable[[], None]) -> None:
+        """
+        Set the function called once the list has been written for the first time, it is called right away if the
+        list has already been written.
+        :param on_ready: Function called from the thread writing the list.
+        :return: None
+        """
+        with self.__lock:
+            self.__on_ready = on_ready
+            ready = self.__ready.is_set()
+        if ready:
+            on_ready()
+
+    def pictures(self) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Get the listed pictures.
+        :return: Tuple consisting of the version of the list and the paths to the pictures.
+        """
+        with self.__lock:
+            return self.__version, self.__pictures
+
+    def update(self, pictures: Sequence[str], modified: bool = False) -> None:
+        """
+        Update the file list, it is only rewritten if its content changes.
+        :param pictures: Paths to the pictures in the order to be shown.
+        :param modified: True if listed pictures have been modified in place, i.e. the version shall be incremented
+                         even if the list doesn't change.
+        :return: None
+        """
+        content = "".join(f"{picture}\n" for picture in pictures)
+        with self.__lock:
+            first = not self.__ready.is_set()
+            changed = content != self.__content or first
+            if changed or modified:
+                self.__pictures = tuple(pictures)
+                self.__version += 1
+            if changed:
+                self.__write(content)
+            self.__ready.set()
+            on_ready = self.__on_ready if first else None
+        if on_ready:
+            on_ready()
+
+    def remove(self) -> None:
+        """
+        Remove the file list.
+        :return: None
+        """
+        try:
+            os.remove(self.__path)
+        except OSError:
+            pass
+
+    def __get_state(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Get the state of the file list.
+        :return: Tuple consisting of inode, size and modification time or None if the file doesn't exist.
+        """
+        try:
+            stat = os.stat(self.__path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def __write(self, content: str) -> None:
+        """
+        Replace the file list atomically. The lock must be held.
+        :param content: Content of the file list.
+        :return: None
+        """
+        temporary_path = f"{self.__path}.tmp"
+        try:
+            with open(temporary_path, "w", encoding="utf-8", errors="surrogateescape") as list_file:
+                list_file.write(content)
+            os.replace(temporary_path, self.__path)
+        except OSError as exception:
+            LOG.error("Cannot write file list %s: %s", self.__path, exception)
+            return
+
+        self.__content = content
+        self.__state = self.__get_state()
+        self.__writes.increment()
+
+
+class PictureIndex(ThreadedObject):
+    """
+    Class maintaining the index of the pictures below the picture directory, so that the picture viewer doesn't need to
+    rescan the directory tree itself. The tree is scanned once, afterwards the index is updated incrementally from the
+    inotify events of its directories. The index is written as file list for the picture viewer, which is only
+    rewritten once the directory has settled after a change. Without inotify (or if the inotify watch limit is reached)
+    the tree is rescanned periodically instead, as well as on network file systems whose remote changes inotify doesn't
+    report. A rescan of an unreachable picture directory (e.g. a share while the server is asleep) keeps the index.
+    """
+    # File name extensions of the indexed pictures
+    EXTENSIONS = (".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp")
+
+    # Path of the default file list
+    __LIST_PATH = "/tmp/surveillance_frame.{pid}.pictures"
+
+    # Events watched in each directory
+    __WATCH_MASK = IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | \
+        IN_MOVE_SELF | IN_ONLYDIR
+
+    # Number of seconds without changes until the file list is rewritten and maximum delay of a rewrite
+    __SETTLE_TIME = 2.0
+    __MAX_WRITE_DELAY = 30.0
+
+    # Number of seconds between two rescans without inotify
+    __RESCAN_INTERVAL = 60.0
+
+    # Buckets of the build time histogram in seconds
+    __BUILD_BUCKETS = (0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+    # inotify instance, None if the tree is rescanned periodically
+    __inotify = None
+
+    def __init__(self, picture_dir: str, list_path: Optional[str] = None):
+        """
+        Class constructor.
+        :param picture_dir: Path to the directory containing the pictures.
+        :param list_path: Path of the file list written for the picture viewer or None for a temporary file.
+        """
+        self.__picture_dir = os.path.abspath(picture_dir)
+        self.__list = PictureList(list_path or self.__LIST_PATH.format(pid=os.getpid()),
+                                  REGISTRY.counter("picture_index_list_writes_total"))
+
+        # Indexed pictures and watched directories (by path and by watch descriptor), owned by the index thread
+        self.__pictures: Set[str] = set()
+        self.__directories: Dict[str, int] = {}
+        self.__watches: Dict[int, str] = {}
+
+        # Start of the pending changes, time of the last change (None if the file list is up to date) and flag
+        # indicating whether pictures have been modified in place since
+        self.__pending_since: Optional[float] = None
+        self.__last_change: Optional[float] = None
+        self.__modified = False
+        self.__built = False
+        self.__unreachable = False
+
+        self.__build_time = REGISTRY.histogram("picture_index_build_seconds", None, self.__BUILD_BUCKETS)
+        self.__size = REGISTRY.gauge("picture_index_pictures")
+        self.__updates = {change: REGISTRY.counter("picture_index_updates_total", {"change": change})
+                          for change in ("added", "removed", "modified")}
+
+        # Pipe waking up the index thread when it shall stop
+        self.__wakeup_read, self.__wakeup_write = os.pipe()
+        super().__init__(self.__maintain)
+
+    def list_path(self) -> Optional[str]:
+        """
+        Get the file list of the indexed pictures.
+        :return: Path of the file list or None if the index hasn't been built yet.
+        """
+        return self.__list.path()
+
+    def set_on_list_ready(self, on_ready: Callable[[], None]) -> None:
+        """
+        Set the function called once the file list has been written for the first time.
+        :param on_ready: Function called from the index thread (or right away if the list has already been written).
+        :return: None
+        """
+        self.__list.set_on_ready(on_ready)
+
+    def pictures(self) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Get the indexed pictures as written to the file list.
+        :return: Tuple consisting of the version of the index and the sorted paths to the pictures.
+        """
+        return self.__list.pictures()
+
+    @classmethod
+    def is_picture(cls, name: str) -> bool:
+        """
+        Check if a file is indexed as picture.
+        :param name: File name.
+        :return: True if the file is a picture, False otherwise.
+        """
+        # The file list is line-based
+        return name.lower().endswith(cls.EXTENSIONS) and "\n" not in name
+
+    def __flush(self) -> None:
+        """
+        Write the pending changes of the index to the file list.
+        :return: None
+        """
+        self.__list.update(sorted(self.__pictures), self.__modified)
+        self.__pending_since = None
+        self.__last_change = None
+        self.__modified = False
+        LOG.debug("Picture index of %s contains %d pictures.", self.__picture_dir, len(self.__pictures))
+
+    def __changed(self, added: int, removed: int, modified: int = 0) -> None:
+        """
+        Account for changes of the index.
+        :param added: Number of added pictures.
+        :param removed: Number of removed pictures.
+        :param modified: Number of pictures modified in place.
+        :return: None
+        """
+        if not added and not removed and not modified:
+            return
+        self.__updates["added"].increment(added)
+        self.__updates["removed"].increment(removed)
+        self.__updates["modified"].increment(modified)
+        self.__modified |= modified > 0
+        self.__size.set(len(self.__pictures))
+        self.__last_change = time.monotonic()
+        if self.__pending_since is None:
+            self.__pending_since = self.__last_change
+
+    def __open_inotify(self) -> Optional[Inotify]:
+        """
+        Open an inotify instance for watching the directory tree.
+        :return: inotify instance or None if inotify is unavailable.
+        """
+        try:
+            return Inotify()
+        except OSError as exception:
+            LOG.warning("Cannot watch %s with inotify (%s), rescanning it every %.0f seconds instead.",
+                        self.__picture_dir, exception, self.__RESCAN_INTERVAL)
+            return None
+
+    def __watch(self, directory: str) -> None:
+        """
+        Start watching a directory. If this fails the whole tree is rescanned periodically from now on.
+        :param directory: Path to the directory.
+        :return: None
+        """
+        if self.__inotify is None:
+            return
+        try:
+            watch_descriptor = self.__inotify.add_watch(directory, self.__WATCH_MASK)
+        except OSError as exception:
+            LOG.warning("Cannot watch %s with inotify (%s), rescanning %s every %.0f seconds instead.", directory,
+                        exception, self.__picture_dir, self.__RESCAN_INTERVAL)
+            self.__inotify.close()
+            self.__inotify = None
+            self.__directories.clear()
+            self.__watches.clear()
+            return
+        self.__directories[directory] = watch_descriptor
+        self.__watches[watch_descriptor] = directory
+
+    def __scan(self, top: str) -> Set[str]:
+        """
+        Scan a directory tree for pictures and watch its directories. Symbolic links to directories are followed once.
+        :param top: Path to the top directory.
+        :return: Set of paths to the pictures found.
+        """
+        pictures = set()
+        visited = set()
+        for directory, directory_names, file_names in os.walk(top, followlinks=True):
+            try:
+                stat = os.stat(directory)
+            except OSError:
+                directory_names.clear()
+                continue
+            if (stat.st_dev, stat.st_ino) in visited:
+                directory_names.clear()
+                continue
+            visited.add((stat.st_dev, stat.st_ino))
+            # Watch the directory before it is listed again, so that no picture is missed in between
+            self.__watch(directory)
+            pictures.update(os.path.join(directory, name) for name in file_names if self.is_picture(name))
+        return pictures
+
+    def __is_reachable(self) -> bool:
+        """
+        Check if the picture directory can be listed. An empty picture directory is taken as unreachable too, it is
+        likely the mount point of a share which isn't mounted.
+        :return: True if the picture directory is reachable, False otherwise.
+        """
+        try:
+            return bool(os.listdir(self.__picture_dir))
+        except OSError:
+            return False
+
+    def __rebuild(self, reason: str) -> None:
+        """
+        Rebuild the index from a full scan of the directory tree.
+        :param reason: Reason of the rebuild, used for logging.
+        :return: None
+        """
+        if reason == "rescan" and self.__pictures and not self.__is_reachable():
+            if not self.__unreachable:
+                LOG.warning("Picture directory %s is unreachable, keeping its index.", self.__picture_dir)
+                self.__unreachable = True
+            return
+        if self.__unreachable:
+            LOG.info("Picture directory %s is reachable again.", self.__picture_dir)
+            self.__unreachable = False
+
+        if self.__inotify is not None:
+            for watch_descriptor in self.__watches:
+                self.__inotify.remove_watch(watch_descriptor)
+        self.__directories.clear()
+        self.__watches.clear()
+
+        start = time.monotonic()
+        pictures = self.__scan(self.__picture_dir)
+        build_time = time.monotonic() - start
+        self.__build_time.observe(build_time)
+
+        added, removed = len(pictures - self.__pictures), len(self.__pictures - pictures)
+        self.__pictures = pictures
+        if self.__built:
+            self.__changed(added, removed)
+        else:
+            # The initial build is not counted as update
+            self.__size.set(len(pictures))
+        log = LOG.info if reason != "rescan" else LOG.debug
+        log("Picture index of %s built (%s) with %d pictures in %d directories in %.2f seconds.", self.__picture_dir,
+            reason, len(pictures), len(self.__directories), build_time)
+
+    def __add_tree(self, directory: str) -> None:
+        """
+        Add a directory tree which has been created or moved into the picture directory.
+        :param directory: Path to the directory.
+        :return: None
+        """
+        pictures = self.__scan(directory) - self.__pictures
+        self.__pictures |= pictures
+        self.__changed(len(pictures), 0)
+
+    def __remove_tree(self, directory: str) -> None:
+        """
+        Remove a directory tree which has been deleted or moved out of its place.
+        :param directory: Path to the directory.
+        :return: None
+        """
+        prefix = directory + os.sep
+        for path in [path for path in self.__directories if path == directory or path.startswith(prefix)]:
+            watch_descriptor = self.__directories.pop(path)
+            del self.__watches[watch_descriptor]
+            if self.__inotify is not None:
+                self.__inotify.remove_watch(watch_descriptor)
+        pictures = {picture for picture in self.__pictures if picture.startswith(prefix)}
+        self.__pictures -= pictures
+        self.__changed(0, len(pictures))
+
+    def __apply_entry(self, path: str, mask: int) -> None:
+        """
+        Apply an inotify event of a directory entry to the index.
+        :param path: Path to the entry.
+        :param mask: inotify flags of the event.
+        :return: None
+        """
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self.__add_tree(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.__remove_tree(path)
+        elif not self.is_picture(os.path.basename(path)):
+            return
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and path not in self.__pictures:
+            self.__pictures.add(path)
+            self.__changed(1, 0)
+        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+            self.__changed(0, 0, 1)
+        elif mask & (IN_DELETE | IN_MOVED_FROM) and path in self.__pictures:
+            self.__pictures.remove(path)
+            self.__changed(0, 1)
+
+    def __apply(self, events: Iterable[Tuple[int, int, str]]) -> None:
+        """
+        Apply inotify events to the index.
+        :param events: inotify events consisting of watch descriptor, mask and name.
+        :return: None
+        """
+        for watch_descriptor, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Events have been lost
+                self.__rebuild("event queue overflow")
+                return
+            directory = self.__watches.get(watch_descriptor)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.__watches[watch_descriptor]
+                if self.__directories.get(directory) == watch_descriptor:
+                    del self.__directories[directory]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                # Subdirectories are handled by the events of their parent directory
+                if directory == self.__picture_dir:
+                    self.__rebuild("picture directory moved or deleted")
+                    return
+                continue
+
+            self.__apply_entry(os.path.join(directory, name), mask)
+
+    def __maintain(self) -> None:
+        """
+        Build the index and keep it up to date until the object is stopped.
+        :return: None
+        """
+        LOG.info("Picture index has started.")
+        if is_network_filesystem(self.__picture_dir):
+            LOG.info("Picture directory %s is on a network file system, rescanning it every %.0f seconds.",
+                     self.__picture_dir, self.__RESCAN_INTERVAL)
+        else:
+            self.__inotify = self.__open_inotify()
+        self.__rebuild("start")
+        self.__built = True
+        self.__flush()
+        next_rescan = time.monotonic() + self.__RESCAN_INTERVAL
+
+        while self.shall_run():
+            # Sleep until an inotify event, the next flush or rescan or the stop request
+            deadlines = [] if self.__inotify is not None else [next_rescan]
+            if self.__last_change is not None:
+                deadlines.append(min(self.__last_change + self.__SETTLE_TIME,
+                                     self.__pending_since + self.__MAX_WRITE_DELAY))
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            watched = [self.__wakeup_read] + ([self.__inotify] if self.__inotify is not None else [])
+            ready, _, _ = select.select(watched, [], [], timeout)
+
+            if self.__inotify is not None and self.__inotify in ready:
+                self.__apply(self.__inotify.read())
+            if self.__inotify is None and time.monotonic() >= next_rescan:
+                self.__rebuild("rescan")
+                next_rescan = time.monotonic() + self.__RESCAN_INTERVAL
+
+            now = time.monotonic()
+            if self.__last_change is not None and (now >= self.__last_change + self.__SETTLE_TIME or
+                                                   now >= self.__pending_since + self.__MAX_WRITE_DELAY):
+                self.__flush()
+
+        if self.__inotify is not None:
+            self.__inotify.close()
+            self.__inotify = None
+        self.__list.remove()
+        LOG.info("Picture index has stopped.")
+
+    def stop(self) -> None:
+        """
+        Stop the thread, it leaves its wait right away.
+        :return: None
+        """
+        super().stop()
+        if self.__wakeup_write is not None:
+            os.write(self.__wakeup_write, b"\0")
+
+    def dispatch(self, event: Event) -> None:
+        """
+        Dispatch the given event to the object.
+        :param event: Event to be dispatched.
+        :return: None
+        """
+        if event.signal() is Signal.TERMINATE and self.__wakeup_write is not None:
+            # Let the thread leave its wait before it is joined
+            self.stop()
+            super().dispatch(event)
+            os.close(self.__wakeup_read)
+            os.close(self.__wakeup_write)
+            self.__wakeup_write = None
+        else:
+            super().dispatch(event)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
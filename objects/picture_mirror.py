@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for mirroring the upcoming pictures of a network share to local storage.
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from threading import Thread
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from miscellaneous.metrics import REGISTRY
+from objects.picture_cache import PictureCache
+from objects.picture_catalog import PictureCatalog
+from objects.picture_index import PictureIndex, PictureList
+from objects.threaded_object import ThreadedObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+def _run_in_thread(function: Callable, *args) -> Future:
+    """
+    Run a function accessing the share in its own daemon thread. Unlike the threads of a thread pool, a thread hanging
+    on an unreachable share doesn't delay the exit of the application.
+    :param function: Function raising OSError on failure.
+    :param args: Arguments of the function.
+    :return: Future of the result.
+    """
+    future = Future()
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(*args))
+        except OSError as exception:
+            future.set_exception(exception)
+
+    Thread(target=run, daemon=True).start()
+    return future
+
+
+def _fetch(source: str, destination: str) -> Tuple[int, int]:
+    """
+    Copy a picture from the share to local storage.
+    :param source: Path to the picture on the share.
+    :param destination: Path to the local copy, replaced atomically.
+    :return: Tuple consisting of the modification time in nanoseconds and the size in bytes of the picture.
+    :raise: OSError if the picture cannot be copied.
+    """
+    stat = os.stat(source)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    temporary_path = f"{destination}.tmp"
+    shutil.copyfile(source, temporary_path)
+    os.replace(temporary_path, destination)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _stat_all(sources: List[str]) -> Dict[str, Optional[Tuple[int, int]]]:
+    """
+    Get the state of pictures on the share in bulk.
+    :param sources: Paths to the pictures on the share.
+    :return: Dictionary mapping the paths to the modification time in nanoseconds and the size in bytes of the
+             pictures, None for pictures which don't exist anymore.
+    :raise: OSError if the share is unreachable.
+    """
+    states = {}
+    for source in sources:
+        try:
+            stat = os.stat(source)
+        except FileNotFoundError:
+            states[source] = None
+            continue
+        states[source] = (stat.st_mtime_ns, stat.st_size)
+    return states
+
+
+def _probe(directory: str) -> None:
+    """
+    Check if the share is reachable, an empty directory is likely the mount point of a share which isn't mounted.
+    :param directory: Path to the picture directory on the share.
+    :return: None
+    :raise: OSError if the share is unreachable.
+    """
+    if not os.listdir(directory):
+        raise OSError(f"{directory} is empty")
+
+
+class PictureMirror(ThreadedObject):
+    """
+    Class mirroring the upcoming pictures of a picture directory on a network share (e.g. NFS or SMB) to local storage,
+    so that the picture viewer never blocks on a slow or sleeping server. The pictures are copied in the order of the
+    file list of the picture index (or picture cache or catalog) into a window of local copies limited by a size budget.
+    Once the window is full, it moves on by one picture per slideshow interval, evicting its oldest picture. The file
+    list of the mirror only lists the local copies and pictures which are local anyway (e.g. converted by the picture
+    cache). All accesses to the share are made from background threads. While the share is unreachable (or stalls) the
+    window is kept as is, once the share is reachable again the local copies are synchronized in bulk. The mirrored
+    pictures are also synchronized periodically.
+    """
+    # Path of the default file list
+    __LIST_PATH = "/tmp/surveillance_frame.{pid}.mirrored_pictures"
+
+    # File name of the manifest in the mirror directory
+    __MANIFEST = "manifest.json"
+
+    # Number of pictures copied at the same time
+    __WORKERS = 2
+
+    # Number of seconds until an access to the share is considered stalled
+    __STALL_TIMEOUT = 30.0
+
+    # Number of seconds between two checks of an unreachable share and between two synchronizations
+    __PROBE_INTERVAL = 10.0
+    __SYNC_INTERVAL = 600.0
+
+    # Number of seconds without changes until the file list is rewritten and maximum delay of a rewrite
+    __SETTLE_TIME = 2.0
+    __MAX_WRITE_DELAY = 30.0
+
+    # Number of seconds between two writes of a changed manifest
+    __MANIFEST_INTERVAL = 60.0
+
+    # Maximum number of seconds between two checks of the stop request
+    __POLL_INTERVAL = 1.0
+
+    # Buckets of the copy time histogram in seconds
+    __FETCH_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, picture_index: Union[PictureIndex, PictureCache, PictureCatalog], picture_dir: str,
+                 mirror_dir: str, size_budget: int, slideshow_interval: int):
+        """
+        Class constructor.
+        :param picture_index: Picture index, the picture cache in front of it or the picture catalog whose file list
+                              is mirrored.
+        :param picture_dir: Path to the picture directory on the share.
+        :param mirror_dir: Path to the local mirror directory, created if it doesn't exist.
+        :param size_budget: Maximum size of the local copies in bytes.
+        :param slideshow_interval: Interval between two pictures in seconds.
+        :raise: OSError if the mirror directory cannot be created.
+        """
+        self.__picture_index = picture_index
+        self.__picture_dir = os.path.abspath(picture_dir)
+        self.__mirror_dir = os.path.abspath(mirror_dir)
+        self.__size_budget = size_budget
+        self.__slideshow_interval = slideshow_interval
+        self.__list = PictureList(self.__LIST_PATH.format(pid=os.getpid()),
+                                  REGISTRY.counter("picture_mirror_list_writes_total"))
+        os.makedirs(self.__mirror_dir, exist_ok=True)
+
+        # Mirrored pictures (modification time and size) by path in copy order, pictures of the file list and their
+        # version, position of the next picture to be mirrored and pictures to be copied again
+        self.__entries: Dict[str, Tuple[int, int]] = OrderedDict()
+        self.__mirror_size = 0
+        self.__version = None
+        self.__pictures: Tuple[str, ...] = ()
+        self.__cursor = 0
+        self.__refetch: Deque[str] = deque()
+
+        # Running copies (path and start), synchronization and probe (future and start), state of the share and times
+        # of the next probe, synchronization and move of the full window
+        self.__fetches: Dict[Future, Tuple[str, float]] = {}
+        self.__sync: Optional[Tuple[Future, float]] = None
+        self.__probe: Optional[Tuple[Future, float]] = None
+        self.__reachable = True
+        self.__unreachable_since = 0.0
+        self.__next_probe = 0.0
+        self.__next_sync = time.monotonic() + self.__SYNC_INTERVAL
+        self.__next_move = 0.0
+
+        # Start of the pending changes of the file list, time of the last change (None if the file list is up to
+        # date) and time of the first unsaved change of the manifest (None if the manifest is up to date)
+        self.__pending_since: Optional[float] = None
+        self.__last_change: Optional[float] = None
+        self.__manifest_changed: Optional[float] = None
+
+        self.__fetch_results = {result: REGISTRY.counter("picture_mirror_fetches_total", {"result": result})
+                                for result in ("copied", "failed")}
+        self.__fetch_time = REGISTRY.histogram("picture_mirror_fetch_seconds", None, self.__FETCH_BUCKETS)
+        self.__evictions = REGISTRY.counter("picture_mirror_evictions_total")
+        self.__syncs = {result: REGISTRY.counter("picture_mirror_synced_total", {"result": result})
+                        for result in ("unchanged", "modified", "removed")}
+        self.__size = REGISTRY.gauge("picture_mirror_bytes")
+        self.__count = REGISTRY.gauge("picture_mirror_pictures")
+        self.__reachable_gauge = REGISTRY.gauge("picture_mirror_share_reachable")
+        self.__reachable_gauge.set(1)
+        super().__init__(self.__maintain)
+
+    def list_path(self) -> Optional[str]:
+        """
+        Get the file list of the mirrored pictures.
+        :return: Path of the file list or None if no picture has been mirrored yet.
+        """
+        return self.__list.path()
+
+    def set_on_list_ready(self, on_ready: Callable[[], None]) -> None:
+        """
+        Set the function called once the file list has been written for the first time.
+        :param on_ready: Function called from the mirror thread (or right away if the list has already been written).
+        :return: None
+        """
+        self.__list.set_on_ready(on_ready)
+
+    def pictures(self) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Get the mirrored pictures as written to the file list.
+        :return: Tuple consisting of the version of the file list and the paths to the local copies.
+        """
+        return self.__list.pictures()
+
+    def __local_path(self, source: str) -> Optional[str]:
+        """
+        Get the path of the local copy of a picture.
+        :param source: Path to the picture.
+        :return: Path to the local copy or None if the picture isn't on the share.
+        """
+        if not source.startswith(self.__picture_dir + os.sep):
+            return None
+        return os.path.join(self.__mirror_dir, os.path.relpath(source, self.__picture_dir))
+
+    def __changed(self) -> None:
+        """
+        Mark the file list and the manifest as changed.
+        :return: None
+        """
+        self.__last_change = time.monotonic()
+        if self.__pending_since is None:
+            self.__pending_since = self.__last_change
+        if self.__manifest_changed is None:
+            self.__manifest_changed = self.__last_change
+        self.__size.set(self.__mirror_size)
+        self.__count.set(len(self.__entries))
+
+    def __add_entry(self, source: str, modification_time: int, size: int) -> None:
+        """
+        Add a mirrored picture as the newest one of the window.
+        :param source: Path to the picture.
+        :param modification_time: Modification time of the picture in nanoseconds.
+        :param size: Size of the picture in bytes.
+        :return: None
+        """
+        self.__remove_entry(source, False)
+        self.__entries[source] = (modification_time, size)
+        self.__mirror_size += size
+
+    def __remove_entry(self, source: str, delete: bool = True) -> None:
+        """
+        Remove a mirrored picture from the window.
+        :param source: Path to the picture.
+        :param delete: True to delete the local copy, False to keep it (e.g. because it has just been replaced).
+        :return: None
+        """
+        entry = self.__entries.pop(source, None)
+        if entry is None:
+            return
+        self.__mirror_size -= entry[1]
+        local_path = self.__local_path(source)
+        if delete and local_path is not None:
+            try:
+                os.remove(local_path)
+            except OSError as exception:
+                LOG.warning("Cannot remove mirrored picture %s: %s", local_path, exception)
+
+    def __load_manifest(self) -> None:
+        """
+        Load the manifest of the mirror directory, so that the mirrored pictures are shown right away even if the share
+        is unreachable. Local files missing in the manifest (e.g. after a crash) are removed.
+        :return: None
+        """
+        path = os.path.join(self.__mirror_dir, self.__MANIFEST)
+        try:
+            with open(path, "r", encoding="utf-8", errors="surrogateescape") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get("picture_dir") != self.__picture_dir:
+                raise ValueError("picture directory changed")
+            entries = manifest["entries"]
+        except FileNotFoundError:
+            entries = []
+        except (OSError, ValueError, KeyError, AttributeError) as exception:
+            LOG.warning("Discarding picture mirror manifest %s: %s", path, exception)
+            entries = []
+
+        for source, modification_time, size in entries:
+            local_path = self.__local_path(source)
+            if local_path is None or os.path.isfile(local_path):
+                self.__add_entry(source, modification_time, size)
+        mirrored = {self.__local_path(source) for source in self.__entries}
+        for directory, _, file_names in os.walk(self.__mirror_dir):
+            for name in file_names:
+                file_path = os.path.join(directory, name)
+                if file_path not in mirrored and file_path != path:
+                    os.remove(file_path)
+
+        LOG.info("Picture mirror %s contains %d pictures (%.1f MB).", self.__mirror_dir, len(self.__entries),
+                 self.__mirror_size / 1e6)
+        if self.__entries:
+            self.__flush()
+        self.__changed()
+
+    def __save_manifest(self) -> None:
+        """
+        Write the manifest of the mirror directory atomically.
+        :return: None
+        """
+        path = os.path.join(self.__mirror_dir, self.__MANIFEST)
+        manifest = {"picture_dir": self.__picture_dir,
+                    "entries": [[source, modification_time, size]
+                                for source, (modification_time, size) in self.__entries.items()]}
+        try:
+            with open(f"{path}.tmp", "w", encoding="utf-8", errors="surrogateescape") as manifest_file:
+                json.dump(manifest, manifest_file)
+            os.replace(f"{path}.tmp", path)
+        except OSError as exception:
+            LOG.error("Cannot write picture mirror manifest %s: %s", path, exception)
+        self.__manifest_changed = None
+
+    def __look_up(self, pictures: Tuple[str, ...]) -> None:
+        """
+        Take over a changed file list, mirroring continues after the newest mirrored picture. Mirrored pictures which
+        are no longer listed stay in the window until they are evicted.
+        :param pictures: Paths to the pictures.
+        :return: None
+        """
+        self.__pictures = pictures
+        positions = {picture: position for position, picture in enumerate(pictures)}
+        self.__cursor = 0
+        for source in reversed(self.__entries):
+            if source in positions:
+                self.__cursor = positions[source] + 1
+                break
+
+    def __set_reachable(self, reachable: bool, reason: str) -> None:
+        """
+        Change the state of the share.
+        :param reachable: True if the share is reachable, False otherwise.
+        :param reason: Reason of the change, used for logging.
+        :return: None
+        """
+        if reachable == self.__reachable:
+            return
+        self.__reachable = reachable
+        self.__reachable_gauge.set(1 if reachable else 0)
+        now = time.monotonic()
+        if reachable:
+            LOG.info("Picture share %s is reachable again after %.0f seconds, synchronizing %d mirrored pictures.",
+                     self.__picture_dir, now - self.__unreachable_since, len(self.__entries))
+            self.__next_sync = now
+        else:
+            LOG.warning("Picture share %s is unreachable (%s), showing the %d mirrored pictures.", self.__picture_dir,
+                        reason, len(self.__entries))
+            self.__unreachable_since = now
+            self.__next_probe = now + self.__PROBE_INTERVAL
+
+    def __check_stalls(self, now: float) -> None:
+        """
+        Mark the share as unreachable if an access hasn't completed in time. Stalled copies and synchronizations are
+        abandoned.
+        :param now: Monotonic time.
+        :return: None
+        """
+        stalled = [future for future, (_, start) in self.__fetches.items() if now - start >= self.__STALL_TIMEOUT]
+        for future in stalled:
+            del self.__fetches[future]
+        if self.__sync is not None and now - self.__sync[1] >= self.__STALL_TIMEOUT:
+            self.__sync = None
+            stalled.append(None)
+        # A stalled probe is kept, so that the share isn't probed again before it returns
+        if self.__probe is not None and now - self.__probe[1] >= self.__STALL_TIMEOUT:
+            stalled.append(None)
+        if stalled:
+            self.__set_reachable(False, "stalled")
+
+    def __is_full(self) -> bool:
+        """
+        Check if the window is full, i.e. if a picture of average size doesn't fit in anymore.
+        :return: True if the window is full, False otherwise.
+        """
+        return bool(self.__entries) and \
+            self.__mirror_size + self.__mirror_size / len(self.__entries) > self.__size_budget
+
+    def __fill(self, now: float) -> None:
+        """
+        Copy the upcoming pictures, up to the size budget or, once the window is full, one picture per slideshow
+        interval.
+        :param now: Monotonic time.
+        :return: None
+        """
+        if not self.__reachable or self.__sync is not None:
+            return
+        fetching = {source for source, _ in self.__fetches.values()}
+        while self.__refetch and len(self.__fetches) < self.__WORKERS:
+            self.__submit(self.__refetch.popleft(), now)
+
+        attempts = 0
+        while len(self.__fetches) < self.__WORKERS and attempts < len(self.__pictures):
+            full = self.__is_full()
+            if full and (now < self.__next_move or self.__fetches):
+                break
+            source = self.__pictures[self.__cursor % len(self.__pictures)]
+            self.__cursor = (self.__cursor + 1) % len(self.__pictures)
+            attempts += 1
+            if source in self.__entries or source in fetching:
+                continue
+            if full:
+                self.__next_move = now + self.__slideshow_interval
+            if self.__local_path(source) is None:
+                # Local anyway
+                self.__add_entry(source, 0, 0)
+                self.__changed()
+                continue
+            self.__submit(source, now)
+            fetching.add(source)
+
+    def __submit(self, source: str, now: float) -> None:
+        """
+        Start copying a picture.
+        :param source: Path to the picture.
+        :param now: Monotonic time.
+        :return: None
+        """
+        self.__fetches[_run_in_thread(_fetch, source, self.__local_path(source))] = (source, now)
+
+    def __complete_fetch(self, future: Future) -> None:
+        """
+        Handle a completed copy.
+        :param future: Future of the copy.
+        :return: None
+        """
+        source, start = self.__fetches.pop(future)
+        try:
+            modification_time, size = future.result()
+        except FileNotFoundError:
+            LOG.debug("Picture %s has been removed before it has been mirrored.", source)
+            return
+        except OSError as exception:
+            LOG.warning("Cannot mirror picture %s: %s", source, exception)
+            self.__fetch_results["failed"].increment()
+            # Check whether the share has become unreachable
+            self.__next_probe = 0.0
+            return
+
+        self.__fetch_time.observe(time.monotonic() - start)
+        self.__fetch_results["copied"].increment()
+        self.__add_entry(source, modification_time, size)
+        while self.__mirror_size > self.__size_budget and len(self.__entries) > 1:
+            self.__remove_entry(next(iter(self.__entries)))
+            self.__evictions.increment()
+        self.__changed()
+
+    def __complete_sync(self, states: Dict[str, Optional[Tuple[int, int]]]) -> None:
+        """
+        Apply the states of the mirrored pictures on the share, modified pictures are copied again.
+        :param states: Modification time and size of the mirrored pictures by path, None for removed pictures.
+        :return: None
+        """
+        counts = {"unchanged": 0, "modified": 0, "removed": 0}
+        for source, state in states.items():
+            if source not in self.__entries:
+                continue
+            if state is None:
+                self.__remove_entry(source)
+                counts["removed"] += 1
+            elif state != self.__entries[source]:
+                self.__refetch.append(source)
+                counts["modified"] += 1
+            else:
+                counts["unchanged"] += 1
+        for result, count in counts.items():
+            self.__syncs[result].increment(count)
+        if counts["removed"]:
+            self.__changed()
+        LOG.info("Synchronized %d mirrored pictures: %d modified, %d removed.", len(states), counts["modified"],
+                 counts["removed"])
+
+    def __access_share(self, now: float) -> None:
+        """
+        Probe the unreachable share or synchronize the mirrored pictures if due.
+        :param now: Monotonic time.
+        :return: None
+        """
+        if self.__probe is None and now >= self.__next_probe and (not self.__reachable or self.__next_probe == 0.0):
+            self.__probe = (_run_in_thread(_probe, self.__picture_dir), now)
+            self.__next_probe = now + self.__PROBE_INTERVAL
+        if self.__reachable and self.__sync is None and now >= self.__next_sync:
+            sources = [source for source in self.__entries if self.__local_path(source) is not None]
+            self.__sync = (_run_in_thread(_stat_all, sources), now)
+            self.__next_sync = now + self.__SYNC_INTERVAL
+
+    def __complete(self, futures: Iterable[Future]) -> None:
+        """
+        Handle completed accesses to the share.
+        :param futures: Completed futures.
+        :return: None
+        """
+        for future in futures:
+            if future in self.__fetches:
+                self.__complete_fetch(future)
+            elif self.__probe is not None and future is self.__probe[0]:
+                self.__probe = None
+                exception = future.exception()
+                self.__set_reachable(exception is None, str(exception))
+            elif self.__sync is not None and future is self.__sync[0]:
+                self.__sync = None
+                try:
+                    self.__complete_sync(future.result())
+                except OSError as exception:
+                    self.__set_reachable(False, str(exception))
+
+    def __flush_time(self) -> float:
+        """
+        Get the time of the next write of the changed file list. The first file list is written soon after the first
+        picture has been mirrored, so that the slideshow doesn't wait for the window to fill.
+        :return: Monotonic time.
+        """
+        if self.__list.path() is None:
+            return self.__pending_since + self.__SETTLE_TIME
+        return min(self.__last_change + self.__SETTLE_TIME, self.__pending_since + self.__MAX_WRITE_DELAY)
+
+    def __flush(self) -> None:
+        """
+        Write the file list, listing the local copies of the mirrored pictures.
+        :return: None
+        """
+        self.__list.update([self.__local_path(source) or source for source in self.__entries])
+        self.__pending_since = None
+        self.__last_change = None
+
+    def __maintain(self) -> None:
+        """
+        Keep the mirror in line with the file list until the object is stopped.
+        :return: None
+        """
+        LOG.info("Picture mirror of %s has started with a size budget of %.0f MB.", self.__picture_dir,
+                 self.__size_budget / 1e6)
+        self.__load_manifest()
+
+        while self.shall_run():
+            version, pictures = self.__picture_index.pictures()
+            if version != self.__version and self.__picture_index.list_path() is not None:
+                self.__version = version
+                self.__look_up(pictures)
+
+            now = time.monotonic()
+            self.__check_stalls(now)
+            self.__access_share(now)
+            self.__fill(now)
+
+            timeout = self.__POLL_INTERVAL
+            if self.__last_change is not None:
+                timeout = max(0.0, min(timeout, self.__flush_time() - time.monotonic()))
+            running = list(self.__fetches) + [access[0] for access in (self.__probe, self.__sync) if access]
+            if running:
+                completed, _ = wait(running, timeout, FIRST_COMPLETED)
+                self.__complete(completed)
+            else:
+                time.sleep(timeout)
+
+            now = time.monotonic()
+            if self.__last_change is not None and now >= self.__flush_time():
+                self.__flush()
+            if self.__manifest_changed is not None and now >= self.__manifest_changed + self.__MANIFEST_INTERVAL:
+                self.__save_manifest()
+
+        self.__save_manifest()
+        self.__list.remove()
+        LOG.info("Picture mirror has stopped.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+
+"""
+        Module containing the player backends showing the camera streams.
+"""
+
+from __future__ import annotations
+
+import getpass
+import json
+import logging
+import os
+import socket
+import sys
+import time
+
+from abc import ABC, abstractmethod
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from miscellaneous.miscellaneous import read_screen_size
+from miscellaneous.process import ProcessHandle
+from objects.process_supervisor import ProcessSupervisor
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class PlayerSession:
+    """
+    Class holding the stream of one camera played by a player backend.
+    """
+    __slots__ = ("camera", "url", "player", "visible", "window", "first_frame")
+
+    def __init__(self, camera: str, url: str):
+        """
+        Class constructor.
+        :param camera: Camera ID.
+        :param url: Stream URL.
+        """
+        self.camera = camera
+        self.url = url
+        # Player of the backend (a process handle or a player instance)
+        self.player: Any = None
+        self.visible = False
+        self.window: Optional[Tuple[int, int, int, int]] = None
+        self.first_frame = False
+
+
+class PlayerBackend(ABC):
+    """
+    Base class of the player backends. A backend plays the stream of a session visible in a window or hidden (i.e.
+    connected but not shown), shows or hides it and stops it. All functions are called from the thread dispatching the
+    events of the camera stream and must not block. The callbacks passed to them may be called from other threads
+    (e.g. the output reader of a player or the IPC reader of a player instance).
+    """
+    # Name of the backend
+    NAME = None
+
+    def __init__(self, supervisor: ProcessSupervisor):
+        """
+        Class constructor.
+        :param supervisor: Supervisor spawning the players.
+        """
+        self.__supervisor = supervisor
+        self.__screen_size = read_screen_size()
+
+    def supervisor(self) -> ProcessSupervisor:
+        """
+        Get the supervisor spawning the players.
+        :return: Process supervisor.
+        """
+        return self.__supervisor
+
+    def screen_size(self) -> Tuple[int, int]:
+        """
+        Get the size of the screen.
+        :return: Tuple consisting of width and height in pixels.
+        """
+        return self.__screen_size
+
+    @abstractmethod
+    def start(self, session: PlayerSession, on_spawned: Callable[[], None], on_first_frame: Callable[[], None]) -> None:
+        """
+        Start playing the stream of a session in its window or hidden if it has no window.
+        :param session: Player session.
+        :param on_spawned: Function called after the player is ready to open the stream.
+        :param on_first_frame: Function called after the player has shown the first frame of the stream.
+        :return: None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def show(self, session: PlayerSession, window: Optional[Tuple[int, int, int, int]],
+             on_completed: Callable[[bool], None]) -> None:
+        """
+        Show a playing session in the given window or hide it.
+        :param session: Player session.
+        :param window: Window (left, top, right, bottom) to show the stream in or None to hide it.
+        :param on_completed: Function called with True if the player has been shown or hidden, False otherwise.
+        :return: None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def stop(self, session: PlayerSession, on_stopped: Callable[[], None]) -> None:
+        """
+        Stop playing the stream of a session.
+        :param session: Player session.
+        :param on_stopped: Function called after the stream has been stopped (not called if it wasn't playing).
+        :return: None
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def is_running(self, session: PlayerSession) -> bool:
+        """
+        Check if the stream of a session is playing.
+        :param session: Player session.
+        :return: True if the stream is playing, False otherwise.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def process_name(self, session: PlayerSession) -> Optional[str]:
+        """
+        Get the name of the supervised process playing the stream of a session.
+        :param session: Player session.
+        :return: Process name or None if the stream isn't playing.
+        """
+        raise NotImplementedError
+
+
+class OmxplayerBackend(PlayerBackend):
+    """
+    Backend playing each stream with its own omxplayer process. Hidden players are fully transparent, they are shown,
+    hidden and moved via the D-Bus interface of the player.
+    """
+    NAME = "omxplayer"
+
+    # D-Bus name prefix of the players and file containing the D-Bus address written by the player
+    __DBUS_NAME = "org.mpris.MediaPlayer2.omxplayer.surveillance_frame"
+    __DBUS_ADDRESS_FILE = "/tmp/omxplayerdbus.{user}"
+
+    # Start of the line printed by the player as soon as the video stream has been opened, taken as the first frame
+    __FIRST_FRAME_MARKER = "Video codec"
+
+    def __init__(self, supervisor: ProcessSupervisor, program: str = "omxplayer"):
+        """
+        Class constructor.
+        :param supervisor: Supervisor spawning the players.
+        :param program: Path of the player.
+        """
+        self.__program = program
+        super().__init__(supervisor)
+
+    def __dbus_name(self, camera: str) -> str:
+        """
+        Get the D-Bus name of the player of a camera.
+        :param camera: Camera ID.
+        :return: D-Bus name.
+        """
+        return f"{self.__DBUS_NAME}.camera_{camera.replace('-', '_')}"
+
+    def start(self, session: PlayerSession, on_spawned: Callable[[], None], on_first_frame: Callable[[], None]) -> None:
+        """
+        Start playing the stream of a session in its window or hidden if it has no window.
+        :param session: Player session.
+        :param on_spawned: Function called after the player has been spawned.
+        :param on_first_frame: Function called after the player has opened the stream.
+        :return: None
+        """
+        stream_call = [self.__program, "--avdict", "rtsp_transport:tcp", "--live", "--dbus_name",
+                       self.__dbus_name(session.camera), "--win",
+                       ",".join(str(value) for value in session.window or (0, 0) + self.screen_size()),
+                       "--aspect-mode", "letterbox", session.url]
+        if session.window is None:
+            stream_call[1:1] = ["--alpha", "0"]
+
+        session.player = self.supervisor().spawn(f"camera_stream.{session.camera}", stream_call,
+                                                 self.__FIRST_FRAME_MARKER, on_spawned, on_first_frame)
+        self.supervisor().watch(session.player, session.window is not None)
+
+    def __call_player(self, session: PlayerSession, method: str, argument: str,
+                      on_completed: Callable[[int], None]) -> None:
+        """
+        Call a method of the D-Bus interface of a player.
+        :param session: Player session.
+        :param method: Method name, e.g. "SetAlpha".
+        :param argument: Typed argument of the method, e.g. "int64:255".
+        :param on_completed: Function called with the return code of the call.
+        :return: None
+        """
+        try:
+            with open(self.__DBUS_ADDRESS_FILE.format(user=getpass.getuser()), "r", encoding="utf-8") as address_file:
+                dbus_address = address_file.read().strip()
+        except OSError:
+            dbus_address = None
+
+        if dbus_address:
+            dbus_call = ["env", f"DBUS_SESSION_BUS_ADDRESS={dbus_address}", "dbus-send", "--print-reply=literal",
+                         "--session", "--reply-timeout=500", f"--dest={self.__dbus_name(session.camera)}",
+                         "/org/mpris/MediaPlayer2", f"org.mpris.MediaPlayer2.Player.{method}", "objpath:/not/used",
+                         argument]
+            self.supervisor().launcher().run(dbus_call, on_completed=on_completed)
+        else:
+            on_completed(-1)
+
+    def show(self, session: PlayerSession, window: Optional[Tuple[int, int, int, int]],
+             on_completed: Callable[[bool], None]) -> None:
+        """
+        Show a playing session in the given window or hide it by changing the transparency (and position) of its player.
+        :param session: Player session.
+        :param window: Window (left, top, right, bottom) to show the stream in or None to hide it.
+        :param on_completed: Function called with True if the player has been shown or hidden, False otherwise.
+        :return: None
+        """
+        def on_moved(return_code: int) -> None:
+            if return_code == 0:
+                self.__call_player(session, "SetAlpha", "int64:255", lambda code: on_completed(code == 0))
+            else:
+                on_completed(False)
+
+        self.supervisor().watch(session.player, window is not None)
+        if window is None:
+            self.__call_player(session, "SetAlpha", "int64:0", lambda code: on_completed(code == 0))
+        elif window != session.window:
+            self.__call_player(session, "VideoPos", "string:" + " ".join(str(value) for value in window), on_moved)
+        else:
+            self.__call_player(session, "SetAlpha", "int64:255", lambda code: on_completed(code == 0))
+
+    def stop(self, session: PlayerSession, on_stopped: Callable[[], None]) -> None:
+        """
+        Stop playing the stream of a session by terminating its player.
+        :param session: Player session.
+        :param on_stopped: Function called after the player has been terminated (not called if it wasn't running).
+        :return: None
+        """
+        if session.player is not None:
+            self.supervisor().terminate(session.player, on_stopped)
+
+    def is_running(self, session: PlayerSession) -> bool:
+        """
+        Check if the player of a session is running.
+        :param session: Player session.
+        :return: True if the player is running, False otherwise.
+        """
+        return session.player is not None and session.player.is_running()
+
+    def process_name(self, session: PlayerSession) -> Optional[str]:
+        """
+        Get the name of the supervised player of a session.
+        :param session: Player session.
+        :return: Process name or None if the stream isn't playing.
+        """
+        return f"camera_stream.{session.camera}" if session.player is not None else None
+
+
+class _MpvPlayer:
+    """
+    Class holding a long-lived mpv instance and its JSON IPC connection. Commands sent before the IPC socket of the
+    player has been connected are queued. Replies and events are read by a reader thread.
+    """
+    # Number of seconds to wait for the IPC socket after spawning the player
+    __CONNECT_TIMEOUT = 10.0
+
+    def __init__(self, name: str, socket_path: str, on_event: Callable[[_MpvPlayer, Dict[str, Any]], None]):
+        """
+        Class constructor.
+        :param name: Name of the supervised player process.
+        :param socket_path: Path of the IPC socket of the player.
+        :param on_event: Function called with the player and each event received from it (from the reader thread).
+        """
+        self.name = name
+        self.socket_path = socket_path
+        self.handle: Optional[ProcessHandle] = None
+        # Session loaded by the player, whether its video is enabled and whether its first frame has been reported
+        self.session: Optional[PlayerSession] = None
+        self.video = False
+        self.frame_reported = True
+        self.on_first_frame: Optional[Callable[[], None]] = None
+
+        self.__on_event = on_event
+        self.__lock = Lock()
+        self.__connection = None
+        self.__closed = False
+        self.__pending: List[bytes] = []
+        self.__replies: Dict[int, Optional[Callable[[bool], None]]] = {}
+        self.__next_request_id = 1
+
+    def connect(self) -> None:
+        """
+        Connect to the IPC socket of the spawned player in the background.
+        :return: None
+        """
+        Thread(target=self.__read_messages, daemon=True).start()
+
+    def command(self, args: List[Any], on_reply: Optional[Callable[[bool], None]] = None) -> None:
+        """
+        Send a command to the player.
+        :param args: Command name and arguments, e.g. ["loadfile", "rtsp://..."].
+        :param on_reply: Function called with True if the command succeeded, False otherwise (also if the player
+                         exited) or None.
+        :return: None
+        """
+        with self.__lock:
+            if self.__closed:
+                failed = True
+            else:
+                failed = False
+                request_id = self.__next_request_id
+                self.__next_request_id += 1
+                self.__replies[request_id] = on_reply
+                message = (json.dumps({"command": args, "request_id": request_id}) + "\n").encode()
+                if self.__connection is None:
+                    self.__pending.append(message)
+                else:
+                    try:
+                        self.__connection.sendall(message)
+                    except OSError:
+                        # The reader fails the reply once the connection is closed
+                        pass
+        if failed and on_reply:
+            on_reply(False)
+
+    def __connect(self) -> Optional[socket.socket]:
+        """
+        Connect to the IPC socket, retrying until the player has created it.
+        :return: Connected socket or None if the player didn't create it in time.
+        """
+        deadline = time.monotonic() + self.__CONNECT_TIMEOUT
+        while not self.__closed and time.monotonic() < deadline:
+            if self.handle is not None and not self.handle.is_running():
+                break
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                connection.connect(self.socket_path)
+                return connection
+            except OSError:
+                connection.close()
+                time.sleep(0.05)
+        return None
+
+    def __read_messages(self) -> None:
+        """
+        Read the replies and events of the player until its IPC connection has been closed.
+        :return: None
+        """
+        connection = self.__connect()
+        if connection is None:
+            LOG.error("Cannot connect to the IPC socket %s of player %s.", self.socket_path, self.name)
+        else:
+            with self.__lock:
+                self.__connection = connection
+                try:
+                    for message in self.__pending:
+                        connection.sendall(message)
+                except OSError:
+                    pass
+                self.__pending.clear()
+
+            with connection, connection.makefile("r", encoding="utf-8", errors="replace") as stream:
+                for line in stream:
+                    self.__handle_message(line)
+
+        with self.__lock:
+            self.__closed = True
+            self.__connection = None
+            replies = list(self.__replies.values())
+            self.__replies.clear()
+        for on_reply in replies:
+            if on_reply:
+                on_reply(False)
+
+    def __handle_message(self, line: str) -> None:
+        """
+        Handle a message of the player.
+        :param line: JSON encoded message.
+        :return: None
+        """
+        try:
+            message = json.loads(line)
+        except ValueError:
+            LOG.debug("Ignoring invalid message of player %s: %s", self.name, line.strip())
+            return
+
+        if "request_id" in message:
+            with self.__lock:
+                on_reply = self.__replies.pop(message["request_id"], None)
+            if message.get("error") != "success":
+                LOG.debug("Command of player %s failed: %s", self.name, message.get("error"))
+            if on_reply:
+                on_reply(message.get("error") == "success")
+        elif "event" in message:
+            self.__on_event(self, message)
+
+    def close(self) -> None:
+        """
+        Close the IPC connection, replies still pending fail.
+        :return: None
+        """
+        with self.__lock:
+            self.__closed = True
+            if self.__connection is not None:
+                try:
+                    self.__connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class MpvBackend(PlayerBackend):
+    """
+    Backend keeping long-lived mpv instances (at most one per concurrent session) which are controlled via their JSON
+    IPC sockets. Starting a stream only loads it into an idle instance and stopping it unloads it, so no process is
+    spawned or terminated per motion event. Hidden streams are loaded with their video track disabled, i.e. the stream
+    stays connected without a window, showing it enables the video track in the window given by the geometry.
+    """
+    NAME = "mpv"
+
+    # Path of the IPC sockets of the players
+    __SOCKET_PATH = "/tmp/surveillance_frame.{pid}.mpv{index}.sock"
+
+    def __init__(self, supervisor: ProcessSupervisor, program: str = "mpv"):
+        """
+        Class constructor.
+        :param supervisor: Supervisor spawning the players.
+        :param program: Path of the player (or of a fake player speaking the same IPC protocol).
+        """
+        self.__program = program
+        self.__players: List[_MpvPlayer] = []
+        super().__init__(supervisor)
+
+    @staticmethod
+    def __geometry(window: Tuple[int, int, int, int]) -> str:
+        """
+        Get the mpv geometry of a window.
+        :param window: Window (left, top, right, bottom).
+        :return: Geometry in the format WxH+X+Y.
+        """
+        left, top, right, bottom = window
+        return f"{right - left}x{bottom - top}+{left}+{top}"
+
+    def __spawn(self, index: int, on_spawned: Callable[[], None]) -> _MpvPlayer:
+        """
+        Spawn an idle player.
+        :param index: Index of the player.
+        :param on_spawned: Function called after the player has been spawned.
+        :return: Player.
+        """
+        player = _MpvPlayer(f"camera_stream.player{index}",
+                            self.__SOCKET_PATH.format(pid=os.getpid(), index=index), self.__on_event)
+        player_call = [self.__program, "--idle=yes", "--force-window=no", f"--input-ipc-server={player.socket_path}",
+                       "--no-terminal", "--no-osc", "--no-border", "--ontop", "--keep-open=no",
+                       "--profile=low-latency", "--rtsp-transport=tcp"]
+
+        def on_player_spawned() -> None:
+            LOG.info("Player %s has started.", player.name)
+            on_spawned()
+
+        player.handle = self.supervisor().spawn(player.name, player_call, on_spawned=on_player_spawned)
+        player.connect()
+        return player
+
+    def __acquire(self, on_spawned: Callable[[], None]) -> _MpvPlayer:
+        """
+        Get an idle player, spawning one if none is running.
+        :param on_spawned: Function called once the player is ready.
+        :return: Player.
+        """
+        for index, player in enumerate(self.__players):
+            if player.session is None and player.handle.is_running():
+                on_spawned()
+                return player
+            if not player.handle.is_running():
+                # Replace an exited player
+                player.close()
+                self.supervisor().terminate(player.handle)
+                self.__players[index] = self.__spawn(index, on_spawned)
+                return self.__players[index]
+
+        self.__players.append(self.__spawn(len(self.__players), on_spawned))
+        return self.__players[-1]
+
+    def __on_event(self, player: _MpvPlayer, message: Dict[str, Any]) -> None:
+        """
+        Handle an event of a player (called by its reader thread).
+        :param player: Player.
+        :param message: Event message.
+        :return: None
+        """
+        event = message["event"]
+        session = player.session
+        if event in ("playback-restart", "video-reconfig") and session and player.video and not player.frame_reported:
+            player.frame_reported = True
+            player.on_first_frame()
+        elif event == "end-file" and session and message.get("reason") in ("eof", "error"):
+            LOG.warning("Camera stream of camera %s has ended (%s).", session.camera, message.get("reason"))
+
+    def start(self, session: PlayerSession, on_spawned: Callable[[], None], on_first_frame: Callable[[], None]) -> None:
+        """
+        Load the stream of a session into an idle player, with its video track disabled if the session has no window.
+        :param session: Player session.
+        :param on_spawned: Function called after the player is ready to open the stream.
+        :param on_first_frame: Function called after the player has shown the first frame of the stream.
+        :return: None
+        """
+        player = self.__acquire(on_spawned)
+        player.session = session
+        player.on_first_frame = on_first_frame
+        player.video = session.window is not None
+        player.frame_reported = False
+        session.player = player
+
+        if session.window is not None:
+            player.command(["set_property", "geometry", self.__geometry(session.window)])
+        player.command(["set_property", "vid", "auto" if session.window is not None else "no"])
+        player.command(["loadfile", session.url, "replace"])
+        self.supervisor().watch(player.handle, session.window is not None)
+
+    def show(self, session: PlayerSession, window: Optional[Tuple[int, int, int, int]],
+             on_completed: Callable[[bool], None]) -> None:
+        """
+        Show a playing session in the given window by enabling its video track or hide it by disabling the video track.
+        :param session: Player session.
+        :param window: Window (left, top, right, bottom) to show the stream in or None to hide it.
+        :param on_completed: Function called with True if the player has been shown or hidden, False otherwise.
+        :return: None
+        """
+        player = session.player
+        self.supervisor().watch(player.handle, window is not None)
+        if window is None:
+            player.video = False
+            session.first_frame = False
+            player.command(["set_property", "vid", "no"], on_completed)
+            return
+
+        if player.video:
+            # Move the window only
+            player.command(["set_property", "geometry", self.__geometry(window)], on_completed)
+        else:
+            player.video = True
+            player.frame_reported = False
+            player.command(["set_property", "geometry", self.__geometry(window)])
+            player.command(["set_property", "vid", "auto"], on_completed)
+
+    def stop(self, session: PlayerSession, on_stopped: Callable[[], None]) -> None:
+        """
+        Stop playing the stream of a session by unloading it, the player stays idle for the next stream.
+        :param session: Player session.
+        :param on_stopped: Function called after the stream has been unloaded (not called if it wasn't playing).
+        :return: None
+        """
+        player = session.player
+        if player is None or player.session is not session:
+            return
+
+        player.session = None
+        player.video = False
+        session.player = None
+        self.supervisor().watch(player.handle, False)
+        if player.handle.is_running():
+            player.command(["stop"], lambda _: on_stopped())
+
+    def is_running(self, session: PlayerSession) -> bool:
+        """
+        Check if the stream of a session is loaded by a running player.
+        :param session: Player session.
+        :return: True if the stream is playing, False otherwise.
+        """
+        player = session.player
+        return player is not None and player.session is session and player.handle.is_running()
+
+    def process_name(self, session: PlayerSession) -> Optional[str]:
+        """
+        Get the name of the supervised player playing the stream of a session.
+        :param session: Player session.
+        :return: Process name or None if the stream isn't playing.
+        """
+        return session.player.name if session.player is not None else None
+
+
+# Player backends by name
+PLAYER_BACKENDS = {backend.NAME: backend for backend in (OmxplayerBackend, MpvBackend)}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
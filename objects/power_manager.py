@@ -4,22 +4,31 @@
         Module responsible for power management.
 """
 
+from __future__ import annotations
+
+import bisect
 import datetime
 import logging
+import re
 import sys
 import time
 
-from queue import Queue
-from typing import List, Optional, Union
+from threading import Event as Flag
+from typing import List, Optional, Set, Tuple, Union
 
 from events.event import Event
 from events.event_button_pressed import EventButtonPressed
+from events.event_config_changed import EventConfigChanged
 from events.event_control import EventControl
 from events.event_motion_changed import EventMotionChanged
 from events.event_notify import EventNotify
+from events.event_queue import EventQueue
 from events.signals import Signal
-from miscellaneous.timer import Timer
-from objects.button import Button
+from miscellaneous.clock import Clock, REAL_CLOCK
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.state_machine import Rule, Transition, TransitionTable
+from miscellaneous.timer import Timer, TimerService
+from miscellaneous.tracing import Stage, record_latency
 from objects.threaded_object import ThreadedObject
 
 # Define the logger
@@ -53,6 +62,53 @@ class PowerSchedule:
         self.__end = end
         self.__mode = mode
 
+    @staticmethod
+    def parse(schedule: str) -> PowerSchedule:
+        """
+        Parse a power schedule in the format <weekday>,<start>,<end>,<mode>, e.g. "Tuesday,22:00,0:00,CAMERA_MOTION".
+        :param schedule: Power schedule string.
+        :return: Power schedule.
+        :raise: ValueError if the power schedule is invalid.
+        """
+        elements = schedule.split(",")
+        if len(elements) != 4:
+            raise ValueError(f"Invalid power schedule '{schedule}' given.")
+
+        # Weekday
+        weekdays = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
+                    "weekday": PowerSchedule.WEEKDAY, "weekend": PowerSchedule.WEEKEND, "anyday": PowerSchedule.ANYDAY}
+        try:
+            weekday = weekdays[elements[0].lower()]
+        except KeyError as exception:
+            raise ValueError(f"Invalid weekday '{elements[0]}' given.") from exception
+
+        # Start time
+        time_pattern = r"^(\d{1,2}):(\d{2})$"
+        result = re.match(time_pattern, elements[1])
+        if result:
+            start = datetime.time(int(result.group(1)), int(result.group(2)), 0)
+        else:
+            raise ValueError(f"Invalid start time '{elements[1]}' given.")
+
+        # End time
+        result = re.match(time_pattern, elements[2])
+        if result:
+            end = datetime.time(int(result.group(1)), int(result.group(2)), 0)
+            if end != datetime.time(0) and start >= end:
+                raise ValueError(f"End time '{elements[2]}' must be after start time.")
+        else:
+            raise ValueError(f"Invalid end time '{elements[2]}' given.")
+
+        # Power mode
+        modes = {"ALWAYS_ON": PowerManager.Mode.ALWAYS_ON, "CAMERA_MOTION": PowerManager.Mode.CAMERA_MOTION,
+                 "MOTION_SENSOR": PowerManager.Mode.MOTION_SENSOR}
+        try:
+            mode = modes[elements[3].upper()]
+        except KeyError as exception:
+            raise ValueError(f"Invalid power mode '{elements[3]}' given.") from exception
+
+        return PowerSchedule(weekday, start, end, mode)
+
     def __str__(self) -> str:
         """
         String representation of this object.
@@ -91,6 +147,152 @@ class PowerSchedule:
         """
         return self.__mode
 
+    def applies_to(self, weekday: int) -> bool:
+        """
+        Check if the schedule applies to the given day of the week.
+        :param weekday: Day of the week (0: Monday, 1: Tuesday, ..., 6: Sunday).
+        :return: True if the schedule applies, False otherwise.
+        """
+        assert self.__weekday < 7 or self.__weekday == PowerSchedule.WEEKDAY \
+               or self.__weekday == PowerSchedule.WEEKEND or self.__weekday == PowerSchedule.ANYDAY
+        return self.__weekday == weekday or self.__weekday == PowerSchedule.ANYDAY \
+            or (self.__weekday == PowerSchedule.WEEKDAY and weekday < 5) \
+            or (self.__weekday == PowerSchedule.WEEKEND and weekday > 4)
+
+
+class WeeklySchedule:
+    """
+    Class defining the power schedules compiled into a week-long index of non-overlapping intervals, each with the mode
+    of the first matching schedule (ALWAYS_ON if none matches). The mode at a given time and the next mode change are
+    looked up by a binary search instead of checking every schedule.
+    """
+    # Number of seconds per day and week
+    __DAY = 86400
+    __WEEK = 7 * 86400
+
+    # Weekday names used for printing
+    __WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+    def __init__(self, schedules: List[PowerSchedule]):
+        """
+        Class constructor.
+        :param schedules: List of schedules, the first matching schedule wins.
+        """
+        self.__schedules = list(schedules)
+
+        # Boundaries of all schedules in seconds since Monday 0:00
+        boundaries = {0}
+        intervals = []
+        for weekday in range(7):
+            for schedule in self.__schedules:
+                if schedule.applies_to(weekday):
+                    start = weekday * self.__DAY + self.__seconds(schedule.start())
+                    end = weekday * self.__DAY + (self.__seconds(schedule.end()) or self.__DAY)
+                    boundaries.update((start, end))
+                    intervals.append((start, end, schedule.mode()))
+        boundaries.discard(self.__WEEK)
+
+        # Mode of each elementary interval, merging neighbors with the same mode
+        self.__starts: List[int] = []
+        self.__modes: List[str] = []
+        for boundary in sorted(boundaries):
+            mode = next((mode for start, end, mode in intervals if start <= boundary < end),
+                        PowerManager.Mode.ALWAYS_ON)
+            if not self.__modes or self.__modes[-1] != mode:
+                self.__starts.append(boundary)
+                self.__modes.append(mode)
+
+    @staticmethod
+    def __seconds(time_of_day: datetime.time) -> int:
+        """
+        Get the number of seconds since midnight of the given time of day.
+        :param time_of_day: Time of day.
+        :return: Number of seconds.
+        """
+        return time_of_day.hour * 3600 + time_of_day.minute * 60 + time_of_day.second
+
+    def __locate(self, now: datetime.datetime) -> Tuple[datetime.datetime, int]:
+        """
+        Locate the given time in the index.
+        :param now: Local date and time.
+        :return: Tuple consisting of the start of the week (Monday 0:00) and the index of the interval containing now.
+        """
+        week_start = datetime.datetime.combine(now.date() - datetime.timedelta(days=now.weekday()), datetime.time(0))
+        offset = (now - week_start).total_seconds()
+        return week_start, bisect.bisect_right(self.__starts, offset) - 1
+
+    def schedules(self) -> List[PowerSchedule]:
+        """
+        Get the compiled schedules.
+        :return: List of schedules.
+        """
+        return list(self.__schedules)
+
+    def mode_at(self, now: datetime.datetime) -> str:
+        """
+        Get the mode at the given time.
+        :param now: Local date and time.
+        :return: Power mode.
+        """
+        return self.__modes[self.__locate(now)[1]]
+
+    def next_change(self, now: datetime.datetime) -> Optional[Tuple[datetime.datetime, str]]:
+        """
+        Get the next mode change after the given time.
+        :param now: Local date and time.
+        :return: Tuple consisting of the date and time of the change and the new mode or None if the mode never changes.
+        """
+        if len(self.__modes) == 1:
+            return None
+
+        week_start, index = self.__locate(now)
+        index += 1
+        if index == len(self.__modes):
+            # Continue with the next week, its first interval may continue the current one
+            week_start += datetime.timedelta(days=7)
+            index = 1 if self.__modes[0] == self.__modes[-1] else 0
+        return week_start + datetime.timedelta(seconds=self.__starts[index]), self.__modes[index]
+
+    def transitions(self, now: datetime.datetime, count: int) -> List[Tuple[datetime.datetime, str]]:
+        """
+        Get the next mode changes after the given time.
+        :param now: Local date and time.
+        :param count: Maximum number of changes.
+        :return: List of tuples consisting of the date and time of the change and the new mode.
+        """
+        changes = []
+        while len(changes) < count:
+            change = self.next_change(now)
+            if change is None:
+                break
+            changes.append(change)
+            now = change[0]
+        return changes
+
+    def __str__(self) -> str:
+        """
+        String representation of this object, one line per interval of the week.
+        :return: String representation.
+        """
+        lines = []
+        for index, start in enumerate(self.__starts):
+            end = self.__starts[index + 1] if index + 1 < len(self.__starts) else self.__WEEK
+            lines.append(f"{self.__format_offset(start, False)} - {self.__format_offset(end, True)}: "
+                         f"{self.__modes[index]}")
+        return "\n".join(lines)
+
+    def __format_offset(self, offset: int, is_end: bool) -> str:
+        """
+        Format an offset into the week.
+        :param offset: Number of seconds since Monday 0:00.
+        :param is_end: True if the offset ends an interval (midnight is formatted as 24:00 of the previous day).
+        :return: Formatted offset, e.g. "Tuesday 22:00".
+        """
+        weekday, seconds = divmod(offset, self.__DAY)
+        if is_end and seconds == 0:
+            weekday, seconds = weekday - 1, self.__DAY
+        return f"{self.__WEEKDAYS[weekday]} {seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
 
 class PowerManager(ThreadedObject):
     """
@@ -104,76 +306,161 @@ class PowerManager(ThreadedObject):
         MOTION_SENSOR = "MOTION_SENSOR"
         CAMERA_MOTION = "CAMERA_MOTION"
 
+    class Action:
+        """
+        Class defining the actions of the power mode tables.
+        """
+        CAMERA_STREAM_ON = "CAMERA_STREAM_ON"
+        CAMERA_STREAM_OFF = "CAMERA_STREAM_OFF"
+        DISPLAY_POWER_ON = "DISPLAY_POWER_ON"
+        DISPLAY_POWER_OFF = "DISPLAY_POWER_OFF"
+        NOTIFY_OK = "NOTIFY_OK"
+        START_CAMERA_STREAM_TIMER = "START_CAMERA_STREAM_TIMER"
+        STOP_CAMERA_STREAM_TIMER = "STOP_CAMERA_STREAM_TIMER"
+        START_DISPLAY_POWER_TIMER = "START_DISPLAY_POWER_TIMER"
+        STOP_DISPLAY_POWER_TIMER = "STOP_DISPLAY_POWER_TIMER"
+
+    # Number of seconds the camera stream is shown after a short button press
+    __CAMERA_STREAM_TIMEOUT = 60
+
+    # Maximum number of seconds between two evaluations without input events, limits the impact of wall clock steps
+    # on schedule changes
+    __MAX_EVALUATION_INTERVAL = 60
+
     # Currently active mode
     __current_mode = None
 
     # Input states
     __in_button_press = None
-    __in_camera_motion = False
+    __in_camera_motions = frozenset()
     __in_sensor_motion = False
+    __in_sensor_motion_ended = False
+
+    # Latest input event which hasn't been evaluated yet and the input event evaluated by the current tick (used as
+    # cause of the output events to propagate the trace)
+    __in_event = None
+    __cause = None
+
+    # Power modes during which the camera stream is pre-warmed and flag indicating whether it is pre-warmed while the
+    # motion sensor detects motion
+    __prewarm_modes = frozenset()
+    __prewarm_on_motion = False
 
     # Output states
     __out_camera_stream = False
+    __out_camera_prewarm = False
     __out_display_power = False
     __out_slideshow = False
 
-    # Timers
-    __camera_stream_timer = Timer()
-    __display_power_timer = Timer()
-
-    def __init__(self, communication_queue: Queue, motion_timeout: int,
-                 schedules: Optional[List[PowerSchedule]] = None):
+    def __init__(self, communication_queue: EventQueue, motion_timeout: int,
+                 schedule: Optional[WeeklySchedule] = None, clock: Optional[Clock] = None,
+                 timer_service: Optional[TimerService] = None):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
         :param motion_timeout: Timeout of the motion detection in seconds.
-        :param schedules: List of schedules or None.
+        :param schedule: Compiled power schedules or None.
+        :param clock: Clock used for the schedules and timers or None for the real clock.
+        :param timer_service: Timer service run by the power manager (may be shared with other components, must use
+                              the same clock) or None for a private one.
         """
         self.__communication_queue = communication_queue
         self.__motion_timeout = motion_timeout
+        self.__clock = clock or REAL_CLOCK
+
+        # Timers
+        self.__timer_service = timer_service or TimerService(self.__clock)
+        self.__camera_stream_timer = Timer(self.__timer_service)
+        self.__display_power_timer = Timer(self.__timer_service)
+
+        # Actions of the power mode tables
+        self.__actions = {
+            PowerManager.Action.CAMERA_STREAM_ON: lambda: self.__control_camera_stream(True),
+            PowerManager.Action.CAMERA_STREAM_OFF: lambda: self.__control_camera_stream(False),
+            PowerManager.Action.DISPLAY_POWER_ON: lambda: self.__control_display_power(True),
+            PowerManager.Action.DISPLAY_POWER_OFF: lambda: self.__control_display_power(False),
+            PowerManager.Action.NOTIFY_OK: lambda: self.__communication_queue.put(EventNotify("OK", self.__cause)),
+            PowerManager.Action.START_CAMERA_STREAM_TIMER:
+                lambda: self.__camera_stream_timer.start(self.__CAMERA_STREAM_TIMEOUT),
+            PowerManager.Action.STOP_CAMERA_STREAM_TIMER: self.__camera_stream_timer.stop,
+            PowerManager.Action.START_DISPLAY_POWER_TIMER:
+                lambda: self.__display_power_timer.start(self.__motion_timeout),
+            PowerManager.Action.STOP_DISPLAY_POWER_TIMER: self.__display_power_timer.stop,
+        }
+
+        # Flag waking up the worker upon input events
+        self.__wakeup = Flag()
+
+        # Evaluation durations by reason (input event or deadline)
+        self.__evaluation_durations = {
+            reason: REGISTRY.histogram("power_manager_evaluation_seconds", {"reason": reason})
+            for reason in ("input", "deadline")
+        }
+
+        self.__schedule = None
+        self.__set_schedule(schedule)
 
-        self.__schedules = schedules
-        if schedules:
+        super().__init__(self.__worker)
+
+    def __set_schedule(self, schedule: Optional[WeeklySchedule]) -> None:
+        """
+        Set the power schedules. The schedules are swapped as a whole, so an evaluation running in parallel uses either
+        the previous or the new schedules.
+        :param schedule: Compiled power schedules or None.
+        :return: None
+        """
+        self.__schedule = schedule
+        if schedule:
             LOG.debug("Loaded power schedules:")
-            for schedule in schedules:
-                LOG.debug("* %s", schedule)
+            for power_schedule in schedule.schedules():
+                LOG.debug("* %s", power_schedule)
+            LOG.debug("Compiled week:")
+            for line in str(schedule).splitlines():
+                LOG.debug("* %s", line)
         else:
             LOG.debug("No schedules loaded.")
 
-        super().__init__(self.__worker)
+    def set_prewarm(self, modes: Set[str], on_motion: bool) -> None:
+        """
+        Configure when the camera stream is pre-warmed, i.e. kept ready so that showing it is instant.
+        :param modes: Power modes during which the camera stream is pre-warmed.
+        :param on_motion: True to pre-warm the camera stream while the motion sensor detects motion (the display is
+                          powering on), False otherwise.
+        :return: None
+        """
+        self.__prewarm_modes = frozenset(modes)
+        self.__prewarm_on_motion = on_motion
+        self.__wakeup.set()
 
     def __get_current_mode(self) -> str:
         """
         Get the current mode based on the configured schedules. Defaults to "always on" if no schedule matches
         :return: Current mode.
         """
-        mode = PowerManager.Mode.ALWAYS_ON
+        if self.__schedule:
+            return self.__schedule.mode_at(self.__clock.now())
 
-        if self.__schedules:
-            now = datetime.datetime.now()
-            for schedule in self.__schedules:
-                # Check weekday
-                assert schedule.weekday() < 7 or schedule.weekday() == PowerSchedule.WEEKDAY \
-                       or schedule.weekday() == PowerSchedule.WEEKEND or schedule.weekday() == PowerSchedule.ANYDAY
-                if schedule.weekday() == now.weekday():
-                    pass
-                elif schedule.weekday() == PowerSchedule.ANYDAY:
-                    pass
-                elif schedule.weekday() == PowerSchedule.WEEKDAY and now.weekday() < 5:
-                    pass
-                elif schedule.weekday() == PowerSchedule.WEEKEND and now.weekday() > 4:
-                    pass
-                else:
-                    continue
-
-                # Check time
-                assert schedule.end() == datetime.time(0) or schedule.start() < schedule.end()
-                if (schedule.end() == datetime.time(0) and now.time() >= schedule.start()) \
-                        or (schedule.start() <= now.time() < schedule.end()):
-                    mode = schedule.mode()
-                    break
-
-        return mode
+        return PowerManager.Mode.ALWAYS_ON
+
+    def time_to_deadline(self) -> float:
+        """
+        Get the number of seconds until the power manager has to be evaluated again without any input event, i.e. until
+        the earliest timer expires or the mode changes according to the schedules.
+        :return: Number of seconds until the next deadline.
+        """
+        deadlines = [float(self.__MAX_EVALUATION_INTERVAL)]
+
+        time_to_next_timer = self.__timer_service.time_to_next_deadline()
+        if time_to_next_timer is not None:
+            deadlines.append(time_to_next_timer)
+
+        if self.__schedule:
+            now = self.__clock.now()
+            next_change = self.__schedule.next_change(now)
+            if next_change is not None:
+                deadlines.append((next_change[0] - now).total_seconds())
+
+        return max(0.0, min(deadlines))
 
     def __control_camera_stream(self, enable: bool) -> None:
         """
@@ -181,16 +468,25 @@ class PowerManager(ThreadedObject):
         :param enable: True to enable, False to disable.
         :return: None
         """
-        self.__communication_queue.put(EventControl(Signal.CAMERA_STREAM_CONTROL, enable))
+        self.__communication_queue.put(EventControl.create(Signal.CAMERA_STREAM_CONTROL, enable, cause=self.__cause))
         self.__out_camera_stream = enable
 
+    def __control_camera_prewarm(self, enable: bool) -> None:
+        """
+        Control the pre-warming of the camera stream.
+        :param enable: True to enable, False to disable.
+        :return: None
+        """
+        self.__communication_queue.put(EventControl.create(Signal.CAMERA_STREAM_PREWARM, enable, cause=self.__cause))
+        self.__out_camera_prewarm = enable
+
     def __control_display_power(self, enable: bool) -> None:
         """
         Control the display power.
         :param enable: True to enable, False to disable.
         :return: None
         """
-        self.__communication_queue.put(EventControl(Signal.DISPLAY_POWER_CONTROL, enable))
+        self.__communication_queue.put(EventControl.create(Signal.DISPLAY_POWER_CONTROL, enable, cause=self.__cause))
         self.__out_display_power = enable
 
     def __control_slideshow(self, enable: bool) -> None:
@@ -199,93 +495,81 @@ class PowerManager(ThreadedObject):
         :param enable: True to enable, False to disable.
         :return: None
         """
-        self.__communication_queue.put(EventControl(Signal.SLIDESHOW_CONTROL, enable))
+        self.__communication_queue.put(EventControl.create(Signal.SLIDESHOW_CONTROL, enable, cause=self.__cause))
         self.__out_slideshow = enable
 
-    def __handle_camera_stream(self, initialize: bool) -> None:
+    def __take(self, transition: Optional[Transition]) -> None:
         """
-        Handle the camera stream: shown upon camera motion detection or short button press (for 60 seconds).
-        :param initialize: Set True to initialize the camera.
+        Take a transition of a power mode table, i.e. execute its actions.
+        :param transition: Transition or None if nothing happens.
         :return: None
         """
-        camera_stream_timeout = 60
+        if transition is not None:
+            for action in transition.take():
+                self.__actions[action]()
 
-        if initialize:
-            self.__camera_stream_timer.stop()
-
-        if self.__out_camera_stream:
-            if not self.__in_camera_motion and self.__camera_stream_timer.is_expired():
-                self.__control_camera_stream(False)
-        else:
-            if self.__in_camera_motion:
-                self.__control_camera_stream(True)
-            elif self.__in_button_press == Button.SHORT_PRESS:
-                self.__communication_queue.put(EventNotify("OK"))
-                self.__control_camera_stream(True)
-                self.__camera_stream_timer.start(camera_stream_timeout)
-
-    def __handle_display_power_always_on(self, initialize: bool) -> None:
-        """
-        Handle the display power in "always on" mode: always powered on (power off with long button press, power back
-        on with any button press).
-        :param initialize: Set True to initialize the display power.
+    def evaluate(self) -> None:
+        """
+        Evaluate the inputs and the current mode once and update the outputs accordingly. Needs to be called after
+        input events have been dispatched and when time_to_deadline() has elapsed.
         :return: None
         """
-        if initialize:
-            self.__display_power_timer.stop()
-            self.__control_display_power(True)
+        start_time = time.perf_counter()
+        reason = "deadline" if self.__in_event is None else "input"
+        self.__evaluate()
+        self.__evaluation_durations[reason].observe(time.perf_counter() - start_time)
 
-        if self.__out_display_power:
-            if self.__in_button_press == Button.LONG_PRESS:
-                self.__control_display_power(False)
-        else:
-            if self.__in_button_press is not None:
-                self.__control_display_power(True)
-            else:
-                # Do nothing if the display is off
-                return
-
-    def __handle_display_power_motion_sensor(self, initialize: bool) -> None:
+    def __evaluate(self) -> None:
         """
-        Handle the display power in "motion sensor" mode: powered on by the motion sensor (for self.__motion_timeout
-        seconds) or by the camera stream.
-        :param initialize: Set True to initialize the display power.
+        Evaluate the inputs and the current mode once and update the outputs accordingly.
         :return: None
         """
-        if initialize:
-            self.__display_power_timer.stop()
-            self.__control_display_power(False)
+        # Expire due timers
+        self.__timer_service.run_expired()
 
-        if self.__out_display_power:
-            if self.__in_sensor_motion:
-                self.__display_power_timer.start(self.__motion_timeout)
+        # Take the latest input event as cause of the outputs of this evaluation
+        self.__cause, self.__in_event = self.__in_event, None
+        if self.__cause is not None:
+            record_latency(Stage.POWER_MANAGER, self.__cause)
 
-            if not self.__out_camera_stream and self.__display_power_timer.is_expired():
-                self.__control_display_power(False)
-        else:
-            if self.__in_sensor_motion:
-                self.__control_display_power(True)
-                self.__display_power_timer.start(self.__motion_timeout)
-            elif self.__out_camera_stream:
-                self.__control_display_power(True)
+        # Start the slideshow
+        if not self.__out_slideshow:
+            self.__control_slideshow(True)
+
+        # Check the current mode based on the schedules
+        current_mode = self.__get_current_mode()
+        initialize = False
+        if current_mode != self.__current_mode:
+            initialize = True
+            if self.__current_mode is None:
+                LOG.info("Current mode initialized as %s.", current_mode)
+            else:
+                LOG.info("Current mode changed from %s to %s.", self.__current_mode, current_mode)
+            self.__current_mode = current_mode
 
-    def __handle_display_power_camera_motion(self, initialize: bool) -> None:
-        """
-        Handle the display power in "camera motion" mode: shown upon camera motion detection or short button press (for
-        30 seconds).
-        :param initialize: Set True to initialize the display power.
-        :return: None
-        """
+        # Display power (depends on the camera stream state before this evaluation)
+        display_power_table = DISPLAY_POWER_TABLES[current_mode]
         if initialize:
-            self.__display_power_timer.stop()
-            self.__control_display_power(False)
+            self.__take(display_power_table.entry())
+        self.__take(display_power_table.lookup(self.__out_display_power, self.__in_button_press,
+                                               self.__out_camera_stream, self.__in_sensor_motion,
+                                               self.__in_sensor_motion_ended, self.__display_power_timer.is_pending()))
 
-        if self.__out_display_power:
-            if not self.__out_camera_stream:
-                self.__control_display_power(False)
-        else:
-            if self.__out_camera_stream:
-                self.__control_display_power(True)
+        # Camera stream
+        if initialize:
+            self.__take(CAMERA_STREAM_TABLE.entry())
+        self.__take(CAMERA_STREAM_TABLE.lookup(self.__out_camera_stream, self.__in_button_press,
+                                               bool(self.__in_camera_motions),
+                                               self.__camera_stream_timer.is_pending()))
+
+        # Camera stream pre-warming
+        prewarm = current_mode in self.__prewarm_modes or (self.__prewarm_on_motion and self.__in_sensor_motion)
+        if prewarm != self.__out_camera_prewarm:
+            self.__control_camera_prewarm(prewarm)
+
+        # Reset a pressed button and an ended motion
+        self.__in_button_press = None
+        self.__in_sensor_motion_ended = False
 
     def __worker(self) -> None:
         """
@@ -294,58 +578,133 @@ class PowerManager(ThreadedObject):
         """
         LOG.info("Power manager has started.")
 
-        # Start the slideshow
-        self.__control_slideshow(True)
-
         while self.shall_run():
-            # Check the current mode based on the schedules
-            current_mode = self.__get_current_mode()
-            initialize = False
-            if current_mode != self.__current_mode:
-                initialize = True
-                if self.__current_mode is None:
-                    LOG.info("Current mode initialized as %s.", current_mode)
-                else:
-                    LOG.info("Current mode changed from %s to %s.", self.__current_mode, current_mode)
-                self.__current_mode = current_mode
-
-            # Display power
-            if current_mode == PowerManager.Mode.ALWAYS_ON:
-                self.__handle_display_power_always_on(initialize)
-            elif current_mode == PowerManager.Mode.MOTION_SENSOR:
-                self.__handle_display_power_motion_sensor(initialize)
-            elif current_mode == PowerManager.Mode.CAMERA_MOTION:
-                self.__handle_display_power_camera_motion(initialize)
-            else:
-                assert False
-
-            # Camera stream
-            self.__handle_camera_stream(initialize)
-
-            # Reset a pressed button
-            self.__in_button_press = None
+            self.evaluate()
 
-            # Let the CPU take a rest
-            time.sleep(0.25)
+            # Sleep until an input event arrives or the next deadline is due
+            self.__wakeup.wait(self.time_to_deadline())
+            self.__wakeup.clear()
 
         LOG.info("Power manager has stopped.")
 
-    def dispatch(self, event: Union[Event, EventButtonPressed, EventMotionChanged]) -> None:
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | {Signal.BUTTON_PRESSED, Signal.CAMERA_MOTION_CHANGED, Signal.SENSOR_MOTION_CHANGED,
+                                    Signal.CONFIG_CHANGED}
+
+    def dispatch(self, event: Union[Event, EventButtonPressed, EventConfigChanged, EventMotionChanged]) -> None:
         """
         Dispatch the given event to the object.
         :param event: Event to be dispatched.
         :return None
         """
-        if event.signal() == Signal.BUTTON_PRESSED:
+        if event.signal() is Signal.BUTTON_PRESSED:
             self.__in_button_press = event.press_type()
-        elif event.signal() == Signal.CAMERA_MOTION_CHANGED:
-            self.__in_camera_motion = event.motion()
-        elif event.signal() == Signal.SENSOR_MOTION_CHANGED:
+            self.__in_event = event
+            self.__wakeup.set()
+        elif event.signal() is Signal.CAMERA_MOTION_CHANGED:
+            # Cameras currently detecting motion (None is the default camera), any of them enables the camera stream
+            if event.motion():
+                self.__in_camera_motions = self.__in_camera_motions | {event.camera()}
+            else:
+                self.__in_camera_motions = self.__in_camera_motions - {event.camera()}
+            self.__in_event = event
+            self.__wakeup.set()
+        elif event.signal() is Signal.SENSOR_MOTION_CHANGED:
+            self.__in_sensor_motion_ended = self.__in_sensor_motion and not event.motion()
             self.__in_sensor_motion = event.motion()
+            self.__in_event = event
+            self.__wakeup.set()
+        elif event.signal() is Signal.CONFIG_CHANGED:
+            # A running display power timer keeps its timeout, the new motion timeout applies when it is started next
+            self.__motion_timeout = event.config().motion_timeout()
+            self.__set_schedule(event.config().schedule())
+            # Removed cameras cannot report the end of their motion anymore
+            streams = event.config().streams()
+            self.__in_camera_motions = frozenset(camera for camera in self.__in_camera_motions
+                                                 if camera is None or camera in streams)
+            self.__wakeup.set()
         else:
+            if event.signal() is Signal.TERMINATE:
+                # Let the worker leave its wait before it is joined
+                self.stop()
+                self.__wakeup.set()
             super().dispatch(event)
 
 
+# States of the power mode tables
+_OFF_ON = {False: "off", True: "on"}
+
+# Inputs of the display power tables: button press, camera stream state, sensor motion, ended sensor motion and pending
+# display power timer
+_DISPLAY_POWER_INPUTS = {
+    "button_press": (None, EventButtonPressed.SHORT_PRESS, EventButtonPressed.LONG_PRESS),
+    "camera_stream": (False, True),
+    "sensor_motion": (False, True),
+    "sensor_motion_ended": (False, True),
+    "display_power_timer": (False, True),
+}
+
+# Display power tables by power mode, the state is the display power
+DISPLAY_POWER_TABLES = {
+    # Always powered on (power off with long button press, power back on with any button press)
+    PowerManager.Mode.ALWAYS_ON: TransitionTable(
+        "display_power_always_on", _OFF_ON, _DISPLAY_POWER_INPUTS, [
+            Rule("long_press_off", True, {"button_press": EventButtonPressed.LONG_PRESS},
+                 [PowerManager.Action.DISPLAY_POWER_OFF], False),
+            Rule("press_on", False, {"button_press": (EventButtonPressed.SHORT_PRESS, EventButtonPressed.LONG_PRESS)},
+                 [PowerManager.Action.DISPLAY_POWER_ON], True),
+        ],
+        Rule("entry", None, {}, [PowerManager.Action.STOP_DISPLAY_POWER_TIMER, PowerManager.Action.DISPLAY_POWER_ON],
+             True)),
+
+    # Powered on by the motion sensor (until the motion timeout has elapsed after the motion) or by the camera stream
+    PowerManager.Mode.MOTION_SENSOR: TransitionTable(
+        "display_power_motion_sensor", _OFF_ON, _DISPLAY_POWER_INPUTS, [
+            Rule("motion_restart_timer", True, {"sensor_motion": True},
+                 [PowerManager.Action.START_DISPLAY_POWER_TIMER]),
+            Rule("motion_ended_restart_timer", True, {"sensor_motion_ended": True},
+                 [PowerManager.Action.START_DISPLAY_POWER_TIMER]),
+            Rule("timeout_off", True, {"camera_stream": False, "display_power_timer": False},
+                 [PowerManager.Action.DISPLAY_POWER_OFF], False),
+            Rule("motion_on", False, {"sensor_motion": True},
+                 [PowerManager.Action.DISPLAY_POWER_ON, PowerManager.Action.START_DISPLAY_POWER_TIMER], True),
+            Rule("camera_stream_on", False, {"camera_stream": True}, [PowerManager.Action.DISPLAY_POWER_ON], True),
+        ],
+        Rule("entry", None, {}, [PowerManager.Action.STOP_DISPLAY_POWER_TIMER, PowerManager.Action.DISPLAY_POWER_OFF],
+             False)),
+
+    # Powered on while the camera stream is shown
+    PowerManager.Mode.CAMERA_MOTION: TransitionTable(
+        "display_power_camera_motion", _OFF_ON, _DISPLAY_POWER_INPUTS, [
+            Rule("camera_stream_off", True, {"camera_stream": False}, [PowerManager.Action.DISPLAY_POWER_OFF], False),
+            Rule("camera_stream_on", False, {"camera_stream": True}, [PowerManager.Action.DISPLAY_POWER_ON], True),
+        ],
+        Rule("entry", None, {}, [PowerManager.Action.STOP_DISPLAY_POWER_TIMER, PowerManager.Action.DISPLAY_POWER_OFF],
+             False)),
+}
+
+# Camera stream table for all power modes, the state is the camera stream: shown upon camera motion or short button
+# press (for 60 seconds). Inputs: button press, camera motion and pending camera stream timer
+CAMERA_STREAM_TABLE = TransitionTable(
+    "camera_stream", _OFF_ON, {
+        "button_press": (None, EventButtonPressed.SHORT_PRESS, EventButtonPressed.LONG_PRESS),
+        "camera_motion": (False, True),
+        "camera_stream_timer": (False, True),
+    }, [
+        Rule("stop", True, {"camera_motion": False, "camera_stream_timer": False},
+             [PowerManager.Action.CAMERA_STREAM_OFF], False),
+        Rule("motion_start", False, {"camera_motion": True}, [PowerManager.Action.CAMERA_STREAM_ON], True),
+        Rule("short_press_start", False, {"button_press": EventButtonPressed.SHORT_PRESS},
+             [PowerManager.Action.NOTIFY_OK, PowerManager.Action.CAMERA_STREAM_ON,
+              PowerManager.Action.START_CAMERA_STREAM_TIMER], True),
+    ],
+    Rule("entry", None, {}, [PowerManager.Action.STOP_CAMERA_STREAM_TIMER]))
+
+
 if __name__ == "__main__":
     logging.basicConfig(format="%(levelname)s: %(message)s")
     logging.critical("This module cannot be executed.")
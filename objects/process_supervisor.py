@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for supervising the player processes.
+"""
+
+import logging
+import os
+import sys
+import time
+
+from threading import Event as Flag, Lock
+from typing import Callable, Dict, List, Optional
+
+from events.event import Event
+from events.event_process_restart import EventProcessRestart
+from events.event_queue import EventQueue
+from events.signals import Signal
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.process import ProcessHandle, ProcessLauncher
+from miscellaneous.timer import TimerHandle, TimerService
+from miscellaneous.tracing import LATENCY_BUCKETS
+from objects.threaded_object import ThreadedObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class _SupervisedProcess:
+    """
+    Class holding the supervision state of one spawned process.
+    """
+    __slots__ = ("name", "program", "handle", "spawn_time", "watched", "stopped", "exited", "stalled", "failed",
+                 "first_frame", "stall_timer")
+
+    def __init__(self, name: str, program: str):
+        """
+        Class constructor.
+        :param name: Name of the supervised process.
+        :param program: Program name used as metrics label.
+        """
+        self.name = name
+        self.program = program
+        self.handle: Optional[ProcessHandle] = None
+        self.spawn_time = time.monotonic()
+        self.watched = False
+        self.stopped = False
+        self.exited = False
+        self.stalled = False
+        self.failed = False
+        self.first_frame = False
+        self.stall_timer: Optional[TimerHandle] = None
+
+
+class ProcessSupervisor(ThreadedObject):
+    """
+    Class supervising the player processes spawned by other objects. The output of each process is drained by the
+    launcher into the ring buffer of its handle, the first line starting with the first frame marker of the player is
+    taken as its first frame. A watched process (e.g. a player which is meant to be visible) which exits or doesn't
+    show its first frame in time is restarted by its owner upon a PROCESS_RESTART event, repeated failures delay the
+    restart exponentially. The thread of the supervisor only runs the restart and stall timers.
+    """
+    # Delay of the first restart in seconds, doubled with every further failure
+    __INITIAL_BACKOFF = 1.0
+
+    # Number of seconds a process must have been running to reset the restart delay
+    __STABLE_RUNTIME = 60
+
+    # Number of output lines logged when a process fails
+    __LOGGED_OUTPUT_LINES = 10
+
+    def __init__(self, communication_queue: EventQueue, launcher: Optional[ProcessLauncher] = None,
+                 stall_timeout: float = 20.0, max_backoff: float = 60.0):
+        """
+        Class constructor.
+        :param communication_queue: Queue used for event communication.
+        :param launcher: Launcher used to start and stop the processes or None for a synchronous launcher.
+        :param stall_timeout: Number of seconds until a spawned player must have shown its first frame.
+        :param max_backoff: Maximum delay of a restart in seconds.
+        """
+        self.__communication_queue = communication_queue
+        self.__launcher = launcher or ProcessLauncher()
+        self.__stall_timeout = stall_timeout
+        self.__max_backoff = max_backoff
+
+        # Supervised processes by name, consecutive failures by name and pending restarts by name
+        self.__lock = Lock()
+        self.__processes: Dict[str, _SupervisedProcess] = {}
+        self.__failures: Dict[str, int] = {}
+        self.__restarts: Dict[str, TimerHandle] = {}
+
+        # Timers run by the supervisor thread
+        self.__timer_service = TimerService()
+        self.__wakeup = Flag()
+        super().__init__(self.__supervise)
+
+    def launcher(self) -> ProcessLauncher:
+        """
+        Get the launcher used to start and stop the processes.
+        :return: Process launcher.
+        """
+        return self.__launcher
+
+    def spawn(self, name: str, args: List[str], first_frame_marker: Optional[str] = None,
+              on_spawned: Optional[Callable[[], None]] = None,
+              on_first_frame: Optional[Callable[[], None]] = None) -> ProcessHandle:
+        """
+        Spawn a supervised process, replacing the supervision of a previous process of the same name. The process is
+        not watched until watch() is called.
+        :param name: Name of the supervised process, e.g. "slideshow".
+        :param args: Command line of the process.
+        :param first_frame_marker: Start of the output line reporting the first frame or None if the process doesn't
+                                   report its first frame (it cannot stall then).
+        :param on_spawned: Function called after the process has been spawned or None.
+        :param on_first_frame: Function called after the process has reported its first frame or None.
+        :return: Process handle.
+        """
+        process = _SupervisedProcess(name, os.path.basename(args[0]))
+        with self.__lock:
+            self.__cancel_restart(name)
+            self.__processes[name] = process
+        if first_frame_marker:
+            process.stall_timer = self.__timer_service.call_later(self.__stall_timeout,
+                                                                  lambda: self.__on_stalled(process))
+            self.__wakeup.set()
+
+        def on_process_spawned() -> None:
+            REGISTRY.histogram("process_spawn_seconds", {"program": process.program}, LATENCY_BUCKETS) \
+                .observe(time.monotonic() - process.spawn_time)
+            if on_spawned:
+                on_spawned()
+
+        def on_output(line: str) -> None:
+            if not process.first_frame and line.startswith(first_frame_marker):
+                self.__on_first_frame(process)
+                if on_first_frame:
+                    on_first_frame()
+
+        process.handle = self.__launcher.spawn(args, on_process_spawned, on_output if first_frame_marker else None,
+                                               lambda return_code: self.__on_exited(process, return_code))
+        return process.handle
+
+    def terminate(self, handle: ProcessHandle, on_terminated: Optional[Callable[[], None]] = None) -> None:
+        """
+        Stop supervising a process and terminate it if it is running.
+        :param handle: Process handle returned by spawn().
+        :param on_terminated: Function called after the process has been terminated or None.
+        :return: None
+        """
+        with self.__lock:
+            process = self.__find(handle)
+            if process is not None:
+                del self.__processes[process.name]
+                self.__cancel_restart(process.name)
+                process.stopped = True
+                if process.stall_timer:
+                    process.stall_timer.cancel()
+
+        if handle.is_running():
+            self.__launcher.terminate(handle, on_terminated)
+
+    def terminate_all(self, on_terminated: Optional[Callable[[], None]] = None) -> None:
+        """
+        Stop supervising all processes and terminate the running ones, e.g. players kept running idle which must not
+        outlive the application.
+        :param on_terminated: Function called after all processes have been terminated or None.
+        :return: None
+        """
+        with self.__lock:
+            handles = [process.handle for process in self.__processes.values() if process.handle]
+        handles = [handle for handle in handles if handle.is_running()]
+        remaining = [len(handles)]
+
+        def on_process_terminated() -> None:
+            remaining[0] -= 1
+            if remaining[0] == 0 and on_terminated:
+                on_terminated()
+
+        if not handles and on_terminated:
+            on_terminated()
+        for handle in handles:
+            self.terminate(handle, on_process_terminated)
+
+    def watch(self, handle: ProcessHandle, watched: bool) -> None:
+        """
+        Start or stop watching a supervised process, only watched processes are restarted. A process which has already
+        failed is restarted as soon as it is watched.
+        :param handle: Process handle returned by spawn().
+        :param watched: True to restart the process if it exits or stalls, False otherwise.
+        :return: None
+        """
+        with self.__lock:
+            process = self.__find(handle)
+            if process is None or process.watched == watched:
+                return
+            process.watched = watched
+            if watched and not process.failed and (process.exited or process.stalled):
+                self.__fail(process, EventProcessRestart.EXITED if process.exited else EventProcessRestart.STALLED)
+
+    def __find(self, handle: ProcessHandle) -> Optional[_SupervisedProcess]:
+        """
+        Find the supervised process of a handle. The lock must be held.
+        :param handle: Process handle.
+        :return: Supervised process or None if the process is no longer supervised.
+        """
+        for process in self.__processes.values():
+            if process.handle is handle:
+                return process
+        return None
+
+    def __cancel_restart(self, name: str) -> None:
+        """
+        Cancel the pending restart of a process. The lock must be held.
+        :param name: Name of the supervised process.
+        :return: None
+        """
+        restart = self.__restarts.pop(name, None)
+        if restart:
+            restart.cancel()
+
+    def __on_first_frame(self, process: _SupervisedProcess) -> None:
+        """
+        Handle the first frame reported by a process.
+        :param process: Supervised process.
+        :return: None
+        """
+        REGISTRY.histogram("process_first_frame_seconds", {"program": process.program}, LATENCY_BUCKETS) \
+            .observe(time.monotonic() - process.spawn_time)
+        with self.__lock:
+            process.first_frame = True
+            if process.stall_timer:
+                process.stall_timer.cancel()
+            if process.stalled:
+                process.stalled = False
+                if process.failed and self.__processes.get(process.name) is process:
+                    # The stalled process recovered before its restart, keep it
+                    LOG.info("Process %s has recovered.", process.name)
+                    self.__cancel_restart(process.name)
+                    process.failed = False
+
+    def __on_stalled(self, process: _SupervisedProcess) -> None:
+        """
+        Handle a process which hasn't reported its first frame in time (called by the supervisor thread).
+        :param process: Supervised process.
+        :return: None
+        """
+        with self.__lock:
+            if process.first_frame or process.exited:
+                return
+            process.stalled = True
+            if process.watched and not process.stopped:
+                self.__fail(process, EventProcessRestart.STALLED)
+
+    def __on_exited(self, process: _SupervisedProcess, return_code: int) -> None:
+        """
+        Handle the exit of a process (called by the launcher).
+        :param process: Supervised process.
+        :param return_code: Return code of the process.
+        :return: None
+        """
+        with self.__lock:
+            process.exited = True
+            if process.stall_timer:
+                process.stall_timer.cancel()
+            if process.stopped or self.__processes.get(process.name) is not process:
+                return
+            LOG.debug("Process %s has exited with return code %d.", process.name, return_code)
+            if process.watched and not process.failed:
+                self.__fail(process, EventProcessRestart.EXITED)
+
+    def __fail(self, process: _SupervisedProcess, reason: str) -> None:
+        """
+        Schedule the restart of a failed process with exponential backoff. The lock must be held.
+        :param process: Supervised process.
+        :param reason: Reason of the restart (EventProcessRestart.EXITED or EventProcessRestart.STALLED).
+        :return: None
+        """
+        process.failed = True
+        failures = self.__failures.get(process.name, 0)
+        if time.monotonic() - process.spawn_time >= self.__STABLE_RUNTIME:
+            failures = 0
+        self.__failures[process.name] = failures + 1
+        delay = min(self.__max_backoff, self.__INITIAL_BACKOFF * 2 ** failures)
+
+        output = "".join(f"\n    {line}" for line in
+                         (process.handle.output()[-self.__LOGGED_OUTPUT_LINES:] if process.handle else []))
+        if not self.shall_run():
+            LOG.warning("Process %s has %s, the supervisor isn't running to restart it.%s", process.name, reason,
+                        output)
+            return
+
+        LOG.warning("Process %s has %s, restarting it in %.0f seconds.%s", process.name, reason, delay, output)
+        REGISTRY.counter("process_restarts_total", {"program": process.program, "reason": reason}).increment()
+        self.__restarts[process.name] = self.__timer_service.call_later(
+            delay, lambda: self.__request_restart(process, reason))
+        self.__wakeup.set()
+
+    def __request_restart(self, process: _SupervisedProcess, reason: str) -> None:
+        """
+        Request the restart of a failed process from its owner (called by the supervisor thread).
+        :param process: Supervised process.
+        :param reason: Reason of the restart.
+        :return: None
+        """
+        with self.__lock:
+            if self.__processes.get(process.name) is not process or process.stopped:
+                return
+            del self.__restarts[process.name]
+        self.__communication_queue.put(EventProcessRestart(process.name, reason))
+
+    def __supervise(self) -> None:
+        """
+        Run the restart and stall timers until the object is stopped.
+        :return: None
+        """
+        LOG.info("Process supervisor has started.")
+
+        while self.shall_run():
+            # Clear the flag before looking up the next deadline, so that no timer added meanwhile is missed
+            self.__wakeup.clear()
+            self.__timer_service.run_expired()
+            self.__wakeup.wait(self.__timer_service.time_to_next_deadline())
+
+        LOG.info("Process supervisor has stopped.")
+
+    def stop(self) -> None:
+        """
+        Stop the thread, it leaves its wait right away.
+        :return: None
+        """
+        super().stop()
+        self.__wakeup.set()
+
+    def dispatch(self, event: Event) -> None:
+        """
+        Dispatch the given event to the object.
+        :param event: Event to be dispatched.
+        :return: None
+        """
+        if event.signal() is Signal.TERMINATE:
+            # Let the worker leave its wait before it is joined
+            self.stop()
+            self.terminate_all()
+        super().dispatch(event)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
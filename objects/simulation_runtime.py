@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for running the application synchronously on a virtual clock.
+"""
+
+import heapq
+import logging
+import sys
+
+from typing import Callable, List, Optional
+
+from events.event_journal import EventJournalWriter
+from events.event_queue import EventQueue
+from miscellaneous.clock import VirtualClock
+from objects.event_dispatcher import EventDispatcher
+from objects.notifier import Notifier
+from objects.passive_object import PassiveObject
+from objects.power_manager import PowerManager
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class SimulationRuntime:
+    """
+    Class running the application in the calling thread on a virtual clock, e.g. to simulate a week of schedules within
+    seconds. Scheduled actions (such as fake GPIO changes) and the power manager evaluations are executed in virtual
+    time order, queued events are dispatched right after each of them. Like its worker, the power manager is evaluated
+    upon input events and at its deadlines. Objects spawning processes should use a FakeProcessLauncher.
+    """
+    # Minimum number of virtual seconds between two evaluations without input events, guards against rounding errors
+    __MIN_EVALUATION_INTERVAL = 0.001
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, clock: VirtualClock, communication_queue: EventQueue, objects: List[PassiveObject],
+                 power_manager: PowerManager, notifier: Optional[Notifier] = None,
+                 recorder: Optional[EventJournalWriter] = None):
+        """
+        Class constructor.
+        :param clock: Virtual clock shared with the objects.
+        :param communication_queue: Queue used for event communication.
+        :param objects: List of objects to dispatch received events to (including power manager and notifier).
+        :param power_manager: Power manager, must not be started.
+        :param notifier: Notifier, must not be started, or None.
+        :param recorder: Journal recording all dispatched events or None.
+        """
+        self.__clock = clock
+        self.__communication_queue = communication_queue
+        self.__dispatcher = EventDispatcher(communication_queue, objects, recorder=recorder)
+        self.__power_manager = power_manager
+        self.__power_manager_signals = power_manager.signals()
+        self.__notifier = notifier
+        self.__actions = []
+        self.__sequence = 0
+        self.__next_evaluation = clock.monotonic()
+        self.__evaluations = 0
+        self.__dispatched = 0
+        self.__max_queue_depth = 0
+
+    def schedule(self, delay: float, action: Callable[[], None]) -> None:
+        """
+        Schedule an action.
+        :param delay: Number of virtual seconds from now until the action is executed.
+        :param action: Function to be executed.
+        :return: None
+        """
+        self.schedule_at(self.__clock.monotonic() + delay, action)
+
+    def schedule_at(self, monotonic: float, action: Callable[[], None]) -> None:
+        """
+        Schedule an action at the given virtual monotonic time.
+        :param monotonic: Virtual monotonic time the action is executed at.
+        :param action: Function to be executed.
+        :return: None
+        """
+        # The sequence number keeps actions at the same time in scheduling order
+        heapq.heappush(self.__actions, (monotonic, self.__sequence, action))
+        self.__sequence += 1
+
+    def run_until(self, monotonic: float) -> None:
+        """
+        Run the simulation until the given virtual monotonic time.
+        :param monotonic: Virtual monotonic time to stop at.
+        :return: None
+        """
+        while True:
+            if self.__actions and self.__actions[0][0] <= min(self.__next_evaluation, monotonic):
+                action_time, _, action = heapq.heappop(self.__actions)
+                self.__clock.advance_to(action_time)
+                action()
+            elif self.__next_evaluation <= monotonic:
+                self.__clock.advance_to(self.__next_evaluation)
+                self.__evaluations += 1
+                self.__power_manager.evaluate()
+                self.__next_evaluation = self.__clock.monotonic() + max(self.__power_manager.time_to_deadline(),
+                                                                        self.__MIN_EVALUATION_INTERVAL)
+            else:
+                self.__clock.advance_to(monotonic)
+                break
+
+            if self.__dispatch_queued():
+                # React on input changes right away
+                self.__next_evaluation = self.__clock.monotonic()
+            if self.__notifier:
+                self.__notifier.show_pending()
+
+    def run_for(self, seconds: float) -> None:
+        """
+        Run the simulation for the given number of virtual seconds.
+        :param seconds: Number of virtual seconds.
+        :return: None
+        """
+        self.run_until(self.__clock.monotonic() + seconds)
+
+    def __dispatch_queued(self) -> bool:
+        """
+        Dispatch all queued events.
+        :return: True if an input event of the power manager has been dispatched, False otherwise.
+        """
+        self.__max_queue_depth = max(self.__max_queue_depth, self.__communication_queue.qsize())
+        input_dispatched = False
+        while not self.__communication_queue.empty():
+            event = self.__communication_queue.get_nowait()
+            self.__dispatcher.dispatch_event(event)
+            self.__dispatched += 1
+            if event.signal() in self.__power_manager_signals:
+                input_dispatched = True
+        return input_dispatched
+
+    def evaluations(self) -> int:
+        """
+        Get the number of power manager evaluations.
+        :return: Number of evaluations.
+        """
+        return self.__evaluations
+
+    def dispatched(self) -> int:
+        """
+        Get the number of dispatched events.
+        :return: Number of dispatched events.
+        """
+        return self.__dispatched
+
+    def max_queue_depth(self) -> int:
+        """
+        Get the maximum number of events queued at once.
+        :return: Maximum queue depth.
+        """
+        return self.__max_queue_depth
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
@@ -5,17 +5,26 @@
 """
 
 import logging
-import subprocess
 import sys
+import time
 
-from queue import Queue
-from typing import Union
+from typing import Optional, Set, Tuple, Union
 
 from events.event import Event
+from events.event_config_changed import EventConfigChanged
 from events.event_control import EventControl
+from events.event_process_restart import EventProcessRestart
+from events.event_queue import EventQueue
 from events.signals import Signal
-from miscellaneous.miscellaneous import terminate_process
+from miscellaneous.metrics import REGISTRY
+from miscellaneous.process import ProcessLauncher
+from miscellaneous.tracing import Stage, record_latency
 from objects.passive_object import PassiveObject
+from objects.picture_cache import PictureCache
+from objects.picture_catalog import PictureCatalog
+from objects.picture_index import PictureIndex
+from objects.picture_mirror import PictureMirror
+from objects.process_supervisor import ProcessSupervisor
 
 # Define the logger
 LOG = logging.getLogger(__name__)
@@ -23,56 +32,258 @@ LOG = logging.getLogger(__name__)
 
 class Slideshow(PassiveObject):
     """
-    Class handling the picture slideshow.
+    Class handling the picture slideshow. The picture viewer is restarted by the process supervisor if it exits. With
+    a picture index (or picture cache) the viewer shows its file list and isn't started until the list has been
+    written, otherwise it rescans the picture directory itself. While the display is powered off the picture viewer is
+    suspended, so it doesn't decode pictures for a dark panel, and it continues with the same picture when the display
+    is powered on again.
     """
+    # Name of the supervised picture viewer
+    __PROCESS_NAME = "slideshow"
+
     # Process handle
     __process = None
 
-    def __init__(self, communication_queue: Queue, picture_dir: str, slideshow_interval: int):
+    # Index of the picture directory
+    __picture_index = None
+
+    # Event which requested the start of the slideshow while the file list of the index hasn't been written yet
+    __pending_start = None
+
+    # Minimum number of active seconds of the picture viewer to measure its CPU usage
+    __MIN_MEASURED_TIME = 10
+
+    # Flag indicating whether the display is powered, the picture viewer is suspended otherwise
+    __display_on = True
+
+    # Monotonic times since when the picture viewer is active or suspended, None if it isn't
+    __active_since = None
+    __paused_since = None
+
+    # Active seconds of the picture viewer since it has been spawned
+    __active_time = 0.0
+
+    # CPU seconds used by the active picture viewer per second, None until it has been measured
+    __cpu_usage = None
+
+    def __init__(self, communication_queue: EventQueue, picture_dir: str, slideshow_interval: int,
+                 launcher: Optional[ProcessLauncher] = None):
         """
         Class constructor.
         :param communication_queue: Queue used for event communication.
         :param picture_dir: Path to the directory containing the pictures to be shown.
         :param slideshow_interval: Interval between two pictures.
+        :param launcher: Launcher used to start and stop the picture viewer or None for a synchronous launcher.
         """
         self.__communication_queue = communication_queue
         self.__picture_dir = picture_dir
         self.__slideshow_interval = slideshow_interval
+        self.__launcher = launcher or ProcessLauncher()
+        self.__supervisor = ProcessSupervisor(communication_queue, self.__launcher)
+
+        # Pause statistics
+        self.__start_time = time.monotonic()
+        self.__paused_time = 0.0
+        self.__cpu_saved = 0.0
         super().__init__()
 
-    def __start_slideshow(self) -> None:
+    def set_supervisor(self, supervisor: ProcessSupervisor) -> None:
+        """
+        Set the supervisor of the picture viewer, by default a failed picture viewer is not restarted.
+        :param supervisor: Process supervisor using the same launcher.
+        :return: None
+        """
+        self.__supervisor = supervisor
+
+    def set_picture_index(self,
+                          picture_index: Union[PictureIndex, PictureCache, PictureCatalog, PictureMirror]) -> None:
+        """
+        Set the index of the picture directory, by default the picture viewer rescans the picture directory itself.
+        :param picture_index: Picture index of the same picture directory, the picture cache in front of it, the
+                              picture catalog writing the playlist or the picture mirror of any of them.
+        :return: None
+        """
+        self.__picture_index = picture_index
+
+    def __start_slideshow(self, event: Event) -> None:
         """
         Start the slideshow.
+        :param event: Event which triggered the start.
         :return: None
         """
-        slideshow_call = ["feh", "--quiet", "--fullscreen", "--hide-pointer", "--recursive", f"{self.__picture_dir}",
-                          "--slideshow-delay", f"{self.__slideshow_interval}", "--reload", "10"]
-        self.__process = subprocess.Popen(slideshow_call, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                          universal_newlines=True)
-        LOG.info("Slideshow has started in directory %s with an interval of %d seconds.",
-                 self.__picture_dir, self.__slideshow_interval)
+        # feh rereads the file list on reload instead of rescanning the directory tree (or the share) itself
+        picture_list = self.__picture_index.list_path() if self.__picture_index else None
+        if self.__picture_index and not picture_list:
+            if self.__pending_start is None:
+                LOG.info("Slideshow waits for the file list of the picture index.")
+                self.__picture_index.set_on_list_ready(
+                    lambda: self.__communication_queue.put(Event.create(Signal.PICTURE_LIST_READY, cause=event)))
+            self.__pending_start = event
+            return
+        self.__pending_start = None
+        pictures = ["--filelist", picture_list] if picture_list else ["--recursive", f"{self.__picture_dir}"]
+        slideshow_call = ["feh", "--quiet", "--fullscreen", "--hide-pointer"] + pictures + \
+                         ["--slideshow-delay", f"{self.__slideshow_interval}", "--reload", "10"]
+
+        def on_spawned() -> None:
+            record_latency(Stage.SPAWN, event)
+            LOG.info("Slideshow has started in directory %s with an interval of %d seconds%s.",
+                     self.__picture_dir, self.__slideshow_interval, " (indexed)" if picture_list else "")
+            # A picture viewer spawned asynchronously while the display is off can only be suspended once it runs
+            if self.__paused_since is not None and self.__process is not None:
+                self.__launcher.suspend(self.__process)
 
-    def __stop_slideshow(self) -> None:
+        self.__process = self.__supervisor.spawn(self.__PROCESS_NAME, slideshow_call, on_spawned=on_spawned)
+        self.__supervisor.watch(self.__process, True)
+        self.__active_since = time.monotonic()
+        self.__active_time = 0.0
+        if not self.__display_on:
+            self.__pause_slideshow()
+
+    def __stop_slideshow(self, event: Event) -> None:
         """
         Stop the slideshow.
+        :param event: Event which triggered the stop.
+        :return: None
+        """
+        def on_terminated() -> None:
+            record_latency(Stage.COMPLETION, event)
+            LOG.info("Slideshow has been stopped.")
+
+        # The launcher resumes a suspended picture viewer to terminate it
+        if self.__paused_since is not None:
+            self.__end_pause()
+        self.__active_since = None
+        self.__supervisor.terminate(self.__process, on_terminated)
+        self.__process = None
+
+    def __pause_slideshow(self) -> None:
+        """
+        Suspend the picture viewer, its CPU usage is measured before to estimate the CPU time saved by the pause.
+        :return: None
+        """
+        now = time.monotonic()
+        if self.__active_since is not None:
+            self.__active_time += now - self.__active_since
+            self.__active_since = None
+        cpu_time = self.__launcher.cpu_time(self.__process)
+        if cpu_time is not None and self.__active_time >= self.__MIN_MEASURED_TIME:
+            self.__cpu_usage = cpu_time / self.__active_time
+
+        self.__launcher.suspend(self.__process)
+        self.__paused_since = now
+        REGISTRY.counter("slideshow_pauses_total").increment()
+        LOG.info("Slideshow has been paused while the display is off.")
+
+    def __resume_slideshow(self) -> None:
+        """
+        Resume the suspended picture viewer, it continues with the picture shown before the pause.
+        :return: None
+        """
+        paused_time, cpu_saved = self.__end_pause()
+        self.__launcher.resume(self.__process)
+        self.__active_since = time.monotonic()
+        LOG.info("Slideshow has been resumed after %.0f seconds, saving about %.1f CPU seconds.", paused_time,
+                 cpu_saved)
+
+    def __end_pause(self) -> Tuple[float, float]:
+        """
+        Account the end of a pause of the picture viewer.
+        :return: Tuple consisting of the duration of the pause and the estimated CPU time saved by it in seconds.
+        """
+        now = time.monotonic()
+        paused_time = now - self.__paused_since
+        cpu_saved = paused_time * (self.__cpu_usage or 0.0)
+        self.__paused_since = None
+        self.__paused_time += paused_time
+        self.__cpu_saved += cpu_saved
+
+        REGISTRY.gauge("slideshow_paused_seconds").set(self.__paused_time)
+        REGISTRY.gauge("slideshow_cpu_saved_seconds").set(self.__cpu_saved)
+        REGISTRY.gauge("slideshow_cpu_saved_seconds_per_day").set(
+            self.__cpu_saved * 86400 / max(now - self.__start_time, 1.0))
+        return paused_time, cpu_saved
+
+    def __set_display_power(self, display_on: bool) -> None:
+        """
+        Suspend the picture viewer when the display is powered off and resume it when the display is powered on.
+        :param display_on: True if the display is powered on, False otherwise.
         :return: None
         """
-        terminate_process(self.__process.pid)
-        LOG.info("Slideshow has been stopped.")
+        if display_on == self.__display_on:
+            return
+        self.__display_on = display_on
+        if self.__process is not None and self.__process.is_running():
+            if display_on:
+                self.__resume_slideshow()
+            else:
+                self.__pause_slideshow()
 
-    def dispatch(self, event: Union[Event, EventControl]) -> None:
+    def __control_slideshow(self, event: EventControl) -> None:
+        """
+        Start or stop the slideshow.
+        :param event: SLIDESHOW_CONTROL event.
+        :return: None
+        """
+        if event.enable():
+            if self.__process is None or not self.__process.is_running():
+                self.__start_slideshow(event)
+        else:
+            self.__pending_start = None
+            if self.__process is not None:
+                self.__stop_slideshow(event)
+
+    def __set_slideshow_interval(self, event: EventConfigChanged) -> None:
+        """
+        Take over a changed slideshow interval, a running slideshow is restarted to apply it.
+        :param event: CONFIG_CHANGED event.
+        :return: None
+        """
+        if event.config().slideshow_interval() == self.__slideshow_interval:
+            return
+        self.__slideshow_interval = event.config().slideshow_interval()
+        LOG.info("Slideshow interval changed to %s.", self.__slideshow_interval)
+        if self.__process is not None and self.__process.is_running():
+            self.__stop_slideshow(event)
+            self.__start_slideshow(event)
+
+    # pylint: disable=no-self-use
+    def has_blocking_dispatch(self) -> bool:
+        """
+        Check if the dispatch() function of the object may block for a noticeable time.
+        :return: True if dispatching may block, False otherwise.
+        """
+        return True
+
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | {Signal.SLIDESHOW_CONTROL, Signal.DISPLAY_POWER_CONTROL, Signal.CONFIG_CHANGED,
+                                    Signal.PROCESS_RESTART, Signal.PICTURE_LIST_READY}
+
+    def dispatch(self, event: Union[Event, EventConfigChanged, EventControl, EventProcessRestart]) -> None:
         """
         Dispatch the given event to the object.
         :param event: Event to be dispatched.
         :return None
         """
-        if event.signal() == Signal.SLIDESHOW_CONTROL:
-            if event.enable():
-                if self.__process is None or self.__process.poll() is not None:
-                    self.__start_slideshow()
-            else:
-                if self.__process is not None and self.__process.poll() is None:
-                    self.__stop_slideshow()
+        if event.signal() is Signal.SLIDESHOW_CONTROL:
+            self.__control_slideshow(event)
+        elif event.signal() is Signal.DISPLAY_POWER_CONTROL:
+            self.__set_display_power(event.enable())
+        elif event.signal() is Signal.CONFIG_CHANGED:
+            self.__set_slideshow_interval(event)
+        elif event.signal() is Signal.PROCESS_RESTART:
+            # Restart the picture viewer unless the slideshow has been stopped meanwhile
+            if event.process() == self.__PROCESS_NAME and self.__process is not None:
+                self.__stop_slideshow(event)
+                self.__start_slideshow(event)
+        elif event.signal() is Signal.PICTURE_LIST_READY:
+            # Start the slideshow which has been waiting for the file list unless it has been stopped meanwhile
+            if self.__pending_start is not None:
+                self.__start_slideshow(self.__pending_start)
         else:
             super().dispatch(event)
 
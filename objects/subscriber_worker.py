@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+"""
+        Module responsible for dispatching events to a single object from its own worker thread.
+"""
+
+import logging
+import sys
+import time
+
+from queue import Empty, Full, Queue
+from typing import Set
+
+from events.event import Event
+from events.signals import Signal
+from miscellaneous.metrics import REGISTRY
+from objects.passive_object import PassiveObject
+from objects.threaded_object import ThreadedObject
+
+# Define the logger
+LOG = logging.getLogger(__name__)
+
+
+class SubscriberWorker(ThreadedObject):
+    """
+    Class dispatching events to a single object from a bounded inbox served by its own thread, so a slow object cannot
+    delay the dispatching of events to other objects. If the inbox is full the oldest pending event is dropped.
+    """
+    def __init__(self, subscriber: PassiveObject, inbox_size: int = 8):
+        """
+        Class constructor.
+        :param subscriber: Object to dispatch the events to.
+        :param inbox_size: Maximum number of pending events.
+        """
+        self.__subscriber = subscriber
+        self.__inbox = Queue(maxsize=inbox_size)
+
+        labels = {"subscriber": type(subscriber).__name__}
+        self.__lag = REGISTRY.histogram("subscriber_lag_seconds", labels)
+        self.__duration = REGISTRY.histogram("subscriber_dispatch_seconds", labels)
+        self.__pending = REGISTRY.gauge("subscriber_pending_events", labels)
+        self.__dropped = REGISTRY.counter("subscriber_dropped_events_total", labels)
+
+        super().__init__(self.__work)
+
+    def __put(self, item: tuple) -> None:
+        """
+        Put an item into the inbox, dropping the oldest pending item if the inbox is full.
+        :param item: Item to put.
+        :return: None
+        """
+        try:
+            self.__inbox.put_nowait(item)
+        except Full:
+            try:
+                dropped_event, _ = self.__inbox.get_nowait()
+                self.__dropped.increment()
+                LOG.warning("Inbox of %s is full, dropped %s.", type(self.__subscriber).__name__, dropped_event)
+            except Empty:
+                pass
+            self.__inbox.put_nowait(item)
+        self.__pending.set(self.__inbox.qsize())
+
+    def __work(self) -> None:
+        """
+        Dispatch the events from the inbox to the subscriber.
+        :return: None
+        """
+        while self.shall_run():
+            event, enqueue_time = self.__inbox.get()
+            if not self.shall_run():
+                # Woken up for termination
+                break
+
+            start_time = time.monotonic()
+            self.__lag.observe(start_time - enqueue_time)
+            self.__pending.set(self.__inbox.qsize())
+            self.__subscriber.dispatch(event)
+            self.__duration.observe(time.monotonic() - start_time)
+
+    def subscriber(self) -> PassiveObject:
+        """
+        Get the object the events are dispatched to.
+        :return: Subscriber object.
+        """
+        return self.__subscriber
+
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the subscriber.
+        :return: Set of consumed signals.
+        """
+        return self.__subscriber.signals()
+
+    def dispatch(self, event: Event) -> None:
+        """
+        Queue the given event for the subscriber. TERMINATE stops the worker thread.
+        :param event: Event to be dispatched.
+        :return: None
+        """
+        if event.signal() is Signal.TERMINATE:
+            if self.is_running():
+                # Wake up the worker thread blocking on the inbox
+                self.stop()
+                self.__put((event, time.monotonic()))
+            super().dispatch(event)
+        else:
+            self.__put((event, time.monotonic()))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s")
+    logging.critical("This module cannot be executed.")
+    sys.exit(-1)
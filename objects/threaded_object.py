@@ -10,7 +10,7 @@ import logging
 import sys
 
 from threading import Thread
-from typing import Callable
+from typing import Callable, Set
 
 from events.event import Event
 from events.signals import Signal
@@ -73,13 +73,20 @@ class ThreadedObject(PassiveObject):
         """
         return self.__thread_handle.is_alive()
 
+    def signals(self) -> Set[Signal]:
+        """
+        Get the signals consumed by the dispatch() function of the object.
+        :return: Set of consumed signals.
+        """
+        return super().signals() | {Signal.TERMINATE}
+
     def dispatch(self, event: Event) -> None:
         """
         Dispatch the given event to the object.
         :param event: Event to be dispatched.
         :return: None
         """
-        if event.signal() == Signal.TERMINATE and self.__thread_handle.is_alive():
+        if event.signal() is Signal.TERMINATE and self.__thread_handle.is_alive():
             self.__shall_run = False
             self.__thread_handle.join()
         else:
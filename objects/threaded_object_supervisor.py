@@ -14,6 +14,9 @@ from events.event import Event
 from events.signals import Signal
 from objects.threaded_object import ThreadedObject
 
+# Define the logger
+LOG = logging.getLogger(__name__)
+
 
 class ThreadedObjectSupervisor(ThreadedObject):
     """
@@ -44,7 +47,10 @@ class ThreadedObjectSupervisor(ThreadedObject):
 
         # Stop all threaded objects
         for threaded_object in self.__threaded_objects:
-            threaded_object.dispatch(Event(Signal.TERMINATE))
+            try:
+                threaded_object.dispatch(Event.create(Signal.TERMINATE))
+            except Exception:   # pylint: disable=broad-except
+                LOG.exception("Cannot stop %s.", type(threaded_object).__name__)
 
 
 if __name__ == "__main__":
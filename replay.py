@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+"""
+        Surveillance Frame event journal replay.
+"""
+
+import argparse
+import datetime
+import functools
+import logging
+import os
+import sys
+import time
+
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from events.event import Event
+from events.event_journal import EventJournalReader
+from events.event_queue import EventQueue
+from events.signals import Signal
+from miscellaneous.clock import VirtualClock
+from objects.event_dispatcher import EventDispatcher
+from objects.output_recorder import OutputRecorder
+from objects.power_manager import PowerManager, PowerSchedule, WeeklySchedule
+from objects.simulation_runtime import SimulationRuntime
+
+# Define the logger
+LOG = logging.getLogger(os.path.basename(__file__).split('.')[0])
+
+# Signals which are not replayed (the journal doesn't record the content of configuration changes, process restarts
+# depend on the health of the recorded processes)
+_NOT_REPLAYED = {Signal.TERMINATE, Signal.CONFIG_CHANGED, Signal.PROCESS_RESTART}
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+    :return: Parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Replay an event journal recorded with 'surveillance_frame.py --journal' without hardware.\n\n"
+                    "By default the recorded input events (button presses and motion changes) are fed into\n"
+                    "a power manager whose control events are recorded by fake outputs. The resulting\n"
+                    "output changes are printed and compared with the recorded control events.",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("journal", metavar="JOURNAL", help="path to the event journal")
+    parser.add_argument("-b", "--benchmark", action="store_true",
+                        help="dispatch all recorded events as fast as possible and report the dispatcher throughput")
+    parser.add_argument("-r", "--run", metavar="INDEX", action="store", default=-1,
+                        help="run of the journal to be replayed, every start of surveillance_frame.py appends a new\n"
+                             "run, negative indices count from the last run (default: %(default)s)")
+    parser.add_argument("-S", "--schedule", action="store", nargs="+",
+                        help="power mode schedules as given to surveillance_frame.py")
+    parser.add_argument("-t", "--motion-timeout", metavar="SECONDS", action="store", default=3600,
+                        help="motion timeout as given to surveillance_frame.py (default: %(default)s)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="enable verbose logging")
+    parser.add_argument("-x", "--speed", metavar="FACTOR", action="store", default=1.0,
+                        help="replay speed factor, 0 replays as fast as possible on a virtual clock\n"
+                             "(default: %(default)s)")
+    return parser.parse_args()
+
+
+def report(outputs: OutputRecorder, recorded_counts: Dict[Signal, int],
+           to_wall_clock: Optional[Callable[[float], float]]) -> None:
+    """
+    Report the replayed output changes and compare the number of control events with the recorded ones.
+    :param outputs: Fake outputs of the replay.
+    :param recorded_counts: Number of recorded events per signal.
+    :param to_wall_clock: Function mapping a replay timestamp to the original wall clock time or None.
+    :return: None
+    """
+    for timestamp, signal, enable in outputs.timeline():
+        if to_wall_clock:
+            original_time = datetime.datetime.fromtimestamp(to_wall_clock(timestamp))
+            LOG.info("%s: %s -> %s", original_time.isoformat(sep=" ", timespec="seconds"), signal, enable)
+        else:
+            LOG.info("%.3f: %s -> %s", timestamp, signal, enable)
+
+    replayed_counts = outputs.counts()
+    for signal in OutputRecorder.CONTROL_SIGNALS:
+        LOG.info("%s: %d recorded, %d replayed.", signal, recorded_counts.get(signal, 0),
+                 replayed_counts.get(signal, 0))
+
+
+def split_journal(journal: EventJournalReader, input_signals: Set[Signal]) \
+        -> Tuple[List[Tuple[float, float, Event]], Dict[Signal, int]]:
+    """
+    Split the journal into the input records to be replayed and the number of recorded output events.
+    :param journal: Event journal.
+    :param input_signals: Signals of the input events.
+    :return: Tuple consisting of the input records and the number of other recorded events per signal.
+    """
+    inputs = []
+    recorded_counts = {}
+    for record in journal:
+        signal = record[2].signal()
+        if signal in input_signals:
+            inputs.append(record)
+        else:
+            recorded_counts[signal] = recorded_counts.get(signal, 0) + 1
+    return inputs, recorded_counts
+
+
+def replay(journal: EventJournalReader, speed: float, motion_timeout: int,
+           schedule: Optional[WeeklySchedule]) -> None:
+    """
+    Feed the recorded input events into a running power manager with fake outputs in scaled real time.
+    :param journal: Event journal.
+    :param speed: Replay speed factor.
+    :param motion_timeout: Motion timeout in seconds.
+    :param schedule: Compiled power schedules or None.
+    :return: None
+    """
+    communication_queue = EventQueue()
+    outputs = OutputRecorder()
+    power_manager = PowerManager(communication_queue, motion_timeout, schedule).start()
+    event_dispatcher = EventDispatcher(communication_queue, [outputs, power_manager]).start()
+    inputs, recorded_counts = split_journal(journal, power_manager.signals() - _NOT_REPLAYED)
+
+    start_time = time.monotonic()
+    try:
+        for monotonic, _, event in inputs:
+            delay = start_time + (monotonic - inputs[0][0]) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            communication_queue.put(event)
+
+        # Let the power manager evaluate the last input
+        time.sleep(0.5)
+    finally:
+        power_manager.dispatch(Event.create(Signal.TERMINATE))
+        event_dispatcher.dispatch(Event.create(Signal.TERMINATE))
+
+    LOG.info("Replayed %d records in %.3f seconds.", len(journal), time.monotonic() - start_time)
+    report(outputs, recorded_counts,
+           (lambda timestamp: inputs[0][1] + (timestamp - start_time) * speed) if inputs else None)
+
+
+def replay_virtual(journal: EventJournalReader, motion_timeout: int, schedule: Optional[WeeklySchedule]) -> None:
+    """
+    Feed the recorded input events into a power manager with fake outputs as fast as possible on a virtual clock, so
+    that schedules and timers behave as during the recording.
+    :param journal: Event journal.
+    :param motion_timeout: Motion timeout in seconds.
+    :param schedule: Compiled power schedules or None.
+    :return: None
+    """
+    if len(journal) == 0:
+        LOG.warning("The journal is empty.")
+        return
+
+    first_time, first_wall_clock, _ = journal[0]
+    clock = VirtualClock(datetime.datetime.fromtimestamp(first_wall_clock))
+    communication_queue = EventQueue(1024)
+    outputs = OutputRecorder(clock=clock)
+    power_manager = PowerManager(communication_queue, motion_timeout, schedule, clock)
+    runtime = SimulationRuntime(clock, communication_queue, [outputs, power_manager], power_manager)
+    inputs, recorded_counts = split_journal(journal, power_manager.signals() - _NOT_REPLAYED)
+    for monotonic, _, event in inputs:
+        runtime.schedule_at(monotonic - first_time, functools.partial(communication_queue.put, event))
+
+    start_time = time.monotonic()
+    runtime.run_until(journal[len(journal) - 1][0] - first_time + 1)
+    LOG.info("Replayed %d records in %.3f seconds.", len(journal), time.monotonic() - start_time)
+    report(outputs, recorded_counts, lambda timestamp: first_wall_clock + timestamp)
+
+
+def benchmark(journal: EventJournalReader) -> None:
+    """
+    Dispatch all recorded events as fast as possible and report the dispatcher throughput.
+    :param journal: Event journal.
+    :return: None
+    """
+    events = [event for _, _, event in journal if event.signal() is not Signal.TERMINATE]
+    # The queue holds all events, so none is dropped
+    communication_queue = EventQueue(len(events) + 1)
+    sink = OutputRecorder(set(Signal) - {Signal.TERMINATE})
+    event_dispatcher = EventDispatcher(communication_queue, [sink]).start()
+
+    start_time = time.monotonic()
+    for event in events:
+        communication_queue.put(event)
+    # Events are only coalesced while they are queued, so all events but the coalesced ones are dispatched
+    coalesced = communication_queue.coalesced()
+    sink.wait_recorded(len(events) - coalesced)
+    duration = time.monotonic() - start_time
+    event_dispatcher.dispatch(Event.create(Signal.TERMINATE))
+
+    dispatched = sum(sink.counts().values())
+    LOG.info("Queued %d events, dispatched %d events (%d coalesced) in %.3f seconds: %.0f events/s.",
+             len(events), dispatched, coalesced, duration, dispatched / duration if duration else float("inf"))
+
+
+def main() -> None:
+    """
+    Main entry point.
+    :return: None
+    """
+    arguments = parse_arguments()
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s",
+                        level=logging.DEBUG if arguments.verbose else logging.INFO)
+
+    try:
+        schedule = WeeklySchedule([PowerSchedule.parse(schedule) for schedule in arguments.schedule]) \
+            if arguments.schedule else None
+        journal = EventJournalReader(arguments.journal, int(arguments.run))
+    except (OSError, ValueError) as exception:
+        LOG.critical("%s", exception)
+        sys.exit(-1)
+
+    try:
+        if arguments.benchmark:
+            benchmark(journal)
+        else:
+            speed = float(arguments.speed)
+            if speed > 0:
+                replay(journal, speed, int(arguments.motion_timeout), schedule)
+            else:
+                replay_virtual(journal, int(arguments.motion_timeout), schedule)
+    except KeyboardInterrupt:
+        LOG.info("Received keyboard interrupt, shutting down...")
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
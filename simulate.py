@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+"""
+        Surveillance Frame simulation on a virtual clock with fake GPIOs and fake processes.
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import random
+import sys
+import time
+
+from typing import Callable, List
+
+import psutil
+
+from events.event import set_tracing
+from events.event_motion_changed import EventMotionChanged
+from events.event_queue import EventQueue
+from events.signals import Signal
+from miscellaneous.clock import VirtualClock
+from miscellaneous.gpio import FakeGPIO
+from miscellaneous.process import FakeProcessLauncher
+from objects.button import Button
+from objects.camera_stream import CameraStream
+from objects.display_power import DisplayPower
+from objects.motion_sensor import MotionSensor
+from objects.notifier import Notifier
+from objects.output_recorder import OutputRecorder
+from objects.player_backend import OmxplayerBackend
+from objects.power_manager import PowerManager, PowerSchedule, WeeklySchedule
+from objects.process_supervisor import ProcessSupervisor
+from objects.simulation_runtime import SimulationRuntime
+from objects.slideshow import Slideshow
+
+# Define the logger
+LOG = logging.getLogger(os.path.basename(__file__).split('.')[0])
+
+# Fake GPIO channels
+MOTION_CHANNEL = 11
+BUTTON_CHANNEL = 13
+
+# Power state of the fake display
+DISPLAY_POWER = {"state": "1"}
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse the command line arguments.
+    :return: Parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Simulate the surveillance frame application on a virtual clock, e.g. a whole week within\n"
+                    "seconds. Motion sensor, camera motion and button traffic is generated randomly, GPIOs\n"
+                    "and processes are faked. The simulation fails if more than one process per program has\n"
+                    "been running at a time.",
+        formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-c", "--camera-rate", metavar="COUNT", action="store", default=1.0,
+                        help="average number of camera motions per hour (default: %(default)s)")
+    parser.add_argument("-d", "--days", metavar="DAYS", action="store", default=7,
+                        help="number of days to simulate (default: %(default)s)")
+    parser.add_argument("-m", "--sensor-rate", metavar="COUNT", action="store", default=2.0,
+                        help="average number of motion sensor detections per hour (default: %(default)s)")
+    parser.add_argument("-p", "--press-rate", metavar="COUNT", action="store", default=6.0,
+                        help="average number of button presses per day (default: %(default)s)")
+    parser.add_argument("-s", "--seed", metavar="SEED", action="store", default=0,
+                        help="seed of the random traffic (default: %(default)s)")
+    parser.add_argument("-S", "--schedule", action="store", nargs="+",
+                        help="power mode schedules as given to surveillance_frame.py")
+    parser.add_argument("-t", "--motion-timeout", metavar="SECONDS", action="store", default=3600,
+                        help="motion timeout as given to surveillance_frame.py (default: %(default)s)")
+    parser.add_argument("-T", "--start", metavar="DATE", action="store",
+                        help="local date and time the simulation starts at in ISO format (default: now)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="enable verbose logging of all objects")
+    return parser.parse_args()
+
+
+def fake_vcgencmd(args: List[str]) -> List[str]:
+    """
+    Fake "vcgencmd display_power [0|1]", which switches the power of the fake display and reports its state.
+    :param args: Command line of vcgencmd.
+    :return: Output lines.
+    """
+    if len(args) > 2:
+        DISPLAY_POWER["state"] = args[2]
+    return [f"display_power={DISPLAY_POWER['state']}"]
+
+
+class Traffic:
+    """
+    Class describing randomly distributed input traffic, e.g. motion sensor detections.
+    """
+    __slots__ = ("rate_per_hour", "on_start", "on_end", "min_length", "max_length")
+
+    def __init__(self, rate_per_hour: float, on_start: Callable[[], None], on_end: Callable[[], None],
+                 min_length: float, max_length: float):
+        """
+        Class constructor.
+        :param rate_per_hour: Average number of occurrences per hour.
+        :param on_start: Function called at the start of an occurrence.
+        :param on_end: Function called at the end of an occurrence.
+        :param min_length: Minimum length of an occurrence in seconds.
+        :param max_length: Maximum length of an occurrence in seconds.
+        """
+        self.rate_per_hour = rate_per_hour
+        self.on_start = on_start
+        self.on_end = on_end
+        self.min_length = min_length
+        self.max_length = max_length
+
+    def schedule(self, runtime: SimulationRuntime, rng: random.Random, duration: float) -> int:
+        """
+        Schedule the occurrences of the traffic.
+        :param runtime: Simulation runtime.
+        :param rng: Random number generator.
+        :param duration: Simulated duration in seconds.
+        :return: Number of scheduled occurrences.
+        """
+        if self.rate_per_hour <= 0:
+            return 0
+
+        count = 0
+        offset = rng.expovariate(self.rate_per_hour / 3600)
+        while offset < duration:
+            runtime.schedule(offset, self.on_start)
+            runtime.schedule(offset + rng.uniform(self.min_length, self.max_length), self.on_end)
+            count += 1
+            offset += rng.expovariate(self.rate_per_hour / 3600)
+        return count
+
+
+# pylint: disable=too-many-locals,too-many-statements
+def main() -> None:
+    """
+    Main entry point.
+    :return: None
+    """
+    arguments = parse_arguments()
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s",
+                        level=logging.DEBUG if arguments.verbose else logging.INFO)
+    if not arguments.verbose:
+        logging.getLogger("objects").setLevel(logging.ERROR)
+
+    try:
+        schedule = WeeklySchedule([PowerSchedule.parse(schedule) for schedule in arguments.schedule]) \
+            if arguments.schedule else None
+        start = datetime.datetime.fromisoformat(arguments.start) if arguments.start else datetime.datetime.now()
+    except ValueError as exception:
+        LOG.critical("%s", exception)
+        sys.exit(-1)
+
+    # Latencies in virtual time are meaningless
+    set_tracing(False)
+
+    # Fake environment
+    clock = VirtualClock(start)
+    gpio = FakeGPIO()
+    gpio.setmode(gpio.BOARD)
+    launcher = FakeProcessLauncher()
+    launcher.set_output("vcgencmd", fake_vcgencmd)
+
+    # Objects
+    communication_queue = EventQueue(1024)
+    outputs = OutputRecorder(clock=clock)
+    power_manager = PowerManager(communication_queue, int(arguments.motion_timeout), schedule, clock)
+    notifier = Notifier(communication_queue, launcher)
+    communication_objects = [
+        DisplayPower(communication_queue, launcher).start(),
+        Slideshow(communication_queue, "/simulation/pictures", 10, launcher),
+        CameraStream(communication_queue, {"camera0": "rtsp://simulation/stream"},
+                     OmxplayerBackend(ProcessSupervisor(communication_queue, launcher))),
+        MotionSensor(communication_queue, MOTION_CHANNEL, gpio),
+        Button(communication_queue, BUTTON_CHANNEL, gpio, clock),
+        power_manager,
+        notifier,
+        outputs,
+    ]
+    runtime = SimulationRuntime(clock, communication_queue, communication_objects, power_manager, notifier)
+
+    # Traffic
+    rng = random.Random(int(arguments.seed))
+    duration = float(arguments.days) * 86400
+    sensor_motions = Traffic(float(arguments.sensor_rate), lambda: gpio.set_input(MOTION_CHANNEL, gpio.HIGH),
+                             lambda: gpio.set_input(MOTION_CHANNEL, gpio.LOW), 5, 120).schedule(runtime, rng, duration)
+    camera_motions = Traffic(
+        float(arguments.camera_rate),
+        lambda: communication_queue.put(EventMotionChanged.create(Signal.CAMERA_MOTION_CHANGED, True)),
+        lambda: communication_queue.put(EventMotionChanged.create(Signal.CAMERA_MOTION_CHANGED, False)),
+        10, 90).schedule(runtime, rng, duration)
+    short_presses = Traffic(float(arguments.press_rate) * 0.8 / 24, lambda: gpio.set_input(BUTTON_CHANNEL, gpio.HIGH),
+                            lambda: gpio.set_input(BUTTON_CHANNEL, gpio.LOW), 0.1, 0.5).schedule(runtime, rng, duration)
+    long_presses = Traffic(float(arguments.press_rate) * 0.2 / 24, lambda: gpio.set_input(BUTTON_CHANNEL, gpio.HIGH),
+                           lambda: gpio.set_input(BUTTON_CHANNEL, gpio.LOW), 2, 4).schedule(runtime, rng, duration)
+    LOG.info("Simulating %s days from %s: %d sensor motions, %d camera motions, %d short and %d long button presses.",
+             arguments.days, start.isoformat(sep=" ", timespec="seconds"), sensor_motions, camera_motions,
+             short_presses, long_presses)
+
+    # Run hour by hour, watching the processes and the memory
+    process = psutil.Process()
+    start_rss = process.memory_info().rss
+    start_time = time.monotonic()
+    runaway = False
+    hours = int(duration // 3600) + (1 if duration % 3600 else 0)
+    for hour in range(hours):
+        runtime.run_until(min((hour + 1) * 3600, duration))
+        for program, count in launcher.running().items():
+            if count > 1:
+                LOG.error("%s: %d processes of %s are running.", clock.now(), count, program)
+                runaway = True
+        LOG.debug("%s: %d events dispatched, %d kB resident.", clock.now(), runtime.dispatched(),
+                  process.memory_info().rss // 1024)
+    wall_time = time.monotonic() - start_time
+
+    # Report
+    LOG.info("Simulated %.0f hours in %.1f seconds (%.0fx real time).", duration / 3600, wall_time,
+             duration / wall_time if wall_time else float("inf"))
+    LOG.info("%d power manager evaluations, %d events dispatched, at most %d events queued.",
+             runtime.evaluations(), runtime.dispatched(), runtime.max_queue_depth())
+    for signal, count in sorted(outputs.counts().items()):
+        LOG.info("%s: %d events.", signal, count)
+    for program, count in sorted(launcher.spawned().items()):
+        LOG.info("%s: %d spawned, %d terminated, %d suspended.", program, count,
+                 launcher.terminated().get(program, 0), launcher.suspended().get(program, 0))
+    LOG.info("At most %d processes have been running at once.", launcher.max_running())
+    for program, count in sorted(launcher.runs().items()):
+        LOG.info("%s: %d runs.", program, count)
+    LOG.info("Resident memory grew by %d kB.", (process.memory_info().rss - start_rss) // 1024)
+
+    if runaway:
+        LOG.critical("Runaway process spawning detected.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
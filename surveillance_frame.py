@@ -13,21 +13,32 @@ import signal
 import sys
 
 from logging.handlers import TimedRotatingFileHandler
-from queue import Queue
-from typing import List, Optional, Tuple
+from typing import Optional, Tuple
 
-import RPi.GPIO as GPIO     # pylint: disable=import-error
-
-from events.event import Event
+from events.event import Event, set_tracing
+from events.event_journal import EventJournalWriter
+from events.event_queue import EventQueue
 from events.signals import Signal
+from miscellaneous.framebuffer import Framebuffer, FramebufferGeometry
+from miscellaneous.gpio import load_gpio
+from miscellaneous.process import AsyncProcessLauncher, ProcessLauncher
+from objects.async_runtime import AsyncRuntime
 from objects.button import Button
 from objects.camera_stream import CameraStream
 from objects.camera_motion import CameraMotion
+from objects.config_watcher import Config, ConfigWatcher
 from objects.display_power import DisplayPower
 from objects.event_dispatcher import EventDispatcher
 from objects.motion_sensor import MotionSensor
 from objects.notifier import Notifier
-from objects.power_manager import PowerManager, PowerSchedule
+from objects.framebuffer_slideshow import FramebufferSlideshow
+from objects.picture_cache import PictureCache
+from objects.picture_catalog import PictureCatalog
+from objects.picture_index import PictureIndex
+from objects.picture_mirror import PictureMirror
+from objects.player_backend import PLAYER_BACKENDS
+from objects.power_manager import CAMERA_STREAM_TABLE, DISPLAY_POWER_TABLES, PowerManager, WeeklySchedule
+from objects.process_supervisor import ProcessSupervisor
 from objects.slideshow import Slideshow
 from objects.threaded_object_supervisor import ThreadedObjectSupervisor
 
@@ -58,17 +69,69 @@ def parse_arguments() -> argparse.Namespace:
         formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument("-b", "--button-gpio", metavar="GPIO", action="store",
                         help="GPIO BOARD channel number a push button is connected to (active high)")
+    parser.add_argument("-c", "--config", metavar="PATH", action="store",
+                        help="JSON configuration file overriding the schedules, motion timeout, slideshow interval\n"
+                             "and stream URL (keys 'schedule', 'motion_timeout', 'slideshow_interval' and\n"
+                             "'stream_url'), changes are applied without restart")
+    parser.add_argument("-C", "--camera-policy", choices=["latest", "priority", "mosaic"], action="store",
+                        default="latest",
+                        help="camera(s) shown while several cameras detect motion: the most recent one, the first one\n"
+                             "given by --stream-url or all of them tiled (default: %(default)s)")
+    parser.add_argument("-d", "--picture-catalog", metavar="PATH", action="store",
+                        help="SQLite catalog of the picture metadata (capture date, orientation, dimensions and\n"
+                             "content hash), the slideshow shows the playlist given by --playlist (requires Pillow)")
+    parser.add_argument("-e", "--event-queue-size", metavar="EVENTS", action="store", default=64,
+                        help="maximum number of queued events; motion and control events are coalesced to their\n"
+                             "latest value, button presses and termination are never dropped (default: %(default)s)")
+    parser.add_argument("-F", "--framebuffer", metavar="PATH", action="store",
+                        help="show the slideshow directly in the given framebuffer device (e.g. /dev/fb0) instead\n"
+                             "of running feh under X (requires Pillow and NumPy)")
+    parser.add_argument("-g", "--framebuffer-geometry", metavar="WxHxBPP", action="store",
+                        help="geometry of a regular file standing in for the framebuffer device, e.g. 1920x1080x32")
+    parser.add_argument("-G", "--print-state-graphs", action="store_true",
+                        help="print the reachable state graphs of the power mode tables in the Graphviz DOT\n"
+                             "format, then exit")
     parser.add_argument("-i", "--slideshow-interval", metavar="SECONDS", action="store", default=15,
                         help="time in seconds each picture will be shown (default: %(default)s)")
+    parser.add_argument("-j", "--journal", metavar="PATH", action="store",
+                        help="record all dispatched events to the given binary journal (see replay.py)")
+    parser.add_argument("-k", "--picture-cache", metavar="PATH", action="store",
+                        help="directory caching the pictures scaled to the screen size, the slideshow shows the\n"
+                             "cached pictures instead of the originals (requires Pillow)")
+    parser.add_argument("-K", "--picture-cache-size", metavar="MB", action="store", type=int, default=1024,
+                        help="maximum size of the picture cache in megabytes (default: %(default)s)")
     parser.add_argument("-l", "--listen", metavar="IP:PORT", action="store", default="0.0.0.0:10042",
                         help="address to bind the HTTP motion trigger server to (default: %(default)s)")
     parser.add_argument("-L", "--log-file", action="store", help="log to the given file (rotated at midnight)")
     parser.add_argument("-m", "--motion-gpio", metavar="GPIO", action="store",
                         help="GPIO BOARD channel number a motion sensor is connected to (active high on motion)")
+    parser.add_argument("-M", "--max-sessions", metavar="SESSIONS", action="store", type=int, default=2,
+                        help="maximum number of camera stream sessions kept connected, hidden sessions are reused\n"
+                             "when switching cameras (default: %(default)s)")
+    parser.add_argument("-n", "--no-tracing", action="store_true",
+                        help="disable the event latency tracing and use preallocated events instead")
+    parser.add_argument("-o", "--player", choices=sorted(PLAYER_BACKENDS), action="store", default="omxplayer",
+                        help="player showing the camera streams: one omxplayer process per stream or long-lived mpv\n"
+                             "instances controlled via their IPC sockets (default: %(default)s)")
+    parser.add_argument("-O", "--player-program", metavar="PATH", action="store",
+                        help="path of the player program, e.g. fake_player.py to test the mpv backend without a\n"
+                             "display (default: the name of the player)")
+    parser.add_argument("-P", "--print-schedule", metavar="COUNT", action="store", type=int,
+                        help="print the compiled weekly schedule and the next COUNT mode changes, then exit")
     parser.add_argument("-p", "--picture-dir", metavar="PATH", action="store",
                         help="path to the directory containing pictures to be shown")
-    parser.add_argument("-s", "--stream-url", metavar="URL", action="store", required=True,
-                        help="camera stream URL to be shown")
+    parser.add_argument("-q", "--playlist", choices=PictureCatalog.PLAYLISTS, action="store", default="shuffle",
+                        help="playlist of the picture catalog: all pictures in the order they were taken, random\n"
+                             "order avoiding recently shown pictures or the pictures taken around today's date in\n"
+                             "former years followed by random ones (default: %(default)s)")
+    parser.add_argument("-r", "--runtime", choices=["threads", "asyncio"], action="store", default="threads",
+                        help="'threads' runs each active object in its own thread, 'asyncio' runs all objects\n"
+                             "in a single asyncio event loop (default: %(default)s)")
+    parser.add_argument("-s", "--stream-url", metavar="[ID=]URL", action="store", nargs="+",
+                        help="camera stream URL(s) to be shown, optionally prefixed by the camera ID used by the\n"
+                             "motion trigger requests (/?Message=start&Camera=ID), the first camera is the default\n"
+                             "camera (required unless printing the schedule or state graphs or given by the\n"
+                             "configuration file)")
     parser.add_argument("-S", "--schedule", action="store", nargs="+",
                         help="power mode schedule in the format: <weekday>,<start>,<end>,<mode>\n"
                              " <weekday>: day of the week (Monday, Tuesday, ...), 'weekday' (Monday until\n"
@@ -83,8 +146,26 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument("-t", "--motion-timeout", metavar="SECONDS", action="store", default=3600,
                         help="timeout for which the display will be switched on when motion has been detected (default:"
                              " %(default)s)")
+    parser.add_argument("-u", "--skip-similar", action="store_true",
+                        help="show only one of the similar pictures taken in a burst (requires --picture-catalog)")
     parser.add_argument("-v", "--verbose", action="store_true", help="enable verbose logging")
-    return parser.parse_args()
+    parser.add_argument("-W", "--prewarm", metavar="WHEN", action="store", nargs="+",
+                        choices=["ALWAYS_ON", "CAMERA_MOTION", "MOTION_SENSOR", "MOTION"],
+                        help="keep the camera stream ready (started hidden) during the given power modes and/or\n"
+                             "while the motion sensor detects motion ('MOTION'), so it is shown instantly")
+    parser.add_argument("-w", "--subscriber-workers", action="store_true",
+                        help="control camera stream and slideshow from their own worker threads so slow commands\n"
+                             "cannot delay other events")
+    parser.add_argument("-x", "--picture-mirror", metavar="PATH", action="store",
+                        help="local directory mirroring the upcoming pictures of a picture directory on a network\n"
+                             "share, the slideshow keeps running while the share is unreachable")
+    parser.add_argument("-X", "--picture-mirror-size", metavar="MB", action="store", type=int, default=512,
+                        help="maximum size of the picture mirror in megabytes (default: %(default)s)")
+    arguments = parser.parse_args()
+    if arguments.stream_url is None and arguments.config is None and arguments.print_schedule is None and \
+            not arguments.print_state_graphs:
+        parser.error("the following arguments are required: -s/--stream-url")
+    return arguments
 
 
 def configure_logging(arguments: argparse.Namespace) -> None:
@@ -137,64 +218,75 @@ def get_listen(listen: str) -> Tuple[str, int]:
     return bind_ip, bind_port
 
 
-def get_schedules(schedules: List[str]) -> Optional[List[PowerSchedule]]:
+def get_config(arguments: argparse.Namespace, communication_queue: EventQueue) \
+        -> Tuple[Config, Optional[ConfigWatcher]]:
+    """
+    Get the configuration from the command line arguments, overridden by the configuration file (if any).
+    :param arguments: Parsed command line arguments.
+    :param communication_queue: Queue used for event communication.
+    :return: Tuple consisting of the configuration and the (not yet started) configuration watcher or None.
+    """
+    try:
+        config = Config(arguments.schedule or [], int(arguments.motion_timeout), int(arguments.slideshow_interval),
+                        arguments.stream_url or [])
+        if arguments.config:
+            config_watcher = ConfigWatcher(communication_queue, arguments.config, config)
+            return config_watcher.config(), config_watcher
+    except (OSError, ValueError) as exception:
+        LOG.critical("%s", exception)
+        sys.exit(-1)
+
+    return config, None
+
+
+def get_framebuffer(arguments: argparse.Namespace) -> Framebuffer:
     """
-    Get a list of power schedules from the given command line arguments.
-    :param schedules:
-    :return:
+    Open the framebuffer given by the command line arguments.
+    :param arguments: Parsed command line arguments.
+    :return: Framebuffer.
+    """
+    try:
+        geometry = FramebufferGeometry.parse(arguments.framebuffer_geometry) if arguments.framebuffer_geometry \
+            else None
+        return Framebuffer(arguments.framebuffer, geometry)
+    except (OSError, ValueError) as exception:
+        LOG.critical("Cannot open framebuffer %s: %s", arguments.framebuffer, exception)
+        sys.exit(-1)
+
+
+def get_journal(arguments: argparse.Namespace) -> Optional[EventJournalWriter]:
+    """
+    Open the event journal given by the command line arguments.
+    :param arguments: Parsed command line arguments.
+    :return: Event journal or None if no journal is given.
     """
-    if schedules is None:
+    if not arguments.journal:
         return None
+    try:
+        return EventJournalWriter(arguments.journal)
+    except (OSError, ValueError) as exception:
+        LOG.critical("Cannot open event journal %s: %s", arguments.journal, exception)
+        sys.exit(-1)
 
-    power_schedules = []
-    for schedule in schedules:
-        elements = schedule.split(",")
-        if len(elements) != 4:
-            LOG.critical("Invalid power schedule '%s' given.", schedule)
-            sys.exit(-1)
-
-        # Weekday
-        weekdays = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6,
-                    "weekday": PowerSchedule.WEEKDAY, "weekend": PowerSchedule.WEEKEND, "anyday": PowerSchedule.ANYDAY}
-        try:
-            weekday = weekdays[elements[0].lower()]
-        except KeyError:
-            LOG.critical("Invalid weekday '%s' given.", elements[0])
-            sys.exit(-1)
-
-        # Start time
-        time_pattern = r"^(\d{1,2}):(\d{2})$"
-        result = re.match(time_pattern, elements[1])
-        if result:
-            start = datetime.time(int(result.group(1)), int(result.group(2)), 0)
-        else:
-            LOG.critical("Invalid start time '%s' given.", elements[1])
-            sys.exit(-1)
-
-        # End time
-        result = re.match(time_pattern, elements[2])
-        if result:
-            end = datetime.time(int(result.group(1)), int(result.group(2)), 0)
-            if end != datetime.time(0) and start >= end:
-                LOG.critical("End time '%s' must be after start time.", elements[2])
-                sys.exit(-1)
-        else:
-            LOG.critical("Invalid end time '%s' given.", elements[2])
-            sys.exit(-1)
 
-        # Power mode
-        modes = {"ALWAYS_ON": PowerManager.Mode.ALWAYS_ON, "CAMERA_MOTION": PowerManager.Mode.CAMERA_MOTION,
-                 "MOTION_SENSOR": PowerManager.Mode.MOTION_SENSOR}
-        try:
-            mode = modes[elements[3].upper()]
-        except KeyError:
-            LOG.critical("Invalid power mode '%s' given.", elements[3])
-            sys.exit(-1)
+def print_schedule(schedule: Optional[WeeklySchedule], count: int) -> None:
+    """
+    Print the compiled weekly schedule and the next mode changes.
+    :param schedule: Weekly schedule or None.
+    :param count: Number of mode changes to be printed.
+    :return: None
+    """
+    if schedule is None:
+        schedule = WeeklySchedule([])
 
-        # Argument is valid, add the power schedule
-        power_schedules.append(PowerSchedule(weekday, start, end, mode))
+    print("Compiled week:")
+    print(str(schedule))
 
-    return power_schedules
+    now = datetime.datetime.now()
+    print(f"Current mode: {schedule.mode_at(now)}")
+    print("Next mode changes:")
+    for change_time, mode in schedule.transitions(now, count):
+        print(f"{change_time.strftime('%A %Y-%m-%d %H:%M')}: {mode}")
 
 
 def signal_handler(signal_number: int, _) -> None:
@@ -209,7 +301,7 @@ def signal_handler(signal_number: int, _) -> None:
     raise OSError(signal.Signals(signal_number).name)
 
 
-# pylint: disable=too-many-locals
+# pylint: disable=too-many-branches,too-many-locals,too-many-statements
 def main() -> None:
     """
     Main entry point.
@@ -219,59 +311,137 @@ def main() -> None:
     arguments = parse_arguments()
     configure_logging(arguments)
     bind_ip, bind_port = get_listen(arguments.listen)
-    schedules = get_schedules(arguments.schedule)
+    communication_queue = EventQueue(int(arguments.event_queue_size))
+    config, config_watcher = get_config(arguments, communication_queue)
+    if arguments.print_schedule is not None:
+        print_schedule(config.schedule(), arguments.print_schedule)
+        return
+    if arguments.print_state_graphs:
+        for table in list(DISPLAY_POWER_TABLES.values()) + [CAMERA_STREAM_TABLE]:
+            print(table.to_dot())
+        return
+    if not config.stream_urls():
+        LOG.critical("No camera stream URL specified.")
+        sys.exit(-1)
+    if arguments.picture_dir and arguments.picture_cache and not PictureCache.is_available():
+        LOG.critical("The picture cache requires Pillow, install it or omit --picture-cache.")
+        sys.exit(-1)
+    if arguments.picture_dir and arguments.picture_catalog and not PictureCache.is_available():
+        LOG.critical("The picture catalog requires Pillow, install it or omit --picture-catalog.")
+        sys.exit(-1)
+    if arguments.picture_dir and arguments.framebuffer and not FramebufferSlideshow.is_available():
+        LOG.critical("The framebuffer slideshow requires Pillow and NumPy, install them or omit --framebuffer.")
+        sys.exit(-1)
+    set_tracing(not arguments.no_tracing)
     signal.signal(signal.SIGTERM, signal_handler)
 
     # GPIO mode
-    GPIO.setmode(GPIO.BOARD)
+    gpio = load_gpio()
+    gpio.setmode(gpio.BOARD)
 
     # Start the application
+    use_asyncio = arguments.runtime == "asyncio"
+    launcher = AsyncProcessLauncher() if use_asyncio else ProcessLauncher()
     threaded_object_supervisor = None
     threaded_objects = []
+    recorder = None
     try:
         communication_objects = []
-        communication_queue = Queue()
+        recorder = get_journal(arguments)
 
-        # Display power
-        display_power = DisplayPower(communication_queue)
+        # Process supervisor restarting failed players (a thread in both runtimes)
+        process_supervisor = ProcessSupervisor(communication_queue, launcher).start()
+        threaded_objects.append(process_supervisor)
+
+        # Display power (queried once the event loop is running in the asyncio runtime)
+        display_power = DisplayPower(communication_queue, launcher)
+        if not use_asyncio:
+            display_power.start()
         communication_objects.append(display_power)
 
         # Slideshow
         if arguments.picture_dir:
-            slideshow = Slideshow(communication_queue, arguments.picture_dir, int(arguments.slideshow_interval))
+            if arguments.framebuffer:
+                slideshow = FramebufferSlideshow(get_framebuffer(arguments), int(config.slideshow_interval()))
+            else:
+                slideshow = Slideshow(communication_queue, arguments.picture_dir, config.slideshow_interval(),
+                                      launcher)
+                slideshow.set_supervisor(process_supervisor)
+            picture_index = PictureIndex(arguments.picture_dir).start()
+            threaded_objects.append(picture_index)
+            slideshow.set_picture_index(picture_index)
+            if arguments.picture_cache:
+                picture_cache = PictureCache(picture_index, arguments.picture_cache,
+                                             arguments.picture_cache_size * 1024 * 1024).start()
+                threaded_objects.append(picture_cache)
+                slideshow.set_picture_index(picture_cache)
+            if arguments.picture_catalog:
+                picture_catalog = PictureCatalog(picture_index, arguments.picture_catalog, arguments.playlist,
+                                                 int(config.slideshow_interval()), arguments.skip_similar)
+                if arguments.picture_cache:
+                    picture_catalog.set_picture_cache(picture_cache)
+                threaded_objects.append(picture_catalog.start())
+                slideshow.set_picture_index(picture_catalog)
+            if arguments.picture_mirror:
+                source = picture_catalog if arguments.picture_catalog else \
+                    picture_cache if arguments.picture_cache else picture_index
+                picture_mirror = PictureMirror(source, arguments.picture_dir, arguments.picture_mirror,
+                                               arguments.picture_mirror_size * 1024 * 1024,
+                                               int(config.slideshow_interval())).start()
+                threaded_objects.append(picture_mirror)
+                slideshow.set_picture_index(picture_mirror)
+            if arguments.framebuffer:
+                threaded_objects.append(slideshow.start())
             communication_objects.append(slideshow)
 
         # Camera stream
-        camera_stream = CameraStream(communication_queue, arguments.stream_url)
+        backend = PLAYER_BACKENDS[arguments.player](process_supervisor, arguments.player_program or arguments.player)
+        camera_stream = CameraStream(communication_queue, config.streams(), backend, arguments.camera_policy,
+                                     arguments.max_sessions)
         communication_objects.append(camera_stream)
 
-        # Camera motion
-        camera_motion = CameraMotion(communication_queue, bind_ip, bind_port).start()
+        # Camera motion (served by the event loop in the asyncio runtime)
+        camera_motion = CameraMotion(communication_queue, bind_ip, bind_port, config.streams())
         communication_objects.append(camera_motion)
-        threaded_objects.append(camera_motion)
+        if not use_asyncio:
+            threaded_objects.append(camera_motion.start())
 
         # Motion sensor
         if arguments.motion_gpio:
-            motion_sensor = MotionSensor(communication_queue, int(arguments.motion_gpio))
+            motion_sensor = MotionSensor(communication_queue, int(arguments.motion_gpio), gpio)
             communication_objects.append(motion_sensor)
 
         # Button
         if arguments.button_gpio:
-            button = Button(communication_queue, int(arguments.button_gpio))
+            button = Button(communication_queue, int(arguments.button_gpio), gpio)
             communication_objects.append(button)
 
         # Power manager
-        power_manager = PowerManager(communication_queue, int(arguments.motion_timeout), schedules).start()
+        power_manager = PowerManager(communication_queue, config.motion_timeout(), config.schedule())
+        if arguments.prewarm:
+            power_manager.set_prewarm(set(arguments.prewarm) - {"MOTION"}, "MOTION" in arguments.prewarm)
         communication_objects.append(power_manager)
-        threaded_objects.append(power_manager)
 
         # Notifier
-        notifier = Notifier(communication_queue).start()
+        notifier = Notifier(communication_queue, launcher)
         communication_objects.append(notifier)
-        threaded_objects.append(notifier)
+
+        # Configuration watcher (a thread in both runtimes)
+        if config_watcher:
+            threaded_objects.append(config_watcher.start())
+
+        if use_asyncio:
+            # Single event loop
+            AsyncRuntime(communication_queue, communication_objects, power_manager, notifier, camera_motion,
+                         recorder, process_supervisor, display_power.start).run()
+            return
+
+        threaded_objects.append(power_manager.start())
+        threaded_objects.append(notifier.start())
 
         # Event dispatcher
-        event_dispatcher = EventDispatcher(communication_queue, communication_objects).start()
+        event_dispatcher = EventDispatcher(communication_queue, communication_objects,
+                                           arguments.subscriber_workers, recorder).start()
         threaded_objects.append(event_dispatcher)
 
         # Threaded object supervisor
@@ -282,12 +452,22 @@ def main() -> None:
     except OSError as exception:
         LOG.info("Received %s, shutting down...", exception)
     finally:
-        # Stop all objects
+        # Stop all objects, a failing object must not keep the others running
         if threaded_object_supervisor:
-            threaded_object_supervisor.dispatch(Event(Signal.TERMINATE))
+            threaded_object_supervisor.dispatch(Event.create(Signal.TERMINATE))
+        else:
+            for threaded_object in threaded_objects:
+                try:
+                    threaded_object.dispatch(Event.create(Signal.TERMINATE))
+                except Exception:   # pylint: disable=broad-except
+                    LOG.exception("Cannot stop %s.", type(threaded_object).__name__)
 
         # Configure the GPIOs to their previous state
-        GPIO.cleanup()
+        gpio.cleanup()
+
+        # Close the event journal after the last event has been dispatched
+        if recorder:
+            recorder.close()
 
 
 if __name__ == "__main__":